@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Moteur AC-3 sur les masques de bits de csp_masques.
+#
+# Les arcs sont encodés en entiers (i*81 + j, voir grille.ARCS_ENTIERS). La
+# file est une deque et un bytearray indique les arcs déjà en file, de sorte
+# qu'un arc n'y figure jamais deux fois. Quand le domaine de Xi change, seuls
+# les arcs (Xk, Xi) des voisins de Xi sont remis en file, et seulement une
+# fois Xi réduit à une valeur (seul cas où ils peuvent retirer une valeur).
+###
+
+from collections import deque
+
+import grille
+from csp_masques import VALEURS_MASQUE
+
+N = grille.NB_CASES
+
+
+def arcs_vers(cases):
+    """Arcs (Xk, Xj) entrants des cases données, encodés en entiers."""
+    return [k * N + j for j in cases for k in grille.VOISINS[j]]
+
+
+def propager(masques, arcs=None, piste=None):
+    """
+    Rend les domaines arc-consistants (en place).
+
+    masques: tableau des 81 masques de domaine.
+    arcs: arcs (entiers) mis en file au départ. Par défaut, les arcs entrants
+          des cases réduites à une valeur: avec des contraintes Xi != Xj, un
+          arc (Xi, Xj) ne retire rien tant que Xj a plusieurs valeurs, et il
+          est remis en file dès que le domaine de Xj change.
+    piste: liste recevant (case, None, valeurs précédentes) pour chaque
+           domaine modifié (voir solution_sudoku.annuler), ou None.
+
+    Retourne un tuple (ok, nb_arcs_revises); ok est faux dès qu'un domaine
+    devient vide.
+    """
+    voisins = grille.VOISINS
+    if arcs is None:
+        arcs = arcs_vers([c for c in range(N)
+                          if masques[c] and not masques[c] & (masques[c] - 1)])
+
+    file_arcs = deque(arcs)
+    en_file = bytearray(N * N)
+    for a in file_arcs:
+        en_file[a] = 1
+
+    nb_revises = 0
+    while file_arcs:
+        a = file_arcs.popleft()
+        en_file[a] = 0
+        nb_revises += 1
+
+        i, j = divmod(a, N)
+        mj = masques[j]
+        # Xi ne perd une valeur que si Xj est réduit à cette seule valeur.
+        if mj & (mj - 1) or not masques[i] & mj:
+            continue
+
+        ancien = masques[i]
+        mi = masques[i] = ancien & ~mj
+        if piste is not None:
+            piste.append((grille.CASES[i], None, VALEURS_MASQUE[ancien]))
+        if not mi:
+            return False, nb_revises
+        if mi & (mi - 1):
+            # Les arcs (Xk, Xi) restent sans effet tant que Xi a plusieurs
+            # valeurs; ils seront mis en file au prochain changement de Xi.
+            continue
+
+        for k in voisins[i]:
+            b = k * N + i
+            if k != j and not en_file[b]:
+                en_file[b] = 1
+                file_arcs.append(b)
+
+    return True, nb_revises
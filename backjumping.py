@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Retour arrière dirigé par les conflits (conflict-directed backjumping) et
+# apprentissage de nogoods, pour solution_sudoku.backtrack_cbj.
+#
+# Chaque retrait d'une valeur est expliqué par l'ensemble des niveaux de
+# décision qui l'ont causé, noté en masque de bits (bit d: décision de
+# niveau d). La propagation est celle des singletons (équivalente à AC3
+# pour le sudoku): retirer w des voisins d'une case Z réduite à {w} a pour
+# explication celle de Z, soit son propre niveau si Z est une décision,
+# soit l'union des explications des valeurs retirées de Z. Les retraits
+# des indices de départ ont une explication vide.
+#
+# Quand toutes les valeurs d'une case échouent, l'union de leurs
+# explications (moins la case elle-même) est son ensemble de conflits: la
+# recherche remonte directement au plus profond de ces niveaux, sans
+# essayer les autres valeurs des décisions intermédiaires. Les ensembles de
+# conflits assez petits sont gardés comme nogoods (combinaisons
+# d'affectations sans solution) dans un magasin borné.
+###
+
+from collections import OrderedDict, deque
+
+import grille
+
+
+class EtatCBJ:
+    """
+    Explications des retraits et niveaux de décision d'une recherche.
+
+    raison[(X, v)]: niveaux expliquant le retrait de v du domaine de X
+                    (valide tant que v est absente du domaine; absente pour
+                    les domaines des indices de départ).
+    niveau[X]: niveau de décision de X, si X est une décision en cours.
+    decisions: cases de décision, par niveau (decisions[d - 1]).
+    """
+
+    def __init__(self, csp, nogoods=None):
+        self.valeurs = grille.index_pour(len(csp.variables)).valeurs
+        self.raison = {}
+        self.niveau = {}
+        self.decisions = []
+        self.nogoods = nogoods
+
+    def explication(self, X, csp):
+        """Niveaux expliquant que le domaine de X soit réduit à ce qu'il est."""
+        d = self.niveau.get(X)
+        if d is not None:
+            return 1 << d
+        domaine = csp.domaines[X]
+        raison = self.raison
+        e = 0
+        for v in self.valeurs:
+            if v not in domaine:
+                e |= raison.get((X, v), 0)  # Indices de départ: aucune.
+        return e
+
+    def propager(self, csp, cases):
+        """
+        Propage les singletons à partir des cases données, en empilant les
+        retraits sur csp.piste. Retourne None, ou l'ensemble de conflits
+        (masque de niveaux) si un domaine est vidé.
+        """
+        domaines = csp.domaines
+        piste = csp.piste
+        raison = self.raison
+        file = deque(X for X in cases if len(domaines[X]) == 1)
+        while file:
+            Z = file.popleft()
+            w = domaines[Z][0]
+            e = self.explication(Z, csp)
+            for Y in csp.contraintes[Z]:
+                domaine = domaines[Y]
+                if w in domaine:
+                    i = domaine.index(w)
+                    domaine.remove(w)
+                    piste.append((Y, i, w))
+                    raison[(Y, w)] = e
+                    if not domaine:
+                        return e | self.explication(Y, csp)
+                    if len(domaine) == 1:
+                        file.append(Y)
+        return None
+
+    def decider(self, X):
+        """Ouvre un niveau de décision pour X; retourne son bit."""
+        self.decisions.append(X)
+        d = len(self.decisions)
+        self.niveau[X] = d
+        return 1 << d
+
+    def abandonner(self, X):
+        self.decisions.pop()
+        del self.niveau[X]
+
+    def affectations(self, conflits, assignations):
+        """Affectations (case, valeur) des niveaux d'un ensemble de conflits."""
+        resultat = []
+        d = 0
+        while conflits:
+            if conflits & 1:
+                X = self.decisions[d - 1]
+                resultat.append((X, assignations[X]))
+            conflits >>= 1
+            d += 1
+        return resultat
+
+
+class MagasinNogoods:
+    """
+    Nogoods appris, au plus 'capacite', chacun d'au plus 'taille_max'
+    affectations. Le moins récemment utilisé est évincé quand le magasin
+    est plein.
+    """
+
+    def __init__(self, capacite=1000, taille_max=4):
+        self.capacite = capacite
+        self.taille_max = taille_max
+        self.nogoods = OrderedDict()
+        self.par_affectation = {}
+
+    def __len__(self):
+        return len(self.nogoods)
+
+    def ajouter(self, affectations):
+        if not 0 < len(affectations) <= self.taille_max:
+            return
+        nogood = frozenset(affectations)
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+        self.nogoods[nogood] = None
+        for a in nogood:
+            self.par_affectation.setdefault(a, set()).add(nogood)
+        if len(self.nogoods) > self.capacite:
+            ancien, _ = self.nogoods.popitem(last=False)
+            for a in ancien:
+                groupe = self.par_affectation[a]
+                groupe.discard(ancien)
+                if not groupe:
+                    del self.par_affectation[a]
+
+    def viole(self, X, v, assignations):
+        """
+        Nogood que l'affectation X = v compléterait avec les assignations
+        en cours, ou None. Retourne les autres affectations du nogood.
+        """
+        for nogood in self.par_affectation.get((X, v), ()):
+            autres = [(Y, w) for Y, w in nogood if Y != X]
+            if all(assignations.get(Y) == w for Y, w in autres):
+                self.nogoods.move_to_end(nogood)
+                return autres
+        return None
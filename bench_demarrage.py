@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Coût du démarrage: temps d'import des modules et durée totale d'appels
+# courts en ligne de commande, chacun dans un nouvel interpréteur.
+#
+# Le temps d'import vient de 'python -X importtime' (temps cumulé du module,
+# dépendances comprises); on note aussi si NumPy est chargé. Les commandes
+# sont chronométrées de bout en bout (médiane de plusieurs exécutions).
+#
+# Avec -reference, les mesures sont comparées à celles d'un fichier JSON
+# écrit par -json: un écart au-delà de la tolérance est signalé.
+###
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+
+MODULES = ['grille', 'csp', 'solution_sudoku', 'dlx', 'sudoku']
+
+# Partie 2 de sudoku.py (SudokuUtil.generate(2)), en une ligne.
+GRILLE = "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97.."
+
+
+def commandes(grille_ligne):
+    """Commandes chronométrées: nom => arguments de python."""
+    return {
+        'python': ['-c', 'pass'],
+        'rapide': ['rapide.py', '-joueur', 'dlx', grille_ligne],
+        'rapide (solution_sudoku)': ['rapide.py', '-piste', '-regles', 'toutes',
+                                     grille_ligne],
+        'sudoku.py': ['sudoku.py', '-joueur', 'dlx', '-no_partie', '2'],
+        'sudoku.py -h': ['sudoku.py', '-h'],
+    }
+
+
+def executer(arguments, repetitions):
+    """Médiane (sec.) de la durée de 'python arguments...'."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, cwd=DOSSIER, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees)
+
+
+def importer(module, repetitions):
+    """Temps d'import cumulé (sec., médiane) et modules lourds chargés."""
+    durees = []
+    for _ in range(repetitions):
+        sortie = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+            cwd=DOSSIER, check=True, capture_output=True, text=True).stderr
+        cumuls = {}
+        for ligne in sortie.splitlines():
+            if not ligne.startswith('import time:') or '|' not in ligne:
+                continue
+            _, cumul, nom = ligne[len('import time:'):].split('|')
+            if cumul.strip().isdigit():
+                cumuls[nom.strip()] = int(cumul) * 1e-6
+        durees.append(cumuls.get(module, 0.))
+    return {
+        'temps': statistics.median(durees),
+        'numpy': 'numpy' in cumuls,
+        'argparse': 'argparse' in cumuls,
+        'pdb': 'pdb' in cumuls,
+    }
+
+
+def comparer(mesures, reference, tolerance):
+    """Liste des écarts au-delà de la tolérance (fraction) par rapport à la référence."""
+    regressions = []
+    for categorie in ('imports', 'commandes'):
+        for nom, valeur in mesures[categorie].items():
+            ancien = reference.get(categorie, {}).get(nom)
+            if ancien is None:
+                continue
+            t, t_ref = (valeur['temps'], ancien['temps']) \
+                if isinstance(valeur, dict) else (valeur, ancien)
+            if t_ref and t > t_ref * (1 + tolerance):
+                regressions.append("{0} '{1}': {2:0.1f} ms (référence "
+                                   "{3:0.1f} ms)".format(categorie, nom,
+                                                         t * 1000, t_ref * 1000))
+    return regressions
+
+
+DESCRIPTION = "Mesurer le coût du démarrage (imports et appels courts)."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('-repetitions', dest='repetitions', metavar="INT",
+                   action='store', type=int, required=False, default=5,
+                   help="exécutions par mesure (la médiane est retenue).")
+
+    p.add_argument('-grille', dest='grille', metavar="GRILLE", action='store',
+                   type=str, required=False, default=GRILLE,
+                   help="grille en une ligne résolue par les commandes.")
+
+    p.add_argument('-json', dest='json_file', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="fichier JSON où écrire les mesures.")
+
+    p.add_argument('-reference', dest='reference', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="mesures de référence (JSON écrit par -json).")
+
+    p.add_argument('-tolerance', dest='tolerance', metavar="FLOAT",
+                   action='store', type=float, required=False, default=0.2,
+                   help="hausse relative tolérée par rapport à la référence.")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    mesures = {'imports': {}, 'commandes': {}}
+    print("{0:>25} {1:>10}  {2}".format('import', 'temps (ms)', 'chargés'))
+    for module in MODULES:
+        m = importer(module, args.repetitions)
+        mesures['imports'][module] = m
+        print("{0:>25} {1:>10.1f}  {2}".format(
+            module, m['temps'] * 1000,
+            ', '.join(n for n in ('numpy', 'argparse', 'pdb') if m[n]) or '-'))
+        sys.stdout.flush()
+
+    print("\n{0:>25} {1:>10}".format('commande', 'temps (ms)'))
+    for nom, arguments in commandes(args.grille).items():
+        t = executer(arguments, args.repetitions)
+        mesures['commandes'][nom] = t
+        print("{0:>25} {1:>10.1f}".format(nom, t * 1000))
+        sys.stdout.flush()
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump(mesures, f, indent=2)
+
+    if args.reference:
+        with open(args.reference) as f:
+            regressions = comparer(mesures, json.load(f), args.tolerance)
+        for r in regressions:
+            print("* Régression: " + r)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
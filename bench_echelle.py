@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Mise à l'échelle: temps et mémoire de résolution selon l'ordre n de la
+# grille (n² x n² cases: 4x4, 9x9, 16x16, 25x25).
+#
+# Les grilles sont tirées d'une solution de référence (motif décalé par
+# bandes), mélangée par renommage des valeurs et permutations des lignes et
+# colonnes à l'intérieur des bandes et des piles, puis vidée d'une
+# proportion de cases. Tout dépend de la graine: deux exécutions mesurent
+# les mêmes grilles.
+#
+# Chaque grille est résolue deux fois: une fois chronométrée, une fois
+# sous tracemalloc pour le pic de mémoire (création du CSP comprise).
+###
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import sudoku
+from statistiques import Statistiques
+
+
+def grille_aleatoire(ordre, vides, rng):
+    """SudokuEtat d'ordre donné dont une proportion 'vides' des cases est vide."""
+    n, N = ordre, ordre * ordre
+    lignes = [b * n + i for b in rng.sample(range(n), n)
+              for i in rng.sample(range(n), n)]
+    colonnes = [p * n + j for p in rng.sample(range(n), n)
+                for j in rng.sample(range(n), n)]
+    etiquettes = np.array([0] + rng.sample(range(1, N + 1), N), dtype=np.uint8)
+
+    tableau = np.array([[(n * (r % n) + r // n + c) % N + 1 for c in colonnes]
+                        for r in lignes], dtype=np.uint8)
+    tableau = etiquettes[tableau]
+    cases = rng.sample(range(N * N), int(round(vides * N * N)))
+    tableau.flat[cases] = 0
+    return sudoku.SudokuEtat(tableau)
+
+
+def resoudre(solution, etat, options):
+    """Résout une grille; retourne (solution valide, Statistiques)."""
+    stats = Statistiques()
+    assignations = solution.backtracking_search(
+        sudoku.creerCSP(etat), stats=stats, **options)
+    final = etat.copy()
+    for pos, v in (assignations or {}).items():
+        final.placer(pos, v)
+    return sudoku.sudoku_but(final), stats
+
+
+def mesurer(player, ordre, grilles, options):
+    """Mesures d'un moteur sur les grilles d'un ordre."""
+    solution = sudoku.chargerSolution(player)
+    temps, noeuds, pics, resolues = [], [], [], 0
+    for etat in grilles:
+        debut = time.perf_counter()
+        valide, stats = resoudre(solution, etat, options)
+        temps.append(time.perf_counter() - debut)
+        noeuds.append(stats.noeuds)
+        resolues += valide
+
+        tracemalloc.start()
+        resoudre(solution, etat, options)
+        pics.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return {
+        'joueur': player,
+        'ordre': ordre,
+        'taille': ordre * ordre,
+        'grilles': len(grilles),
+        'resolues': resolues,
+        'cases_vides': float(np.mean([len(e.find(0)[0]) for e in grilles])),
+        'temps_median': float(np.median(temps)),
+        'temps_max': max(temps),
+        'noeuds_median': float(np.median(noeuds)),
+        'memoire_pic': max(pics),
+    }
+
+
+DESCRIPTION = "Mesurer le temps et la mémoire de résolution selon l'ordre " \
+              "de la grille."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('-ordres', dest='ordres', metavar="INT", nargs='+',
+                   type=int, required=False, default=[2, 3, 4, 5],
+                   choices=[2, 3, 4, 5],
+                   help="ordres des grilles mesurées (3 pour 9x9, 4 pour 16x16, ...).")
+
+    p.add_argument('-joueurs', dest='players', metavar="JOUEUR", nargs='+',
+                   type=str, required=False,
+                   default=['dlx', 'solution_sudoku.py'],
+                   help="moteurs intégrés ou fichiers solution mesurés.")
+
+    sudoku.ajouterOptionsRecherche(p)
+
+    p.add_argument('-vides', dest='vides', metavar="FLOAT", action='store',
+                   type=float, required=False, default=0.4,
+                   help="proportion des cases vidées dans chaque grille.")
+
+    p.add_argument('-grilles', dest='nb_grilles', metavar="INT",
+                   action='store', type=int, required=False, default=3,
+                   help="nombre de grilles par ordre.")
+
+    p.add_argument('-seed', dest='seed', metavar="INT", action='store',
+                   type=int, required=False, default=0,
+                   help="graine du tirage des grilles.")
+
+    p.add_argument('-json', dest='json_file', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="fichier JSON où écrire les mesures.")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    if args.representation == 'masques':
+        parser.error("-domaines masques est limité aux grilles 9x9.")
+
+    options = sudoku.optionsRecherche(args)
+    print("{0:>5} {1:>7} {2:>20} {3:>7} {4:>10} {5:>10} {6:>9} {7:>10}".format(
+        'ordre', 'grille', 'joueur', 'vides', 'temps (s)', 'max (s)',
+        'noeuds', 'mém. (Ko)'))
+
+    mesures = []
+    for ordre in args.ordres:
+        rng = random.Random(args.seed * 100 + ordre)
+        grilles = [grille_aleatoire(ordre, args.vides, rng)
+                   for _ in range(args.nb_grilles)]
+        for player in args.players:
+            m = mesurer(player, ordre, grilles,
+                        sudoku.optionsJoueur(player, options))
+            mesures.append(m)
+            print("{0:>5} {1:>7} {2:>20} {3:>7.0f} {4:>10.4f} {5:>10.4f} "
+                  "{6:>9.0f} {7:>10.0f}{8}".format(
+                      ordre, "{0}x{0}".format(m['taille']), player,
+                      m['cases_vides'], m['temps_median'], m['temps_max'],
+                      m['noeuds_median'], m['memoire_pic'] / 1024.,
+                      '' if m['resolues'] == m['grilles'] else
+                      "  ({0} non résolues)".format(m['grilles'] - m['resolues'])))
+            sys.stdout.flush()
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump({'options': options, 'vides': args.vides,
+                       'seed': args.seed, 'mesures': mesures}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
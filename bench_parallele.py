@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Accélération de la recherche parallèle (backtracking_search, processus > 1)
+# selon le nombre de coeurs.
+#
+# Chaque grille est d'abord résolue avec processus=1: c'est la référence
+# séquentielle (t_seq). Elle est ensuite résolue avec chaque nombre de
+# processus k demandé (t_par, création de l'ensemble de processus comprise).
+# L'accélération est t_seq / t_par, l'efficacité l'accélération divisée par
+# k; l'utilisation (Statistiques.utilisation) donne les coeurs occupés en
+# moyenne. L'accélération peut dépasser k (ou l'utilisation): le découpage
+# de l'arbre change l'ordre d'exploration et les noeuds visités. Les temps
+# retenus sont les meilleurs de -repetitions résolutions. Les totaux portent
+# sur toutes les grilles d'un niveau; le JSON (-json) donne aussi les
+# mesures par grille, pour tracer la courbe accélération / coeurs.
+###
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import sudoku
+from bench_suite import NIVEAUX, niveaux
+from statistiques import Statistiques
+
+
+def resoudre(solution, ligne, representation, options, processus):
+    """Résout une grille; retourne (durée, solution valide, Statistiques)."""
+    fct_csp = sudoku.creerCSPMasques if representation == 'masques' \
+        else sudoku.creerCSP
+    etat = sudoku.SudokuUtil.ligne2etat(ligne)
+    stats = Statistiques()
+    debut = time.perf_counter()
+    assignations = solution.backtracking_search(
+        fct_csp(etat), stats=stats, processus=processus, **options)
+    duree = time.perf_counter() - debut
+    final = etat.copy()
+    for pos, v in (assignations or {}).items():
+        final.placer(pos, v)
+    return duree, bool(sudoku.sudoku_but(final)), stats
+
+
+def mesurer(solution, ligne, representation, options, processus,
+            repetitions=3):
+    """Meilleur temps de 'repetitions' résolutions avec 'processus' processus."""
+    durees = []
+    for _ in range(repetitions):
+        duree, valide, stats = resoudre(solution, ligne, representation,
+                                        options, processus)
+        durees.append(duree)
+    return {
+        'processus': processus,
+        'temps': min(durees),
+        'resolue': valide,
+        'noeuds': stats.noeuds,
+        'utilisation': stats.utilisation() if processus > 1 else 1.,
+    }
+
+
+DESCRIPTION = "Mesurer l'accélération de la recherche parallèle selon le " \
+              "nombre de coeurs."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('-joueur', dest='player', metavar="FICHIER", action='store',
+                   type=str, required=False, default='solution_sudoku.py',
+                   help="fichier solution mesuré (recherche parallèle).")
+
+    p.add_argument('-processus', dest='processus', metavar="INT", nargs='+',
+                   type=int, required=False,
+                   default=sorted(set([2, 4, os.cpu_count() or 1]) - {1}),
+                   help="nombres de processus mesurés (la référence "
+                        "séquentielle est toujours mesurée).")
+
+    p.add_argument('-niveaux', dest='niveaux', metavar="NIVEAU", nargs='*',
+                   type=str, required=False, default=['difficile', '17'],
+                   choices=list(NIVEAUX),
+                   help="niveaux de grilles (voir bench_suite.py).")
+
+    p.add_argument('-limite', dest='limite', metavar="INT", action='store',
+                   type=int, required=False,
+                   help="nombre maximal de grilles par niveau.")
+
+    sudoku.ajouterOptionsRecherche(p)
+
+    p.add_argument('-repetitions', dest='repetitions', metavar="INT",
+                   action='store', type=int, required=False, default=3,
+                   help="résolutions chronométrées par grille et par nombre "
+                        "de processus (le meilleur temps est retenu).")
+
+    p.add_argument('-json', dest='json_file', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="fichier JSON où écrire les mesures.")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    if any(k < 2 for k in args.processus):
+        parser.error("-processus: la recherche parallèle demande au moins "
+                     "2 processus.")
+    options = sudoku.optionsRecherche(args)
+    if 'cbj' in options:
+        parser.error("-cbj est limité à la recherche séquentielle.")
+    solution = sudoku.chargerSolution(args.player)
+    grilles = niveaux(args.niveaux, limite=args.limite)
+
+    print("{0} coeurs disponibles.".format(os.cpu_count()))
+    print("{0:>10} {1:>9} {2:>10} {3:>12} {4:>10} {5:>12}".format(
+        'niveau', 'processus', 'temps (s)', 'accélération', 'efficacité',
+        'utilisation'))
+
+    mesures = []
+    for niveau, lignes in grilles.items():
+        if not lignes:
+            continue
+        par_grille = []
+        for ligne in lignes:
+            sequentiel = mesurer(solution, ligne, args.representation,
+                                 options, 1, args.repetitions)
+            paralleles = [mesurer(solution, ligne, args.representation,
+                                  options, k, args.repetitions)
+                          for k in args.processus]
+            for m in paralleles:
+                m['acceleration'] = sequentiel['temps'] / m['temps']
+            par_grille.append({'grille': ligne, 'sequentiel': sequentiel,
+                               'paralleles': paralleles})
+
+        t_seq = sum(g['sequentiel']['temps'] for g in par_grille)
+        print("{0:>10} {1:>9} {2:>10.4f} {3:>12} {4:>10} {5:>12}".format(
+            niveau, 1, t_seq, '-', '-', '-'))
+        totaux = []
+        for i, k in enumerate(args.processus):
+            mesures_k = [g['paralleles'][i] for g in par_grille]
+            t_par = sum(m['temps'] for m in mesures_k)
+            acceleration = t_seq / t_par
+            utilisation = sum(m['utilisation'] * m['temps']
+                              for m in mesures_k) / t_par
+            totaux.append({'processus': k, 'temps': t_par,
+                           'acceleration': acceleration,
+                           'efficacite': acceleration / k,
+                           'utilisation': utilisation,
+                           'resolues': sum(m['resolue'] for m in mesures_k)})
+            print("{0:>10} {1:>9} {2:>10.4f} {3:>12.2f} {4:>9.0%} {5:>12.2f}"
+                  .format(niveau, k, t_par, acceleration, acceleration / k,
+                          utilisation))
+            sys.stdout.flush()
+        mesures.append({'niveau': niveau, 'temps_sequentiel': t_seq,
+                        'totaux': totaux, 'grilles': par_grille})
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump({'options': options,
+                       'representation': args.representation,
+                       'coeurs': os.cpu_count(), 'mesures': mesures},
+                      f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Banc d'essai des moteurs: chaque joueur accepté par sudoku.player_factory
+# résout les grilles de plusieurs niveaux; on note pour chaque grille le
+# temps écoulé, les noeuds, les backtracks et le pic de mémoire.
+#
+# Niveaux:
+#   parties:   les cinq grilles de SudokuUtil.generate (validation, 0 à 3).
+#   facile:    grilles/facile.txt (generateur.py, niveau facile).
+#   difficile: grilles/difficile.txt (grilles difficiles connues).
+#   17:        grilles/17_indices.txt (grilles minimales à 17 indices).
+# D'autres corpus (texte ou binaire, voir corpus.py) s'ajoutent avec -corpus.
+#
+# Les résultats sont écrits en JSON (-json). Avec -reference, ils sont
+# comparés à un fichier écrit auparavant par -json: toute hausse des noeuds
+# ou des backtracks, une grille qui n'est plus résolue, ou une hausse du
+# temps ou de la mémoire au-delà de la tolérance est signalée comme
+# régression (code de sortie 1). Les temps ne se comparent qu'entre
+# exécutions de la même commande sur la même machine; les options de
+# recherche doivent être celles de la référence.
+#
+# Chaque joueur résout d'abord une grille hors mesure (chargement du moteur,
+# index de la grille). Le temps retenu est le meilleur de -repetitions
+# résolutions, chacune sans ramasse-miettes (comme timeit); leur dispersion
+# (plus lent moins plus rapide) est gardée avec lui. Une hausse du temps
+# n'est signalée que si elle dépasse aussi le bruit: NB_DISPERSIONS fois la
+# plus grande dispersion (référence ou mesure), et au moins BRUIT_TEMPS. La
+# mémoire est mesurée par une résolution de plus sous tracemalloc (création
+# du CSP comprise), pour ne pas fausser le temps; -sans_memoire l'omet.
+#
+# Par défaut, les moteurs CSP utilisent leurs options rapides (RECHERCHE:
+# masques, piste, mrv, lcv; -copie et les options de sudoku.py les
+# changent; dlx n'en reçoit aucune, voir sudoku.optionsJoueur) et chaque
+# résolution a un budget de TEMPS_MAX secondes (-temps_max, 0 pour aucun):
+# dans le mode de base, une grille difficile prend plus d'une minute. Une
+# grille dont le budget est épuisé est comptée comme telle, n'est pas
+# répétée, et ses temps et noeuds ne sont pas comparés à la référence.
+###
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import sudoku
+from statistiques import Statistiques
+
+DOSSIER_GRILLES = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               'grilles')
+
+NIVEAUX = {
+    'parties': None,
+    'facile': 'facile.txt',
+    'difficile': 'difficile.txt',
+    '17': '17_indices.txt',
+}
+
+# Hausse absolue du temps (sec.) en deçà de laquelle aucun écart n'est signalé.
+BRUIT_TEMPS = 0.002
+
+# Hausse du temps, en dispersions des répétitions (référence ou mesure), en
+# deçà de laquelle aucun écart n'est signalé.
+NB_DISPERSIONS = 3
+
+# Options de recherche par défaut (voir sudoku.ajouterOptionsRecherche).
+RECHERCHE = {'representation': 'masques', 'piste': True, 'variable': 'mrv',
+             'valeur': 'lcv'}
+
+# Budget par défaut d'une résolution (sec.).
+TEMPS_MAX = 30.
+
+
+def lire_niveau(chemin, limite=None):
+    """Lignes des grilles d'un fichier texte (une par ligne) ou d'un corpus binaire."""
+    if chemin.endswith('.sdk'):
+        from corpus import Corpus, lignes
+        with Corpus(chemin) as c:
+            return list(lignes(c.grilles(0, limite)))
+    grilles = []
+    with open(chemin) as f:
+        for ligne in f:
+            ligne = ligne.rstrip('\r\n')
+            if ligne.strip() and not ligne.startswith('#'):
+                grilles.append(ligne.replace('\t', ',').split(',')[0])
+    return grilles[:limite]
+
+
+def niveaux(noms, corpus=(), limite=None):
+    """Dictionnaire niveau => lignes des grilles."""
+    resultat = {}
+    for nom in noms:
+        if NIVEAUX[nom] is None:
+            resultat[nom] = [sudoku.SudokuUtil.etat2ligne(
+                sudoku.SudokuUtil.generate(p)) for p in (None, 0, 1, 2, 3)][:limite]
+        else:
+            resultat[nom] = lire_niveau(
+                os.path.join(DOSSIER_GRILLES, NIVEAUX[nom]), limite)
+    for chemin in corpus:
+        nom = os.path.splitext(os.path.basename(chemin))[0]
+        resultat[nom] = lire_niveau(chemin, limite)
+    return resultat
+
+
+def resoudre(player, ligne, representation, options, budget=None):
+    """Résout une grille; retourne (résolue, Statistiques, budget épuisé)."""
+    stats = Statistiques()
+    options = dict(options, stats=stats)
+    if budget is not None:
+        options['budget'] = budget
+    joueur = sudoku.player_factory(player, representation, options)
+    etat = sudoku.SudokuUtil.ligne2etat(ligne)
+    etat = sudoku.etat_final(joueur(etat, sudoku.sudoku_but, None, None), etat)
+    return bool(sudoku.sudoku_but(etat)), stats, \
+        budget is not None and budget.epuise
+
+
+def mesurer(player, ligne, representation, options, memoire=True,
+            repetitions=5, budget=None):
+    """Mesures d'un joueur sur une grille (meilleur temps de 'repetitions')."""
+    durees = []
+    for _ in range(repetitions):
+        # Comme timeit: le ramasse-miettes ne dépend pas des grilles précédentes.
+        gc.collect()
+        gc.disable()
+        try:
+            debut = time.perf_counter()
+            resolue, stats, epuisee = resoudre(player, ligne, representation,
+                                               options, budget)
+            durees.append(time.perf_counter() - debut)
+        finally:
+            gc.enable()
+        if epuisee:
+            break  # Temps et noeuds ne mesurent que le budget.
+
+    pic = None
+    if memoire and not epuisee:
+        tracemalloc.start()
+        resoudre(player, ligne, representation, options)
+        pic = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'resolue': resolue,
+        'epuisee': epuisee,
+        'temps': min(durees),
+        'temps_dispersion': max(durees) - min(durees),
+        'noeuds': stats.noeuds,
+        'backtracks': stats.backtracks,
+        'memoire_pic': pic,
+    }
+
+
+def resumer(resultats):
+    """Totaux par joueur et par niveau."""
+    resume = {}
+    for r in resultats:
+        groupe = resume.setdefault(r['joueur'], {}).setdefault(r['niveau'], [])
+        groupe.append(r)
+    for player, par_niveau in resume.items():
+        for niveau, groupe in par_niveau.items():
+            pics = [r['memoire_pic'] for r in groupe if r['memoire_pic'] is not None]
+            par_niveau[niveau] = {
+                'grilles': len(groupe),
+                'resolues': sum(r['resolue'] for r in groupe),
+                'epuisees': sum(r.get('epuisee', False) for r in groupe),
+                'temps_total': sum(r['temps'] for r in groupe),
+                'temps_median': statistics.median(r['temps'] for r in groupe),
+                'noeuds': sum(r['noeuds'] for r in groupe),
+                'backtracks': sum(r['backtracks'] for r in groupe),
+                'memoire_max': max(pics) if pics else None,
+            }
+    return resume
+
+
+def comparer(resultats, reference, tolerance):
+    """Liste des régressions par rapport aux résultats de référence."""
+    anciens = dict(((r['joueur'], r['niveau'], r['grille']), r)
+                   for r in reference['resultats'])
+    regressions = []
+    for r in resultats:
+        ancien = anciens.get((r['joueur'], r['niveau'], r['grille']))
+        if ancien is None:
+            continue
+        ecarts = []
+        if ancien['resolue'] and not r['resolue']:
+            ecarts.append("budget épuisé" if r['epuisee']
+                          else "n'est plus résolue")
+        if r['epuisee'] or ancien.get('epuisee'):
+            if ecarts:
+                regressions.append("{0} [{1}] {2}: {3}".format(
+                    r['joueur'], r['niveau'], r['grille'], '; '.join(ecarts)))
+            continue
+        for cle in ('noeuds', 'backtracks'):
+            if r[cle] > ancien[cle]:
+                ecarts.append("{0} {1} -> {2}".format(cle, ancien[cle], r[cle]))
+        bruit = max(BRUIT_TEMPS, NB_DISPERSIONS * max(
+            ancien.get('temps_dispersion', 0.), r['temps_dispersion']))
+        if r['temps'] > ancien['temps'] * (1 + tolerance) \
+                and r['temps'] - ancien['temps'] > bruit:
+            ecarts.append("temps {0:0.4f} -> {1:0.4f} sec.".format(
+                ancien['temps'], r['temps']))
+        if r['memoire_pic'] is not None and ancien.get('memoire_pic') \
+                and r['memoire_pic'] > ancien['memoire_pic'] * (1 + tolerance):
+            ecarts.append("mémoire {0:0.0f} -> {1:0.0f} Ko".format(
+                ancien['memoire_pic'] / 1024., r['memoire_pic'] / 1024.))
+        if ecarts:
+            regressions.append("{0} [{1}] {2}: {3}".format(
+                r['joueur'], r['niveau'], r['grille'], '; '.join(ecarts)))
+    return regressions
+
+
+DESCRIPTION = "Mesurer les moteurs sur des niveaux de grilles et signaler " \
+              "les régressions par rapport à une référence."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('-joueurs', dest='players', metavar="JOUEUR", nargs='+',
+                   type=str, required=False,
+                   default=['dlx', 'solution_sudoku.py'],
+                   help="moteurs intégrés ou fichiers solution mesurés.")
+
+    p.add_argument('-niveaux', dest='niveaux', metavar="NIVEAU", nargs='*',
+                   type=str, required=False, default=list(NIVEAUX),
+                   choices=list(NIVEAUX),
+                   help="niveaux de grilles fournis.")
+
+    p.add_argument('-corpus', dest='corpus', metavar="FICHIER", nargs='+',
+                   type=str, required=False, default=[],
+                   help="niveaux supplémentaires: fichiers texte (une grille "
+                        "par ligne) ou corpus binaires (.sdk).")
+
+    p.add_argument('-limite', dest='limite', metavar="INT", action='store',
+                   type=int, required=False,
+                   help="nombre maximal de grilles par niveau.")
+
+    sudoku.ajouterOptionsRecherche(p)
+    sudoku.ajouterOptionsBudget(p)
+    p.set_defaults(temps_max=TEMPS_MAX, **RECHERCHE)
+
+    p.add_argument('-copie', dest='piste', action='store_false', required=False,
+                   help="copier le CSP à chaque coup au lieu de la piste.")
+
+    p.add_argument('-repetitions', dest='repetitions', metavar="INT",
+                   action='store', type=int, required=False, default=5,
+                   help="résolutions chronométrées par grille (le meilleur "
+                        "temps est retenu, leur dispersion sert de bruit).")
+
+    p.add_argument('-sans_memoire', dest='memoire', action='store_false',
+                   required=False,
+                   help="ne pas mesurer le pic de mémoire (une résolution de "
+                        "moins par grille).")
+
+    p.add_argument('-json', dest='json_file', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="fichier JSON où écrire les résultats.")
+
+    p.add_argument('-reference', dest='reference', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="résultats de référence (JSON écrit par -json).")
+
+    p.add_argument('-tolerance', dest='tolerance', metavar="FLOAT",
+                   action='store', type=float, required=False, default=0.25,
+                   help="hausse relative tolérée du temps et de la mémoire.")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    for player in args.players:
+        if not player.endswith('.py') and player not in sudoku.SOLVEURS_INTEGRES:
+            parser.error('Joueur doit être un moteur intégré ({0}) ou un fichier '
+                         '.py (ex. solution_sudoku.py)'.format(
+                             ', '.join(sudoku.SOLVEURS_INTEGRES)))
+
+    options = sudoku.optionsRecherche(args)
+    if args.temps_max is not None and args.temps_max <= 0:
+        args.temps_max = None
+    budget = sudoku.budgetRecherche(args)
+    limites = {'temps': args.temps_max, 'noeuds': args.noeuds_max}
+    reference = None
+    if args.reference:
+        with open(args.reference) as f:
+            reference = json.load(f)
+        if reference['options'] != options \
+                or reference['representation'] != args.representation \
+                or reference.get('budget', limites) != limites:
+            parser.error("Options de recherche différentes de la référence: "
+                         "{0} ({1}, budget {2})".format(
+                             reference['options'], reference['representation'],
+                             reference.get('budget')))
+
+    grilles = niveaux(args.niveaux, args.corpus, args.limite)
+
+    print("{0:>20} {1:>10} {2:>8} {3:>8} {4:>11} {5:>11} {6:>9} {7:>10} "
+          "{8:>10}".format('joueur', 'niveau', 'résolues', 'épuisées',
+                           'temps (s)', 'médiane (s)', 'noeuds', 'backtracks',
+                           'mém. (Ko)'))
+    resultats = []
+    premiere = next((l[0] for l in grilles.values() if l), None)
+    for player in args.players:
+        options_joueur = sudoku.optionsJoueur(player, options)
+        if premiere is not None:
+            resoudre(player, premiere, args.representation, options_joueur,
+                     budget)
+        for niveau, lignes in grilles.items():
+            groupe = []
+            for ligne in lignes:
+                m = mesurer(player, ligne, args.representation, options_joueur,
+                            args.memoire, args.repetitions, budget)
+                m.update(joueur=player, niveau=niveau, grille=ligne)
+                groupe.append(m)
+            resultats.extend(groupe)
+            if not groupe:
+                continue
+            r = resumer(groupe)[player][niveau]
+            print("{0:>20} {1:>10} {2:>8} {3:>8} {4:>11.4f} {5:>11.4f} {6:>9} "
+                  "{7:>10} {8:>10}".format(
+                      player, niveau,
+                      "{0}/{1}".format(r['resolues'], r['grilles']),
+                      r['epuisees'], r['temps_total'], r['temps_median'],
+                      r['noeuds'], r['backtracks'],
+                      '-' if r['memoire_max'] is None
+                      else "{0:0.0f}".format(r['memoire_max'] / 1024.)))
+            sys.stdout.flush()
+
+    if args.json_file:
+        with open(args.json_file, 'w') as f:
+            json.dump({'options': options,
+                       'representation': args.representation,
+                       'budget': limites,
+                       'resume': resumer(resultats),
+                       'resultats': resultats}, f, indent=2)
+
+    if reference is not None:
+        regressions = comparer(resultats, reference, args.tolerance)
+        print("\n{0} régression(s) par rapport à {1}".format(
+            len(regressions), args.reference))
+        for r in regressions:
+            print("* " + r)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Budget d'une recherche: durée et nombre de noeuds au-delà desquels
+# backtracking_search abandonne la grille (option 'budget').
+#
+# Le budget est vérifié par le rappel échantillonné de Statistiques (toutes
+# les 'periode' noeuds): la boucle de recherche ne fait aucun test de plus.
+# Une fois épuisé, BudgetEpuise interrompt la recherche et le budget garde
+# le résultat partiel: l'affectation cohérente la plus profonde observée
+# et les domaines propagés à partir d'elle. La grille peut alors être
+# reprise par un autre moteur (voir sudoku_batch.py, option -secours).
+###
+
+import math
+import time
+
+from statistiques import Statistiques
+
+# Statuts d'une recherche avec budget.
+RESOLUE = 'resolue'
+IMPOSSIBLE = 'impossible'
+EPUISE = 'epuise'
+
+
+class BudgetEpuise(Exception):
+    """Levée par le rappel de Statistiques quand le budget est épuisé."""
+
+
+class Budget:
+    """
+    Limites d'une recherche et résultat de la dernière recherche.
+
+    temps: durée maximale (sec.), ou None.
+    noeuds: nombre maximal de noeuds (coups), ou None.
+    periode: noeuds entre deux vérifications; le temps et les noeuds
+             peuvent dépasser la limite d'au plus 'periode' noeuds.
+
+    Rempli par backtracking_search (le même budget sert à plusieurs
+    recherches successives; seule la dernière est gardée):
+    statut: RESOLUE, IMPOSSIBLE ou EPUISE; None si le moteur ignore le budget.
+    partielle: affectations (case => valeur) de la branche la plus profonde
+               observée aux vérifications, cohérente après propagation; la
+               solution si la grille est résolue.
+    domaines: domaines (case => liste de valeurs) propagés à partir de
+              'partielle' (statut EPUISE), ou None.
+    stats: objet Statistiques de la recherche (créé si elle n'en avait pas).
+    """
+
+    def __init__(self, temps=None, noeuds=None, periode=16):
+        self.temps = temps
+        self.noeuds = noeuds
+        self.periode = periode
+        self.statut = None
+        self.partielle = {}
+        self.domaines = None
+        self.stats = None
+        self._assignations = None
+        self._echeance = None
+        self._noeuds_max = None
+        self._rappel = None
+
+    def __getstate__(self):
+        # Limites seulement: le budget est transmis aux processus de sudoku_batch.
+        return {'temps': self.temps, 'noeuds': self.noeuds,
+                'periode': self.periode}
+
+    def __setstate__(self, etat):
+        self.__init__(**etat)
+
+    @property
+    def epuise(self):
+        return self.statut == EPUISE
+
+    def reinitialiser(self):
+        """
+        Oublie le résultat de la dernière recherche (statut None). À appeler
+        avant chaque grille quand la recherche peut ne pas avoir lieu (cache).
+        """
+        self.statut = None
+        self.partielle = {}
+        self.domaines = None
+        self.stats = None
+
+    def demarrer(self, stats, assignations):
+        """
+        Commence une recherche sur 'assignations' (dict, ou liste des rangées
+        de dlx, complété en place). Retourne l'objet Statistiques surveillé
+        ('stats', ou un nouvel objet).
+        """
+        if stats is None:
+            stats = Statistiques()
+        self.reinitialiser()
+        self.stats = stats
+        self._assignations = assignations
+        self._echeance = None if self.temps is None \
+            else time.perf_counter() + self.temps
+        self._noeuds_max = None if self.noeuds is None \
+            else stats.noeuds + self.noeuds
+
+        # Le rappel déjà installé reste appelé à sa propre période.
+        self._rappel = (stats.rappel, stats.periode)
+        if stats.rappel is not None:
+            stats.periode = math.gcd(stats.periode, self.periode)
+        else:
+            stats.periode = self.periode
+        stats.rappel = self._verifier
+        return stats
+
+    def _verifier(self, stats):
+        if len(self._assignations) > len(self.partielle):
+            self.partielle = self._assignations.copy()
+        rappel, periode = self._rappel
+        if rappel is not None and stats.noeuds % periode == 0:
+            rappel(stats)
+        if self._noeuds_max is not None and stats.noeuds >= self._noeuds_max \
+                or self._echeance is not None \
+                and time.perf_counter() >= self._echeance:
+            raise BudgetEpuise()
+
+    def terminer(self, stats, statut, partielle=None, domaines=None):
+        """Retire le rappel du budget et note le résultat de la recherche."""
+        stats.rappel, stats.periode = self._rappel
+        self._assignations = self._rappel = None
+        self.statut = statut
+        if partielle is not None:
+            self.partielle = partielle
+        self.domaines = domaines
+
+    def resultat(self):
+        """Résultat structuré de la dernière recherche."""
+        return {
+            'statut': self.statut,
+            'assignations': dict(self.partielle),
+            'domaines': self.domaines,
+            'stats': self.stats.en_dict() if self.stats is not None else None,
+        }
+
+    def __repr__(self):
+        return "Budget(temps={0}, noeuds={1}, statut={2})".format(
+            self.temps, self.noeuds, self.statut)
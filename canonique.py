@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Forme canonique d'une grille et cache de solutions.
+#
+# Deux grilles sont équivalentes si l'une s'obtient de l'autre par une
+# transposition, une permutation des lignes à l'intérieur de chaque bande,
+# une permutation des colonnes à l'intérieur de chaque pile et un
+# renommage des chiffres. La forme canonique est la plus petite (ordre
+# lexicographique) des 2 x 216 x 216 variantes, chiffres renommés dans leur
+# ordre d'apparition (0 reste la case vide); toutes les grilles équivalentes
+# ont la même.
+#
+# CacheSolutions associe la solution d'une forme canonique à sa clé et
+# ramène cette solution vers la grille demandée par la transformation
+# inverse. Le calcul de la forme canonique coûte plus qu'une résolution par
+# dlx: une grille déjà vue telle quelle est d'abord cherchée par ses octets.
+###
+
+import os
+import pickle
+
+from collections import OrderedDict, namedtuple
+from itertools import permutations
+
+import numpy as np
+
+# Les 216 permutations de lignes (ou de colonnes) qui préservent les bandes.
+PERMUTATIONS = np.array([a + b + c for a in permutations((0, 1, 2))
+                         for b in permutations((3, 4, 5))
+                         for c in permutations((6, 7, 8))])
+
+Transformation = namedtuple(
+    'Transformation', ['transposee', 'lignes', 'colonnes', 'etiquettes'])
+
+
+def canonique(tableau):
+    """
+    Forme canonique d'un tableau (9, 9) d'entiers (0 = vide).
+
+    Retourne un tuple (forme (9, 9) uint8, Transformation) tel que
+    appliquer(tableau, transformation) donne la forme.
+
+    Les variantes sont construites case par case, en ordre de lecture, et
+    seules celles dont le préfixe renommé est minimal sont conservées: après
+    quelques cases, il ne reste en général qu'une poignée de candidates.
+    """
+    tableau = np.asarray(tableau, dtype=np.uint8)
+    bases = np.stack([tableau, tableau.T])
+    n = len(PERMUTATIONS)
+
+    # Candidates: (transposée, permutation de lignes, permutation de colonnes).
+    t = np.repeat(np.arange(2), n * n)
+    l = np.tile(np.repeat(np.arange(n), n), 2)
+    c = np.tile(np.arange(n), 2 * n)
+    etiquettes = np.zeros((len(t), 10), dtype=np.uint8)
+    suivante = np.ones(len(t), dtype=np.uint8)
+
+    forme = np.zeros(81, dtype=np.uint8)
+    for i in range(9):
+        for j in range(9):
+            v = bases[t, PERMUTATIONS[l, i], PERMUTATIONS[c, j]]
+            e = etiquettes[np.arange(len(v)), v]
+            nouveau = (v != 0) & (e == 0)
+            e = np.where(nouveau, suivante, e)
+
+            forme[i * 9 + j] = minimum = e.min()
+            garder = e == minimum
+            t, l, c, v, e, nouveau = (x[garder] for x in (t, l, c, v, e, nouveau))
+            etiquettes, suivante = etiquettes[garder], suivante[garder]
+            etiquettes[nouveau, v[nouveau]] = e[nouveau]
+            suivante += nouveau
+
+    # Les chiffres absents de la grille reçoivent les dernières étiquettes.
+    etiquettes = etiquettes[0]
+    absents = [d for d in range(1, 10) if not etiquettes[d]]
+    etiquettes[absents] = np.arange(suivante[0], 10)
+
+    return forme.reshape(9, 9), Transformation(
+        bool(t[0]), PERMUTATIONS[l[0]], PERMUTATIONS[c[0]], etiquettes)
+
+
+def appliquer(tableau, transformation):
+    """Applique une transformation à un tableau (9, 9)."""
+    t = np.asarray(tableau, dtype=np.uint8)
+    if transformation.transposee:
+        t = t.T
+    t = t[np.ix_(transformation.lignes, transformation.colonnes)]
+    return transformation.etiquettes[t]
+
+
+def inverser(tableau, transformation):
+    """Ramène un tableau (9, 9) transformé vers la grille d'origine."""
+    inverse = np.zeros(10, dtype=np.uint8)
+    inverse[transformation.etiquettes] = np.arange(10, dtype=np.uint8)
+    t = np.empty((9, 9), dtype=np.uint8)
+    t[np.ix_(transformation.lignes, transformation.colonnes)] = \
+        inverse[np.asarray(tableau, dtype=np.uint8)]
+    return t.T.copy() if transformation.transposee else t
+
+
+class CacheSolutions:
+    """
+    Cache LRU des solutions, indexé par la forme canonique des grilles.
+
+    capacite: nombre maximal de solutions conservées.
+    fichier: fichier de persistance (pickle), lu à la création s'il existe et
+             écrit par sauvegarder(); None pour un cache en mémoire seulement.
+    """
+
+    def __init__(self, capacite=10000, fichier=None):
+        self.capacite = capacite
+        self.fichier = fichier
+        self.solutions = OrderedDict()
+        # Grilles déjà vues telles quelles (octets) => octets de leur solution.
+        self.exactes = OrderedDict()
+        self.succes = 0
+        self.echecs = 0
+        if fichier is not None and os.path.isfile(fichier):
+            with open(fichier, 'rb') as f:
+                self.solutions.update(pickle.load(f))  # Du plus ancien au plus récent.
+            self._evincer()
+
+    def _evincer(self):
+        while len(self.solutions) > self.capacite:
+            self.solutions.popitem(last=False)
+        while len(self.exactes) > self.capacite:
+            self.exactes.popitem(last=False)
+
+    def _retenir(self, brute, solution):
+        self.exactes[brute] = solution.tobytes()
+        self.exactes.move_to_end(brute)
+        self._evincer()
+
+    def chercher(self, tableau):
+        """
+        Solution (9, 9) d'une grille, ou None si elle n'est pas en cache.
+
+        Retourne aussi la clé et la transformation de la grille pour ajouter()
+        (None si la grille a été trouvée telle quelle, sans forme canonique).
+        """
+        tableau = np.asarray(tableau, dtype=np.uint8)
+        brute = tableau.tobytes()
+        solution = self.exactes.get(brute)
+        if solution is not None:
+            self.succes += 1
+            self.exactes.move_to_end(brute)
+            return np.frombuffer(solution, dtype=np.uint8).reshape(9, 9).copy(), \
+                None, None
+
+        forme, transformation = canonique(tableau)
+        cle = forme.tobytes()
+        solution = self.solutions.get(cle)
+        if solution is None:
+            self.echecs += 1
+            return None, cle, transformation
+
+        self.succes += 1
+        self.solutions.move_to_end(cle)
+        solution = inverser(np.frombuffer(solution, dtype=np.uint8).reshape(9, 9),
+                            transformation)
+        self._retenir(brute, solution)
+        return solution, cle, transformation
+
+    def ajouter(self, cle, transformation, solution):
+        """Conserve la solution (9, 9) de la grille de clé 'cle'."""
+        self.solutions[cle] = appliquer(solution, transformation).tobytes()
+        self.solutions.move_to_end(cle)
+        # La grille d'origine est la forme canonique ramenée par la transformation.
+        forme = np.frombuffer(cle, dtype=np.uint8).reshape(9, 9)
+        self._retenir(inverser(forme, transformation).tobytes(),
+                      np.asarray(solution, dtype=np.uint8))
+
+    def taux_succes(self):
+        total = self.succes + self.echecs
+        return self.succes / total if total else 0.
+
+    def sauvegarder(self, fichier=None):
+        fichier = fichier or self.fichier
+        with open(fichier, 'wb') as f:
+            pickle.dump(list(self.solutions.items()), f)
+
+    def __len__(self):
+        return len(self.solutions)
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Corpus de grilles en binaire compact, lu par projection en mémoire (mmap).
+#
+# Format (little-endian), version 1:
+#   En-tête (64 octets): magie b'SDKC', version (u16), ordre (u8),
+#       drapeaux (u8: 1 = solutions, 2 = métadonnées), nombre de grilles
+#       (u64), octets par grille (u32), début des métadonnées (u64), début
+#       de l'index (u64); le reste est nul.
+#   Enregistrements (à partir de l'octet 64), un par grille, de taille fixe:
+#       la grille, suivie de sa solution si le drapeau 1 est présent. Une
+#       grille occupe 4 bits par case, en ordre ligne par ligne: la case 2k
+#       dans les bits forts de l'octet k, la case 2k+1 dans les bits faibles
+#       (0 = vide). Une grille 9x9 tient en 41 octets.
+#   Métadonnées (drapeau 2): un objet JSON UTF-8 par grille, mis bout à bout.
+#   Index (drapeau 2, aligné sur 8 octets): nombre + 1 positions (u64) des
+#       métadonnées de chaque grille, relatives au début des métadonnées.
+#
+# Les valeurs tiennent sur 4 bits: le format est limité aux ordres 2 et 3.
+#
+# Le lecteur (Corpus) projette le fichier en mémoire: l'ouverture ne lit que
+# l'en-tête, et les enregistrements compressés sont exposés sans copie
+# (Corpus.paquets). Seules les grilles demandées sont décompressées, d'un
+# bloc pour une tranche. Les pages projetées sont partagées par tous les
+# processus qui ouvrent le même fichier; un Corpus passé à un processus
+# (pickle) est rouvert par son chemin, sans copier les données.
+###
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+
+import numpy as np
+
+import grille
+
+MAGIE = b'SDKC'
+VERSION = 1
+EN_TETE = struct.Struct('<4sHBBQIQQ')
+TAILLE_EN_TETE = 64
+
+SOLUTIONS = 1
+METADONNEES = 2
+
+# Ordres dont les valeurs (0 à N) tiennent sur 4 bits.
+ORDRES = (2, 3)
+
+
+def octets_grille(ordre):
+    """Nombre d'octets d'une grille compressée."""
+    return (ordre ** 4 + 1) // 2
+
+
+def compresser(tableaux):
+    """Grilles (G, N, N) ou (G, N²) d'entiers 0-15 => tableau (G, octets) uint8."""
+    tableaux = np.asarray(tableaux, dtype=np.uint8)
+    cases = tableaux.reshape(len(tableaux), -1)
+    if cases.shape[1] % 2:
+        cases = np.concatenate(
+            [cases, np.zeros((len(cases), 1), dtype=np.uint8)], axis=1)
+    if len(cases) and cases.max() > 15:
+        raise ValueError("Valeur de case hors de 4 bits.")
+    return (cases[:, 0::2] << 4) | cases[:, 1::2]
+
+
+def decompresser(paquets, ordre=3):
+    """Inverse de compresser: tableau (G, octets) => grilles (G, N, N) uint8."""
+    paquets = np.asarray(paquets, dtype=np.uint8)
+    taille = ordre * ordre
+    cases = np.empty((len(paquets), 2 * paquets.shape[1]), dtype=np.uint8)
+    cases[:, 0::2] = paquets >> 4
+    cases[:, 1::2] = paquets & 0x0F
+    return cases[:, :taille * taille].reshape(len(paquets), taille, taille)
+
+
+def _aligner(position, alignement=8):
+    return -(-position // alignement) * alignement
+
+
+class EcrivainCorpus:
+    """
+    Écrit un corpus en flux: les grilles sont écrites à mesure qu'elles sont
+    ajoutées; les métadonnées et l'index le sont à la fermeture.
+
+    solutions: chaque grille est accompagnée de sa solution.
+    metadonnees: chaque grille peut être accompagnée d'un dict (JSON).
+    """
+
+    def __init__(self, chemin, ordre=3, solutions=False, metadonnees=False):
+        if ordre not in ORDRES:
+            raise ValueError("Le format compact est limité aux ordres {0} "
+                             "(4 bits par case).".format(ORDRES))
+        self.ordre = ordre
+        self.solutions = solutions
+        self.metadonnees = [] if metadonnees else None
+        self.nombre = 0
+        self._fichier = open(chemin, 'wb')
+        self._fichier.write(bytes(TAILLE_EN_TETE))
+
+    def ajouter(self, tableau, solution=None, metadonnees=None):
+        """Ajoute une grille (N, N) d'entiers, sa solution et ses métadonnées."""
+        self.ajouter_lot([tableau], None if solution is None else [solution],
+                         None if metadonnees is None else [metadonnees])
+
+    def ajouter_lot(self, tableaux, solutions=None, metadonnees=None):
+        """Ajoute des grilles (G, N, N), leurs solutions et leurs métadonnées."""
+        taille = self.ordre * self.ordre
+        tableaux = np.asarray(tableaux, dtype=np.uint8).reshape(-1, taille * taille)
+        paquets = compresser(tableaux)
+        if self.solutions:
+            if solutions is None:
+                raise ValueError("Ce corpus exige les solutions.")
+            solutions = np.asarray(solutions, dtype=np.uint8)
+            paquets = np.concatenate(
+                [paquets, compresser(solutions.reshape(len(tableaux), -1))], axis=1)
+        self._fichier.write(paquets.tobytes())
+
+        if self.metadonnees is not None:
+            for m in (metadonnees or [None] * len(tableaux)):
+                self.metadonnees.append(
+                    b'' if m is None else json.dumps(m).encode('utf-8'))
+        self.nombre += len(tableaux)
+
+    def fermer(self):
+        if self._fichier.closed:
+            return
+        drapeaux = SOLUTIONS if self.solutions else 0
+        debut_metadonnees = debut_index = 0
+        if self.metadonnees is not None:
+            drapeaux |= METADONNEES
+            debut_metadonnees = self._fichier.tell()
+            positions = np.zeros(self.nombre + 1, dtype='<u8')
+            np.cumsum([len(m) for m in self.metadonnees], out=positions[1:])
+            self._fichier.write(b''.join(self.metadonnees))
+            debut_index = _aligner(self._fichier.tell())
+            self._fichier.write(bytes(debut_index - self._fichier.tell()))
+            self._fichier.write(positions.tobytes())
+
+        self._fichier.seek(0)
+        self._fichier.write(EN_TETE.pack(
+            MAGIE, VERSION, self.ordre, drapeaux, self.nombre,
+            octets_grille(self.ordre), debut_metadonnees, debut_index))
+        self._fichier.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+class Corpus:
+    """
+    Lecture d'un corpus projeté en mémoire.
+
+    paquets: grilles compressées (nombre, octets), vue sans copie du fichier.
+    paquets_solutions: idem pour les solutions, ou None.
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        with open(chemin, 'rb') as f:
+            taille_fichier = f.seek(0, 2)
+            if taille_fichier < TAILLE_EN_TETE:
+                raise ValueError("Pas un corpus de grilles: {0}".format(chemin))
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magie, version, self.ordre, drapeaux, self.nombre, octets,
+         self._debut_metadonnees, self._debut_index) = \
+            EN_TETE.unpack_from(self._mmap, 0)
+        if magie != MAGIE:
+            raise ValueError("Pas un corpus de grilles: {0}".format(chemin))
+        if version != VERSION:
+            raise ValueError("Version de corpus non supportée: {0}".format(version))
+        if self.ordre not in ORDRES or octets != octets_grille(self.ordre):
+            raise ValueError("En-tête de corpus invalide: {0}".format(chemin))
+
+        self.taille = self.ordre * self.ordre
+        par_grille = 2 if drapeaux & SOLUTIONS else 1
+        enregistrements = np.frombuffer(
+            self._mmap, dtype=np.uint8, count=self.nombre * par_grille * octets,
+            offset=TAILLE_EN_TETE).reshape(self.nombre, par_grille, octets)
+        self.paquets = enregistrements[:, 0]
+        self.paquets_solutions = enregistrements[:, 1] if par_grille == 2 else None
+
+        self._index = None
+        if drapeaux & METADONNEES:
+            self._index = np.frombuffer(self._mmap, dtype='<u8',
+                                        count=self.nombre + 1,
+                                        offset=self._debut_index)
+
+    def __len__(self):
+        return self.nombre
+
+    def grille(self, i):
+        """Grille i (N, N) uint8."""
+        return decompresser(self.paquets[i:i + 1], self.ordre)[0]
+
+    def grilles(self, debut=0, fin=None):
+        """Grilles debut à fin (G, N, N) uint8, décompressées d'un bloc."""
+        return decompresser(self.paquets[debut:fin], self.ordre)
+
+    def solution(self, i):
+        """Solution de la grille i (N, N), ou None si le corpus n'en a pas."""
+        if self.paquets_solutions is None:
+            return None
+        return decompresser(self.paquets_solutions[i:i + 1], self.ordre)[0]
+
+    def solutions(self, debut=0, fin=None):
+        if self.paquets_solutions is None:
+            return None
+        return decompresser(self.paquets_solutions[debut:fin], self.ordre)
+
+    def metadonnees(self, i):
+        """Métadonnées (dict) de la grille i, ou None."""
+        if self._index is None:
+            return None
+        debut, fin = (self._debut_metadonnees + int(p)
+                      for p in self._index[i:i + 2])
+        return json.loads(self._mmap[debut:fin]) if fin > debut else None
+
+    def tranches(self, taille=1024):
+        """Itère sur (debut, grilles (G, N, N)) par tranches de 'taille' grilles."""
+        for debut in range(0, self.nombre, taille):
+            yield debut, self.grilles(debut, debut + taille)
+
+    def __iter__(self):
+        """Grilles une à une: vues des tranches décompressées."""
+        for _, grilles in self.tranches():
+            yield from grilles
+
+    def fermer(self):
+        # Les vues NumPy gardent la projection vivante jusqu'à leur libération.
+        self.paquets = self.paquets_solutions = self._index = None
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+    def __getstate__(self):
+        return {'chemin': self.chemin}
+
+    def __setstate__(self, etat):
+        self.__init__(etat['chemin'])
+
+
+def importer(lignes, chemin, ordre=3, solutions=False, lot=4096):
+    """
+    Écrit un corpus à partir de lignes de texte.
+
+    Chaque ligne contient une grille (format de sudoku.SudokuUtil.convertir),
+    suivie de sa solution après une virgule ou une tabulation si 'solutions'.
+    Les lignes vides ou commençant par '#' sont ignorées.
+
+    Retourne le nombre de grilles écrites.
+    """
+    from sudoku import SudokuUtil
+
+    def convertir(texte, numero):
+        try:
+            return SudokuUtil.convertir(texte, ordre)
+        except ValueError as e:
+            raise ValueError("Ligne {0}: {1}".format(numero, e))
+
+    with EcrivainCorpus(chemin, ordre, solutions) as ecrivain:
+        tableaux, resolues = [], []
+        for numero, ligne in enumerate(lignes, 1):
+            ligne = ligne.rstrip('\r\n')
+            if not ligne.strip() or ligne.startswith('#'):
+                continue
+            champs = ligne.replace('\t', ',').split(',')
+            tableaux.append(convertir(champs[0], numero))
+            if solutions:
+                if len(champs) < 2:
+                    raise ValueError("Ligne {0}: solution manquante".format(numero))
+                resolues.append(convertir(champs[1], numero))
+            if len(tableaux) == lot:
+                ecrivain.ajouter_lot(tableaux, resolues if solutions else None)
+                tableaux, resolues = [], []
+        if tableaux:
+            ecrivain.ajouter_lot(tableaux, resolues if solutions else None)
+        return ecrivain.nombre
+
+
+def lignes(grilles):
+    """Grilles (G, N, N) => lignes d'un symbole par case ('.' si vide)."""
+    symboles = np.frombuffer(('.' + grille.SYMBOLES).encode('ascii'), dtype='S1')
+    for g in symboles[grilles.reshape(len(grilles), -1)]:
+        yield g.tobytes().decode('ascii')
+
+
+DESCRIPTION = "Créer, décrire ou exporter un corpus binaire de grilles."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('action', choices=['importer', 'info', 'exporter'],
+                   help="importer: texte => corpus; info: décrire un corpus; "
+                        "exporter: corpus => une grille par ligne.")
+
+    p.add_argument('corpus', metavar="CORPUS",
+                   help="fichier corpus.")
+
+    p.add_argument('entree', metavar="FICHIER", nargs='?', default='-',
+                   help="fichier texte à importer ('-' pour l'entrée standard).")
+
+    p.add_argument('-ordre', dest='ordre', metavar="INT", action='store',
+                   type=int, required=False, default=3, choices=ORDRES,
+                   help="ordre des grilles importées.")
+
+    p.add_argument('-solutions', dest='solutions', action='store_true',
+                   required=False,
+                   help="importer (ou exporter) aussi les solutions.")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    if args.action == 'importer':
+        entree = sys.stdin if args.entree == '-' else open(args.entree)
+        nombre = importer(entree, args.corpus, args.ordre, args.solutions)
+        print("{0} grilles écrites dans {1}".format(nombre, args.corpus),
+              file=sys.stderr)
+        return
+
+    with Corpus(args.corpus) as corpus:
+        if args.action == 'info':
+            print("Grilles: {0} ({1}x{1})".format(len(corpus), corpus.taille))
+            print("Solutions: {0}".format(
+                'oui' if corpus.paquets_solutions is not None else 'non'))
+            print("Métadonnées: {0}".format(
+                'oui' if corpus._index is not None else 'non'))
+            return
+
+        if args.solutions and corpus.paquets_solutions is None:
+            parser.error("Ce corpus n'a pas de solutions.")
+        for debut, grilles in corpus.tranches():
+            if args.solutions:
+                resolues = corpus.solutions(debut, debut + len(grilles))
+                for g, s in zip(lignes(grilles), lignes(resolues)):
+                    sys.stdout.write(g + "," + s + "\n")
+            else:
+                for g in lignes(grilles):
+                    sys.stdout.write(g + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Problème de satisfaction de contraintes d'une grille (domaines en listes).
+#
+# Sans dépendance à NumPy ni à sudoku.py: les moteurs de résolution et le
+# chemin de démarrage rapide (rapide.py) n'ont besoin que de ce module et de
+# grille.py. La classe reste accessible sous le nom sudoku.CSP.
+###
+
+import copy
+
+import grille
+
+
+class CSP:
+    def __init__(self, variables, domaines, contraintes):
+        self.variables = variables
+        self.domaines = domaines
+        self.contraintes = contraintes
+        # Pile des retraits de valeurs (mode piste), None si inactive.
+        self.piste = None
+
+    def arcs(self):
+        index = grille.index_pour(len(self.contraintes))
+        if index is not None and self.contraintes is index.contraintes:
+            return list(index.arcs)
+        return [(Xi, Xj) for Xi in self.contraintes
+                for Xj in self.contraintes[Xi]]
+
+    def copy(self):
+        return CSP(
+            self.variables, copy.deepcopy(self.domaines), self.contraintes)
+
+    def __eq__(self, autre):
+        return all([v1 == v2
+                    for v1, v2
+                    in zip(self.variables, autre.variables)]) \
+            and all([v1 == v2
+                     for v in self.variables
+                     for v1, v2 in zip(self.domaines[v], autre.domaines[v])]) \
+            and all([c1 == c2
+                     for v in self.variables
+                     for c1, c2 in zip(
+                         self.contraintes[v], autre.contraintes[v])])
+
+    def __ne__(self, autre):
+        return not self == autre
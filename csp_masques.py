@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Représentation compacte du CSP de sudoku.
+#
+# Chaque domaine est un masque de 9 bits (bit k-1 <=> valeur k) conservé
+# dans un tableau plat indexé par le numéro de case (y*9 + x). La copie d'un
+# état de recherche se résume à la copie de ce tableau de 81 entiers.
+#
+# La classe DomainesMasques expose ces masques avec l'interface du dict
+# 'domaines' de sudoku.CSP (case => liste de valeurs b'1'..b'9'), afin que
+# 'reviser', 'AC3' et 'backtrack' fonctionnent sans modification.
+###
+
+from array import array
+from collections.abc import MutableMapping
+
+import grille
+
+TOUS = 0x1FF  # Les 9 valeurs possibles.
+
+VALEURS = tuple(bytes(str(k), 'utf-8') for k in range(1, 10))
+
+# Masque associé à chaque valeur (b'1' => 0b1, ..., b'9' => 0b100000000).
+BITS = dict((v, 1 << k) for k, v in enumerate(VALEURS))
+
+# Tables précalculées pour les 512 masques possibles.
+NB_VALEURS = bytes(bin(m).count('1') for m in range(TOUS + 1))
+VALEURS_MASQUE = tuple(tuple(v for k, v in enumerate(VALEURS) if m >> k & 1)
+                       for m in range(TOUS + 1))
+
+
+def nb_valeurs(masque):
+    """Nombre de valeurs (popcount) d'un masque."""
+    return NB_VALEURS[masque]
+
+
+def bit_bas(masque):
+    """Bit de poids le plus faible d'un masque (0 si le masque est vide)."""
+    return masque & -masque
+
+
+def valeur_bas(masque):
+    """Plus petite valeur (1-9) d'un masque, 0 si le masque est vide."""
+    return (masque & -masque).bit_length()
+
+
+def masque(valeurs):
+    """Masque correspondant à une séquence de valeurs b'1'..b'9'."""
+    m = 0
+    for v in valeurs:
+        m |= BITS[v]
+    return m
+
+
+def case(X):
+    """Numéro de case (0-80) d'une coordonnée (Y,X)."""
+    return X[0] * 9 + X[1]
+
+
+class DomaineMasque:
+    """Vue d'un domaine se comportant comme une liste de valeurs."""
+    __slots__ = ('masques', 'case')
+
+    def __init__(self, masques, case):
+        self.masques = masques
+        self.case = case
+
+    def __iter__(self):
+        return iter(VALEURS_MASQUE[self.masques[self.case]])
+
+    def __len__(self):
+        return NB_VALEURS[self.masques[self.case]]
+
+    def __getitem__(self, i):
+        return VALEURS_MASQUE[self.masques[self.case]][i]
+
+    def __contains__(self, valeur):
+        return bool(self.masques[self.case] & BITS.get(valeur, 0))
+
+    def index(self, valeur):
+        return VALEURS_MASQUE[self.masques[self.case]].index(valeur)
+
+    def remove(self, valeur):
+        bit = BITS.get(valeur, 0)
+        if not self.masques[self.case] & bit:
+            raise ValueError("{0} n'est pas dans le domaine".format(valeur))
+        self.masques[self.case] &= ~bit
+
+    def append(self, valeur):
+        self.masques[self.case] |= BITS[valeur]
+
+    def insert(self, i, valeur):
+        # L'ordre des valeurs est fixé par le masque.
+        self.masques[self.case] |= BITS[valeur]
+
+    def __eq__(self, autre):
+        return list(self) == list(autre)
+
+    def __ne__(self, autre):
+        return not self == autre
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class DomainesMasques(MutableMapping):
+    """Adaptateur dict (Y,X) => domaine au-dessus du tableau de masques."""
+    __slots__ = ('variables', 'masques')
+
+    def __init__(self, variables, masques):
+        self.variables = variables
+        self.masques = masques
+
+    def __getitem__(self, X):
+        return DomaineMasque(self.masques, case(X))
+
+    def __setitem__(self, X, valeurs):
+        self.masques[case(X)] = masque(valeurs)
+
+    def __delitem__(self, X):
+        raise TypeError("Les domaines d'un CSP ne peuvent être supprimés.")
+
+    def __iter__(self):
+        return iter(self.variables)
+
+    def __len__(self):
+        return len(self.variables)
+
+
+class CSPMasques:
+    def __init__(self, variables, masques, contraintes):
+        self.variables = variables
+        self.masques = masques
+        self.contraintes = contraintes
+        self.domaines = DomainesMasques(variables, masques)
+        # Pile des retraits de valeurs (mode piste), None si inactive.
+        self.piste = None
+        # Domaines arc-consistants (voir solution_sudoku.AC3): True, ou
+        # (indice, entrée) de la piste à partir de laquelle ils le sont;
+        # None si aucune propagation complète n'a eu lieu.
+        self.propagee = None
+
+    @staticmethod
+    def depuis_csp(csp):
+        """Convertit un sudoku.CSP en CSPMasques."""
+        masques = array('H', bytes(2 * 81))
+        for X in csp.variables:
+            masques[case(X)] = masque(csp.domaines[X])
+        return CSPMasques(csp.variables, masques, csp.contraintes)
+
+    def arcs(self):
+        if self.contraintes is grille.CONTRAINTES:
+            return list(grille.ARCS)
+        return [(Xi, Xj) for Xi in self.contraintes
+                for Xj in self.contraintes[Xi]]
+
+    def copy(self):
+        copie = CSPMasques(self.variables, self.masques[:], self.contraintes)
+        copie.propagee = self.propagee
+        return copie
+
+    def __eq__(self, autre):
+        return self.variables == autre.variables \
+            and self.masques == autre.masques \
+            and all([self.contraintes[v] == autre.contraintes[v]
+                     for v in self.variables])
+
+    def __ne__(self, autre):
+        return not self == autre
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Solveur par couverture exacte: algorithme X de Knuth avec Dancing Links.
+#
+# Pour une grille N x N (N = n², n l'ordre), la matrice a 4N² colonnes: une
+# contrainte par case, par ligne et valeur, par colonne et valeur et par
+# bloc et valeur (324 colonnes en 9x9). Chaque candidat (case, valeur) est
+# une rangée de 4 noeuds. Les noeuds ne sont pas des objets: ce sont des
+# indices dans des listes parallèles (gauche, droite, haut, bas, colonne),
+# l'indice 0 étant la racine et les indices 1 à 4N² les en-têtes de colonnes.
+#
+# La colonne couverte à chaque étape est celle qui a le moins de rangées:
+# l'ordre des cases n'a aucune influence sur la recherche.
+#
+# Le module expose backtracking_search, comme un fichier solution; il est
+# sélectionné par 'sudoku.py -joueur dlx'.
+###
+
+import grille
+from budget import BudgetEpuise, RESOLUE, IMPOSSIBLE, EPUISE
+
+NB_COLONNES = 4 * grille.NB_CASES  # Grille 9x9.
+
+# Options de recherche des moteurs CSP (solution_sudoku) et leur valeur par
+# défaut: acceptées à cette valeur, pour la même interface qu'un fichier
+# solution, et refusées sinon (voir verifier_options).
+OPTIONS_CSP = {'piste': False, 'variable': 'ordre', 'valeur': 'ordre',
+               'processus': 1, 'regles': None, 'cbj': False, 'nogoods': 1000}
+
+
+def verifier_options(options):
+    """
+    Lève ValueError pour une option de recherche CSP qui changerait la
+    recherche (dlx n'en tient pas compte), TypeError pour une option inconnue.
+    """
+    for nom, valeur in options.items():
+        if nom not in OPTIONS_CSP:
+            raise TypeError("Option inconnue de dlx: '{0}'.".format(nom))
+        if nom == 'nogoods' or valeur == OPTIONS_CSP[nom] \
+                or nom == 'regles' and not valeur:
+            continue  # Le magasin de nogoods est sans effet sans cbj.
+        raise ValueError("dlx ne prend pas en charge l'option {0}={1!r}.".format(
+            nom, valeur))
+
+
+def colonnes(case, d, ordre=3):
+    """Les 4 colonnes (1 à 4N²) couvertes par la valeur d+1 dans la case."""
+    N = ordre * ordre
+    y, x = divmod(case, N)
+    b = (y // ordre) * ordre + x // ordre
+    NN = N * N
+    return (1 + case, 1 + NN + y * N + d, 1 + 2 * NN + x * N + d,
+            1 + 3 * NN + b * N + d)
+
+
+class DLX:
+    def __init__(self, candidats, ordre=3):
+        """
+        candidats: pour chacune des N² cases, les valeurs (1 à N) possibles.
+        """
+        self.ordre = ordre
+        self.taille_grille = N = ordre * ordre
+        n = 4 * N * N + 1
+        self.G = [i - 1 for i in range(n)]
+        self.D = [i + 1 for i in range(n)]
+        self.G[0], self.D[n - 1] = n - 1, 0
+        self.H = list(range(n))
+        self.B = list(range(n))
+        self.C = list(range(n))
+        self.taille = [0] * n
+        self.rangee = [-1] * n  # case * N + (valeur - 1) de chaque noeud.
+
+        for case, valeurs in enumerate(candidats):
+            for v in valeurs:
+                self._ajouter_rangee(case * N + v - 1, colonnes(case, v - 1, ordre))
+
+    @staticmethod
+    def depuis_etat(etat):
+        """DLX d'un SudokuEtat (tableau uint8, 0 = vide)."""
+        tous = range(1, etat.tableau.shape[0] + 1)
+        return DLX([[v] if v else tous for v in etat.tableau.flat], etat.ordre)
+
+    @staticmethod
+    def depuis_csp(csp):
+        """DLX restreint aux valeurs des domaines d'un CSP."""
+        index = grille.index_pour(len(csp.variables))
+        N, rang = index.taille, index.rang_valeur
+        candidats = [range(1, N + 1)] * index.nb_cases
+        for (y, x) in csp.variables:
+            candidats[y * N + x] = [rang[v] + 1 for v in csp.domaines[(y, x)]]
+        return DLX(candidats, index.ordre)
+
+    def _ajouter_rangee(self, rangee, cols):
+        G, D, H, B, C = self.G, self.D, self.H, self.B, self.C
+        premier = len(C)
+        for k, c in enumerate(cols):
+            i = premier + k
+            G.append(premier + (k - 1) % 4)
+            D.append(premier + (k + 1) % 4)
+            H.append(H[c])
+            B.append(c)
+            C.append(c)
+            B[H[c]] = i
+            H[c] = i
+            self.taille[c] += 1
+            self.rangee.append(rangee)
+
+    def couvrir(self, c):
+        G, D, H, B, C, taille = self.G, self.D, self.H, self.B, self.C, self.taille
+        D[G[c]] = D[c]
+        G[D[c]] = G[c]
+        i = B[c]
+        while i != c:
+            j = D[i]
+            while j != i:
+                B[H[j]] = B[j]
+                H[B[j]] = H[j]
+                taille[C[j]] -= 1
+                j = D[j]
+            i = B[i]
+
+    def decouvrir(self, c):
+        G, D, H, B, C, taille = self.G, self.D, self.H, self.B, self.C, self.taille
+        i = H[c]
+        while i != c:
+            j = G[i]
+            while j != i:
+                taille[C[j]] += 1
+                B[H[j]] = j
+                H[B[j]] = j
+                j = G[j]
+            i = H[i]
+        D[G[c]] = c
+        G[D[c]] = c
+
+    def choisir_colonne(self):
+        """Colonne ayant le moins de rangées (0 si toutes sont couvertes)."""
+        D, taille = self.D, self.taille
+        c = D[0]
+        meilleure, minimum = c, self.taille_grille + 1
+        while c != 0:
+            if taille[c] < minimum:
+                meilleure, minimum = c, taille[c]
+                if minimum <= 1:
+                    break
+            c = D[c]
+        return meilleure
+
+    def solutions(self, solution=None, stats=None):
+        """Génère toutes les solutions (copies de listes de rangées)."""
+        solution = [] if solution is None else solution
+        c = self.choisir_colonne()
+        if c == 0:
+            yield list(solution)
+            return
+        if self.taille[c] == 0:
+            return
+
+        D, G, B, C = self.D, self.G, self.B, self.C
+        self.couvrir(c)
+        r = B[c]
+        while r != c:
+            solution.append(self.rangee[r])
+            if stats is not None:
+                stats.noeud()
+            j = D[r]
+            while j != r:
+                self.couvrir(C[j])
+                j = D[j]
+
+            yield from self.solutions(solution, stats)
+
+            j = G[r]
+            while j != r:
+                self.decouvrir(C[j])
+                j = G[j]
+            solution.pop()
+            if stats is not None:
+                stats.backtracks += 1
+            r = B[r]
+        self.decouvrir(c)
+
+    def rechercher(self, solution, stats=None):
+        """Complète 'solution' (liste de rangées); retourne vrai si trouvée."""
+        c = self.choisir_colonne()
+        if c == 0:
+            return True
+        if self.taille[c] == 0:
+            return False
+
+        D, G, B, C = self.D, self.G, self.B, self.C
+        self.couvrir(c)
+        r = B[c]
+        while r != c:
+            solution.append(self.rangee[r])
+            if stats is not None:
+                stats.noeud()
+            j = D[r]
+            while j != r:
+                self.couvrir(C[j])
+                j = D[j]
+
+            if self.rechercher(solution, stats):
+                return True
+
+            j = G[r]
+            while j != r:
+                self.decouvrir(C[j])
+                j = G[j]
+            solution.pop()
+            if stats is not None:
+                stats.backtracks += 1
+            r = B[r]
+        self.decouvrir(c)
+        return False
+
+
+def assignations(solution, ordre=3):
+    """Dictionnaire case (tuple (Y,X)) => valeur (b'1', ...) des rangées choisies."""
+    index = grille.index(ordre)
+    N = index.taille
+    return dict((index.cases[r // N], index.valeurs[r % N]) for r in solution)
+
+
+#####
+# backtracking_search : Même interface que celle d'un fichier solution.
+#
+# csp: Objet CSP (sudoku.creerCSP); les domaines restreignent les rangées de la matrice.
+#
+# stats: Objet statistiques.Statistiques, ou None.
+#
+# budget: Objet budget.Budget, ou None (voir solution_sudoku.backtracking_search). Les
+#         domaines d'une recherche interrompue sont ceux du CSP, moins les valeurs des
+#         voisins affectés.
+#
+# options: Options des moteurs CSP (OPTIONS_CSP), acceptées à leur valeur par défaut
+#          seulement (ValueError sinon, voir verifier_options).
+#
+# retour: Le dictionnaire des assignations (case => valeur), False si aucune solution.
+###
+def backtracking_search(csp, stats=None, budget=None, **options):
+    verifier_options(options)
+    solution = []
+    if budget is not None:
+        stats = budget.demarrer(stats, solution)
+    dlx = DLX.depuis_csp(csp)
+    if budget is None:
+        trouvee = dlx.rechercher(solution, stats)
+    else:
+        try:
+            trouvee = dlx.rechercher(solution, stats)
+        except BudgetEpuise:
+            partielle = assignations(budget.partielle, dlx.ordre)
+            budget.terminer(stats, EPUISE, partielle,
+                            domaines_restants(csp, partielle))
+            return False
+        except BaseException:
+            budget.terminer(stats, None)
+            raise
+        budget.terminer(stats, RESOLUE if trouvee else IMPOSSIBLE,
+                        assignations(solution if trouvee else budget.partielle,
+                                     dlx.ordre))
+    if not trouvee:
+        return False
+    return assignations(solution, dlx.ordre)
+
+
+def domaines_restants(csp, partielle):
+    """Domaines du CSP compatibles avec des affectations partielles (case => valeur)."""
+    domaines = {}
+    for X in csp.variables:
+        if X in partielle:
+            domaines[X] = [partielle[X]]
+        else:
+            prises = set(partielle.get(Y) for Y in csp.contraintes[X])
+            domaines[X] = [v for v in csp.domaines[X] if v not in prises]
+    return domaines
+
+
+#####
+# compter_solutions : Même interface que celle d'un fichier solution.
+#
+# limite: Nombre de solutions après lequel la recherche s'arrête, None pour toutes.
+#
+# garder: Nombre de solutions retournées (les premières trouvées).
+#
+# budget: Objet budget.Budget, ou None. S'il est épuisé, le comptage s'arrête et retourne
+#         les solutions trouvées jusque-là.
+#
+# options: Voir 'backtracking_search'.
+#
+# retour: Un tuple (nombre de solutions, liste des 'garder' premières solutions).
+###
+def compter_solutions(csp, limite=None, garder=1, stats=None, budget=None,
+                      **options):
+    verifier_options(options)
+    if budget is not None:
+        stats = budget.demarrer(stats, [])
+    dlx = DLX.depuis_csp(csp)
+    nb, solutions = 0, []
+    try:
+        for solution in dlx.solutions(stats=stats):
+            nb += 1
+            if len(solutions) < garder:
+                solutions.append(assignations(solution, dlx.ordre))
+            if nb == limite:
+                break
+    except BudgetEpuise:
+        budget.terminer(stats, EPUISE, {})
+        return nb, solutions
+    except BaseException:
+        if budget is not None:
+            budget.terminer(stats, None)
+        raise
+    if budget is not None:
+        budget.terminer(stats, RESOLUE if nb else IMPOSSIBLE,
+                        solutions[0] if solutions else {})
+    return nb, solutions
@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Génération de grilles à solution unique, notées par difficulté.
+#
+# 1. Une grille complète est tirée au hasard (recherche avec ordre des
+#    valeurs aléatoire).
+# 2. Les indices sont retirés un à un (ou par paires symétriques), dans un
+#    ordre aléatoire; un retrait est annulé si la grille n'a plus une
+#    solution unique. Il suffit de vérifier qu'aucune autre valeur de la
+#    case retirée ne mène à une solution: la solution connue est exclue.
+#    Cette recherche place les singletons nus et cachés à chaque noeud.
+# 3. La grille est notée selon les techniques nécessaires pour la résoudre
+#    (singletons nus, singletons cachés, recherche) et le nombre de noeuds
+#    et de retours arrière de la recherche.
+#
+# Toutes les opérations se font sur des masques de bits par unité (bit k:
+# valeur k+1 présente), sans CSP. La grille numéro i d'une graine ne dépend
+# que de (graine, i): la sortie est la même quel que soit le nombre de
+# processus.
+#
+# Débit mesuré (un coeur, CPython 3.11): environ 45 grilles/s sans niveau
+# visé, 65 avec -symetrie, 13 à 15 pour 'difficile' ou 'expert' (plusieurs
+# grilles tirées par grille gardée). On reste loin des milliers de grilles
+# par seconde: l'essentiel du temps est dans la vérification d'unicité près
+# des grilles minimales, en Python pur. dlx (matrice reconstruite à chaque
+# vérification) n'y fait pas mieux; seul le nombre de processus y aide.
+###
+
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+
+import grille
+
+NIVEAUX = ('facile', 'moyen', 'difficile', 'expert')
+
+# Au-delà de ce nombre de noeuds de recherche (sans propagation), une grille
+# est 'expert' plutôt que 'difficile' (environ la médiane des grilles qui
+# demandent une recherche).
+NOEUDS_DIFFICILE = 100
+
+
+class GrilleMasques:
+    """
+    Grille d'ordre donné (liste de valeurs, 0 = vide) et masques des valeurs
+    présentes dans chaque unité.
+    """
+
+    def __init__(self, valeurs, ordre=3):
+        self.index = grille.index(ordre)
+        self.tous = (1 << self.index.taille) - 1
+        self.valeurs = list(valeurs)
+        self.unites_case = self.index.unites_case
+        self.occupees = [0] * len(self.index.unites)
+        self.solution = None  # Première solution trouvée par compter().
+        self.noeuds = 0
+        self.backtracks = 0
+        for c, v in enumerate(self.valeurs):
+            if v:
+                for u in self.unites_case[c]:
+                    self.occupees[u] |= 1 << (v - 1)
+
+    def placer(self, c, v):
+        self.valeurs[c] = v
+        bit = 1 << (v - 1)
+        for u in self.unites_case[c]:
+            self.occupees[u] |= bit
+
+    def retirer(self, c):
+        bit = ~(1 << (self.valeurs[c] - 1))
+        self.valeurs[c] = 0
+        for u in self.unites_case[c]:
+            self.occupees[u] &= bit
+
+    def candidats(self, c):
+        a, b, d = self.unites_case[c]
+        o = self.occupees
+        return self.tous & ~(o[a] | o[b] | o[d])
+
+    def _choisir(self, vides, interdits):
+        """Case vide ayant le moins de candidats: (case, candidats), ou (None, 0)."""
+        meilleure, masque, minimum = None, 0, self.index.taille + 1
+        for c in vides:
+            if self.valeurs[c]:
+                continue
+            m = self.candidats(c) & ~interdits.get(c, 0)
+            n = bin(m).count('1')
+            if n < minimum:
+                meilleure, masque, minimum = c, m, n
+                if n <= 1:
+                    break
+        return meilleure, masque
+
+    def compter(self, limite=2, interdits=None, rng=None, propager=False):
+        """
+        Nombre de solutions, jusqu'à 'limite'.
+
+        interdits: dict case => masque de valeurs exclues de la case.
+        rng: si donné, les valeurs sont essayées dans un ordre aléatoire.
+        propager: placer les singletons nus et cachés à chaque noeud; les
+            noeuds ne mesurent alors plus la difficulté (voir noter).
+
+        La grille est remise dans son état initial; la première solution
+        trouvée est conservée dans self.solution.
+        """
+        vides = [c for c, v in enumerate(self.valeurs) if not v]
+        if propager:
+            return self._compter_propage(vides, limite, interdits or {})
+        return self._compter(vides, limite, interdits or {}, rng)
+
+    def _compter(self, vides, limite, interdits, rng):
+        c, masque = self._choisir(vides, interdits)
+        if c is None:
+            if self.solution is None:
+                self.solution = list(self.valeurs)
+            return 1
+        valeurs = [k + 1 for k in range(self.index.taille) if masque >> k & 1]
+        if rng is not None:
+            rng.shuffle(valeurs)
+        total = 0
+        for v in valeurs:
+            self.noeuds += 1
+            self.placer(c, v)
+            trouvees = self._compter(vides, limite - total, interdits, rng)
+            self.retirer(c)
+            total += trouvees
+            if total >= limite:
+                return total
+            if not trouvees:
+                self.backtracks += 1
+        return total
+
+    def _compter_propage(self, vides, limite, interdits):
+        placees = []
+        total = 0
+        if self._propager(vides, interdits, placees):
+            c, masque = self._choisir(vides, interdits)
+            if c is None:
+                if self.solution is None:
+                    self.solution = list(self.valeurs)
+                total = 1
+            else:
+                for k in range(self.index.taille):
+                    if not masque >> k & 1:
+                        continue
+                    self.noeuds += 1
+                    self.placer(c, k + 1)
+                    total += self._compter_propage(vides, limite - total,
+                                                   interdits)
+                    self.retirer(c)
+                    if total >= limite:
+                        break
+        for c in reversed(placees):
+            self.retirer(c)
+        return total
+
+    def _propager(self, vides, interdits, placees):
+        """
+        Place les singletons nus et cachés (compte tenu des interdits)
+        jusqu'à un point fixe; les cases placées sont ajoutées à 'placees'.
+
+        Retourne faux si une case n'a plus de candidat ou si une valeur n'a
+        plus de place dans une unité.
+        """
+        valeurs, o, unites_case = self.valeurs, self.occupees, self.unites_case
+        tous = self.tous
+        while True:
+            progres = False
+            masques = [0] * len(valeurs)
+            libres = False
+            for c in vides:
+                if valeurs[c]:
+                    continue
+                a, b, d = unites_case[c]
+                m = tous & ~(o[a] | o[b] | o[d])
+                if interdits:
+                    m &= ~interdits.get(c, 0)
+                if not m:
+                    return False
+                if m & (m - 1) == 0:
+                    self.placer(c, m.bit_length())
+                    placees.append(c)
+                    progres = True
+                else:
+                    masques[c] = m
+                    libres = True
+            if progres:
+                continue
+            if not libres:
+                return True
+            # Singletons cachés, avec les masques du passage précédent (aucune
+            # case n'a été placée depuis): un seul par passage.
+            for u, unite in enumerate(self.index.unites):
+                une_fois = plusieurs = 0
+                for c in unite:
+                    m = masques[c]
+                    plusieurs |= une_fois & m
+                    une_fois |= m
+                if une_fois | o[u] != tous:
+                    return False
+                seules = une_fois & ~plusieurs
+                if seules:
+                    bit = seules & -seules
+                    for c in unite:
+                        if masques[c] & bit:
+                            self.placer(c, bit.bit_length())
+                            placees.append(c)
+                            break
+                    progres = True
+                    break
+            if not progres:
+                return True
+
+    def singletons(self, caches=True):
+        """
+        Place les singletons nus (et cachés) jusqu'à un point fixe.
+
+        Retourne (nb. de singletons nus, nb. de singletons cachés, cohérente).
+        """
+        nus = nb_caches = 0
+        unites = self.index.unites
+        while True:
+            progres = False
+            for c, v in enumerate(self.valeurs):
+                if v:
+                    continue
+                m = self.candidats(c)
+                if not m:
+                    return nus, nb_caches, False
+                if m & (m - 1) == 0:
+                    self.placer(c, m.bit_length())
+                    nus += 1
+                    progres = True
+            if progres or not caches:
+                if progres:
+                    continue
+                return nus, nb_caches, True
+            # Singletons cachés: valeur possible dans une seule case d'une unité.
+            for unite in unites:
+                une_fois = plusieurs = 0
+                for c in unite:
+                    if not self.valeurs[c]:
+                        m = self.candidats(c)
+                        plusieurs |= une_fois & m
+                        une_fois |= m
+                seules = une_fois & ~plusieurs
+                while seules:
+                    bit = seules & -seules
+                    seules ^= bit
+                    for c in unite:
+                        if not self.valeurs[c] and self.candidats(c) & bit:
+                            self.placer(c, bit.bit_length())
+                            nb_caches += 1
+                            progres = True
+                            break
+                if progres:
+                    break
+            if not progres:
+                return nus, nb_caches, True
+
+
+def grille_complete(rng, ordre=3):
+    """Valeurs (liste) d'une grille complète tirée au hasard."""
+    g = GrilleMasques([0] * grille.index(ordre).nb_cases, ordre)
+    g.compter(limite=1, rng=rng)
+    return g.solution
+
+
+def retirer_indices(solution, rng, ordre=3, symetrie=False, indices_min=0):
+    """
+    Retire des indices d'une grille complète tant que la solution reste unique.
+
+    symetrie: retirer les cases par paires symétriques (rotation de 180°).
+    indices_min: nombre d'indices sous lequel on ne retire plus.
+
+    Retourne les valeurs de la grille (0 = vide).
+    """
+    g = GrilleMasques(solution, ordre)
+    nb_cases = len(solution)
+    ordre_cases = list(range(nb_cases))
+    rng.shuffle(ordre_cases)
+    vues = set()
+    indices = nb_cases
+    for c in ordre_cases:
+        if c in vues:
+            continue
+        groupe = [c]
+        if symetrie and nb_cases - 1 - c != c:
+            groupe.append(nb_cases - 1 - c)
+        vues.update(groupe)
+        if indices - len(groupe) < indices_min:
+            continue
+
+        retirees = [(k, g.valeurs[k]) for k in groupe]
+        for k, _ in retirees:
+            g.retirer(k)
+        # Une autre solution diffère de la solution connue dans au moins une
+        # case du groupe: il suffit d'interdire la valeur connue, case par case.
+        if all(g.compter(limite=1, interdits={k: 1 << (v - 1)},
+                         propager=True) == 0
+               for k, v in retirees):
+            indices -= len(groupe)
+        else:
+            for k, v in retirees:
+                g.placer(k, v)
+    return g.valeurs
+
+
+def noter(valeurs, ordre=3):
+    """
+    Difficulté d'une grille à solution unique.
+
+    Retourne (niveau, mesures): niveau dans NIVEAUX et mesures un dict
+    (singletons nus et cachés, noeuds et backtracks de la recherche,
+    indices).
+    """
+    g = GrilleMasques(valeurs, ordre)
+    indices = sum(1 for v in valeurs if v)
+    nus, _, _ = g.singletons(caches=False)
+    if all(g.valeurs):
+        niveau, caches = 'facile', 0
+    else:
+        nus_, caches, _ = g.singletons(caches=True)
+        nus += nus_
+        if all(g.valeurs):
+            niveau = 'moyen'
+        else:
+            g.compter(limite=1)
+            niveau = 'difficile' if g.noeuds <= NOEUDS_DIFFICILE else 'expert'
+    return niveau, {
+        'indices': indices,
+        'singletons_nus': nus,
+        'singletons_caches': caches,
+        'noeuds': g.noeuds,
+        'backtracks': g.backtracks,
+    }
+
+
+def generer(seed, numero=0, niveau=None, ordre=3, symetrie=False,
+            essais=1000):
+    """
+    Grille numéro 'numero' de la graine 'seed'.
+
+    niveau: niveau visé (voir NIVEAUX), ou None pour le premier obtenu.
+    essais: nombre maximal de grilles tirées pour atteindre le niveau.
+
+    Retourne (valeurs, solution, niveau, mesures); la dernière grille tirée
+    si le niveau n'est pas atteint.
+    """
+    rng = random.Random('{0}:{1}'.format(seed, numero))
+    for _ in range(essais):
+        solution = grille_complete(rng, ordre)
+        valeurs = retirer_indices(solution, rng, ordre, symetrie)
+        obtenu, mesures = noter(valeurs, ordre)
+        if niveau is None or obtenu == niveau:
+            break
+    return valeurs, solution, obtenu, mesures
+
+
+# Paramètres de génération de chaque processus (voir _initialiser).
+_parametres = None
+
+
+def _initialiser(parametres):
+    global _parametres
+    _parametres = parametres
+
+
+def _generer(numero):
+    seed, niveau, ordre, symetrie = _parametres
+    return generer(seed, numero, niveau, ordre, symetrie)
+
+
+def generer_flux(nombre, seed=0, niveau=None, ordre=3, symetrie=False,
+                 nb_processus=None, taille_lot=16):
+    """
+    Génère 'nombre' grilles avec 'nb_processus' processus.
+
+    Les grilles sont produites dans l'ordre de leur numéro (0 à nombre-1),
+    au fur et à mesure: tuples (valeurs, solution, niveau, mesures).
+    """
+    parametres = (seed, niveau, ordre, symetrie)
+    if nb_processus == 1:
+        _initialiser(parametres)
+        yield from map(_generer, range(nombre))
+        return
+    with multiprocessing.Pool(nb_processus, _initialiser, (parametres,)) as pool:
+        yield from pool.imap(_generer, range(nombre), chunksize=taille_lot)
+
+
+def valeurs2ligne(valeurs):
+    """Grille en une ligne (format de sudoku_batch: '.' si vide)."""
+    return ''.join(grille.SYMBOLES[v - 1] if v else '.' for v in valeurs)
+
+
+DESCRIPTION = "Générer des grilles de sudoku à solution unique, notées " \
+              "par difficulté (une grille par ligne, '.' si vide)."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('-nombre', dest='nombre', metavar="INT", action='store',
+                   type=int, required=False, default=10,
+                   help="nombre de grilles à générer.")
+
+    p.add_argument('-seed', dest='seed', metavar="INT", action='store',
+                   type=int, required=False, default=0,
+                   help="graine: la grille numéro i ne dépend que de la "
+                        "graine et de i.")
+
+    p.add_argument('-niveau', dest='niveau', metavar="NIVEAU", action='store',
+                   type=str, required=False, choices=NIVEAUX,
+                   help="difficulté visée ({0}).".format(', '.join(NIVEAUX)))
+
+    p.add_argument('-ordre', dest='ordre', metavar="INT", action='store',
+                   type=int, required=False, default=3, choices=[2, 3],
+                   help="ordre des grilles (2 pour 4x4, 3 pour 9x9). Au-delà, "
+                        "la vérification d'unicité (singletons seulement) "
+                        "explose près des grilles minimales.")
+
+    p.add_argument('-symetrie', dest='symetrie', action='store_true',
+                   required=False,
+                   help="retirer les indices par paires symétriques.")
+
+    p.add_argument('-processus', dest='nb_processus', metavar="INT",
+                   action='store', type=int, required=False,
+                   help="nombre de processus (défaut: nombre de coeurs).")
+
+    p.add_argument('-details', dest='details', action='store_true',
+                   required=False,
+                   help="ajouter à chaque grille (séparés par des tabulations) "
+                        "son niveau, sa solution et ses mesures.")
+
+    p.add_argument('-sortie', dest='sortie', metavar="FICHIER",
+                   action='store', type=str, required=False, default='-',
+                   help="fichier des grilles ('-' pour la sortie standard).")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    sortie = sys.stdout if args.sortie == '-' else open(args.sortie, 'w')
+
+    start_time = time.time()
+    for valeurs, solution, niveau, mesures in generer_flux(
+            args.nombre, args.seed, args.niveau, args.ordre, args.symetrie,
+            args.nb_processus):
+        ligne = valeurs2ligne(valeurs)
+        if args.details:
+            ligne = '\t'.join([ligne, niveau, valeurs2ligne(solution)] +
+                               ['{0}={1}'.format(k, v) for k, v in mesures.items()])
+        sortie.write(ligne + '\n')
+    duree = time.time() - start_time
+
+    sortie.flush()
+    print("{0} grilles en {1:0.2f} sec. ({2:0.1f} grilles/sec.)".format(
+        args.nombre, duree, args.nombre / duree if duree else 0.),
+        file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Index statique du graphe de contraintes d'une grille de sudoku.
+#
+# Une grille d'ordre n a n² x n² cases, numérotées de 0 à n⁴-1
+# (case = y*n² + x), et n² valeurs possibles. Le graphe ne dépend pas de la
+# partie: il est calculé une seule fois par ordre, puis partagé par tous
+# les CSP. Les constantes du module sont celles de la grille 9x9 (ordre 3).
+###
+
+import functools
+
+# Symbole de chaque valeur (1 => '1', ..., 9 => '9', 10 => 'A', ...).
+SYMBOLES = '123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+ORDRE_MAX = 5  # Les tableaux uint8 et les symboles suffisent jusqu'à 25x25.
+
+
+class Index:
+    """Graphe de contraintes d'une grille d'ordre 'ordre'."""
+
+    def __init__(self, ordre):
+        n = ordre
+        N = n * n
+        self.ordre = ordre
+        self.taille = N
+        self.nb_cases = N * N
+
+        # Valeurs des domaines du CSP, en octets (b'1', ..., b'9', b'A', ...),
+        # et rang (0 à N-1) de chacune.
+        self.valeurs = tuple(SYMBOLES[k].encode('ascii') for k in range(N))
+        self.rang_valeur = dict((v, k) for k, v in enumerate(self.valeurs))
+
+        # Coordonnée (Y,X) de chaque numéro de case.
+        self.cases = tuple((y, x) for y in range(N) for x in range(N))
+
+        # Les 3N unités (N lignes, N colonnes, N blocs), en numéros de case.
+        self.unites = tuple(
+            [tuple(y * N + x for x in range(N)) for y in range(N)] +
+            [tuple(y * N + x for y in range(N)) for x in range(N)] +
+            [tuple((by + i // n) * N + bx + i % n for i in range(N))
+             for by in range(0, N, n) for bx in range(0, N, n)])
+
+        # Indices (dans unites) des 3 unités contenant chaque case.
+        unites_case = [[] for _ in range(self.nb_cases)]
+        for u, unite in enumerate(self.unites):
+            for c in unite:
+                unites_case[c].append(u)
+        self.unites_case = tuple(tuple(u) for u in unites_case)
+
+        # Les voisins (cases devant avoir une valeur différente) de chaque case.
+        self.voisins = tuple(
+            tuple(sorted(set(v for u in self.unites_case[c]
+                             for v in self.unites[u]) - {c}))
+            for c in range(self.nb_cases))
+
+        # Même graphe, indexé par coordonnées: le format 'contraintes' du CSP.
+        self.contraintes = dict(
+            (self.cases[c], tuple(self.cases[v] for v in self.voisins[c]))
+            for c in range(self.nb_cases))
+
+        # Les arcs (Xi, Xj), en coordonnées et encodés en entier (i*n⁴ + j).
+        self.arcs = tuple((self.cases[i], self.cases[j])
+                          for i in range(self.nb_cases) for j in self.voisins[i])
+        self.arcs_entiers = tuple(i * self.nb_cases + j
+                                  for i in range(self.nb_cases)
+                                  for j in self.voisins[i])
+
+
+@functools.lru_cache(maxsize=None)
+def index(ordre=3):
+    """Index (partagé) de la grille d'ordre donné."""
+    if not 1 <= ordre <= ORDRE_MAX:
+        raise ValueError("Ordre de grille non supporté: {0}".format(ordre))
+    return Index(ordre)
+
+
+def ordre_de(nb_cases):
+    """Ordre d'une grille de 'nb_cases' cases, ou None si ce n'en est pas une."""
+    ordre = int(round(nb_cases ** 0.25))
+    return ordre if ordre ** 4 == nb_cases and ordre <= ORDRE_MAX else None
+
+
+def index_pour(nb_cases):
+    """Index d'une grille de 'nb_cases' cases, ou None."""
+    ordre = ordre_de(nb_cases)
+    return index(ordre) if ordre is not None else None
+
+
+_INDEX = index(3)
+
+TAILLE = _INDEX.taille
+NB_CASES = _INDEX.nb_cases
+CASES = _INDEX.cases
+UNITES = _INDEX.unites
+UNITES_CASE = _INDEX.unites_case
+VOISINS = _INDEX.voisins
+CONTRAINTES = _INDEX.contraintes
+ARCS = _INDEX.arcs
+ARCS_ENTIERS = _INDEX.arcs_entiers
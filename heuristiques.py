@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Heuristiques d'ordre pour backtracking_search.
+#
+# - MRV (minimum remaining values) avec départage par degré: la prochaine
+#   case est celle dont le domaine est le plus petit, puis celle ayant le
+#   plus de voisins non assignés, puis la première dans csp.variables.
+# - LCV (least constraining value): les valeurs sont essayées en commençant
+#   par celle qui figure dans le moins de domaines des unités de la case.
+#
+# Les tailles de domaine, degrés et nombres de candidats par unité sont
+# maintenus incrémentalement à partir des cases modifiées à chaque coup. Le
+# choix d'une case se fait dans un tas (suppression paresseuse des entrées
+# périmées), donc en O(log n) plutôt que par un parcours des variables. Le
+# tas est reconstruit à partir des clés à jour quand les entrées périmées y
+# dominent: sa taille reste proportionnelle aux variables non assignées.
+###
+
+import heapq
+
+import grille
+
+# Le tas est reconstruit au-delà de COMPACTAGE entrées par variable non
+# assignée.
+COMPACTAGE = 4
+
+
+class EtatHeuristique:
+    def __init__(self, csp, variable='mrv', valeur='lcv'):
+        self.mrv = variable == 'mrv'
+        self.lcv = valeur == 'lcv'
+        self.contraintes = csp.contraintes
+
+        # Unités et rang des valeurs de la grille (9x9, 16x16, ...) du CSP.
+        index = grille.index_pour(len(csp.variables))
+        self.taille = index.taille
+        self.unites_case = index.unites_case
+        self.rang_valeur = index.rang_valeur
+
+        self.rang = dict((X, r) for r, X in enumerate(csp.variables))
+        self.valeurs = dict((X, tuple(csp.domaines[X])) for X in csp.variables)
+        self.degre = dict((X, len(csp.contraintes[X])) for X in csp.variables)
+
+        # candidats[u][k]: nb. de cases de l'unité u dont le domaine
+        # contient la valeur de rang k.
+        self.candidats = [[0] * index.taille for _ in index.unites]
+        for X, valeurs in self.valeurs.items():
+            for u in self._unites(X):
+                for v in valeurs:
+                    self.candidats[u][self.rang_valeur[v]] += 1
+
+        self.tas = [self._cle(X) for X in csp.variables]
+        heapq.heapify(self.tas)
+
+        # Journal (case, valeurs précédentes) pour annuler les mises à jour.
+        self.journal = []
+
+    def _unites(self, X):
+        return self.unites_case[X[0] * self.taille + X[1]]
+
+    def _cle(self, X):
+        return (len(self.valeurs[X]), -self.degre[X], self.rang[X], X)
+
+    def _changer(self, X, valeurs):
+        anciennes = self.valeurs[X]
+        rang = self.rang_valeur
+        for u in self._unites(X):
+            compte = self.candidats[u]
+            for v in anciennes:
+                compte[rang[v]] -= 1
+            for v in valeurs:
+                compte[rang[v]] += 1
+        self.valeurs[X] = valeurs
+        if len(valeurs) != len(anciennes):
+            heapq.heappush(self.tas, self._cle(X))
+        return anciennes
+
+    def marque(self):
+        return len(self.journal)
+
+    def observer(self, csp, cases):
+        """Prend en compte le nouveau domaine des cases modifiées."""
+        for X in set(cases):
+            valeurs = tuple(csp.domaines[X])
+            if valeurs != self.valeurs[X]:
+                self.journal.append((X, self._changer(X, valeurs)))
+
+    def assigner(self, X):
+        for Xk in self.contraintes[X]:
+            self.degre[Xk] -= 1
+            heapq.heappush(self.tas, self._cle(Xk))
+
+    def liberer(self, X):
+        for Xk in self.contraintes[X]:
+            self.degre[Xk] += 1
+            heapq.heappush(self.tas, self._cle(Xk))
+        heapq.heappush(self.tas, self._cle(X))
+
+    def annuler(self, marque):
+        while len(self.journal) > marque:
+            X, valeurs = self.journal.pop()
+            self._changer(X, valeurs)
+
+    def choisir_variable(self, assignations):
+        tas = self.tas
+        if len(tas) > COMPACTAGE * (len(self.valeurs) - len(assignations)):
+            # Une clé à jour par variable non assignée (rangs distincts: le
+            # minimum, donc la case choisie, ne change pas).
+            tas[:] = [self._cle(X) for X in self.valeurs if X not in assignations]
+            heapq.heapify(tas)
+        while tas:
+            taille, degre, _, X = tas[0]
+            if X not in assignations and taille == len(self.valeurs[X]) \
+                    and degre == -self.degre[X]:
+                return X
+            heapq.heappop(tas)  # Entrée périmée.
+        return None
+
+    def ordonner_valeurs(self, X, domaine):
+        unites = self._unites(X)
+        candidats, rang = self.candidats, self.rang_valeur
+        # Tri stable: à égalité, l'ordre du domaine est conservé.
+        return sorted(domaine, key=lambda v: sum(
+            candidats[u][rang[v]] for u in unites))
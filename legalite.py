@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Index incrémental des coups d'une partie (joueur humain).
+#
+# Chaque unité (ligne, colonne, bloc) garde en masque de bits les valeurs
+# qu'elle contient (bit v-1: valeur v). Un coup est légal si sa valeur
+# n'est dans aucune des 3 unités de la case: le test, le placement,
+# l'effacement, l'annulation et le rétablissement d'un coup sont en O(1),
+# sans parcourir la grille. La grille est complète quand toutes les cases
+# sont remplies: les coups légaux ne créent aucun conflit. Les candidats
+# d'une case (indices) se lisent dans les mêmes masques.
+###
+
+import grille
+
+
+class IndexLegalite:
+    """
+    Masques des unités d'une grille (SudokuEtat), modifiée par 'jouer'.
+
+    coherent: faux si la grille de départ a déjà une valeur en double dans
+              une unité (les masques ne le représentent pas: 'complet' ne
+              suffit plus à valider la grille).
+    """
+
+    def __init__(self, etat):
+        index = grille.index(etat.ordre)
+        self.etat = etat
+        self.taille = index.taille
+        self.plein = (1 << index.taille) - 1
+        self.unites_case = index.unites_case
+        self.unites = [0] * len(index.unites)
+        self.nb_remplies = 0
+        self.coherent = True
+        self.historique = []  # Coups (case, ancienne valeur, nouvelle valeur).
+        self.retablis = []    # Coups annulés, à rétablir.
+
+        for c, v in enumerate(etat.tableau.ravel().tolist()):
+            if v:
+                bit = 1 << (v - 1)
+                if any(self.unites[u] & bit for u in self.unites_case[c]):
+                    self.coherent = False
+                self._ajouter(c, v)
+
+    def _case(self, y, x):
+        return y * self.taille + x
+
+    def _ajouter(self, c, v):
+        bit = 1 << (v - 1)
+        u1, u2, u3 = self.unites_case[c]
+        self.unites[u1] |= bit
+        self.unites[u2] |= bit
+        self.unites[u3] |= bit
+        self.nb_remplies += 1
+
+    def _retirer(self, c, v):
+        bit = ~(1 << (v - 1))
+        u1, u2, u3 = self.unites_case[c]
+        self.unites[u1] &= bit
+        self.unites[u2] &= bit
+        self.unites[u3] &= bit
+        self.nb_remplies -= 1
+
+    def _occupees(self, c):
+        u1, u2, u3 = self.unites_case[c]
+        return self.unites[u1] | self.unites[u2] | self.unites[u3]
+
+    def est_legal(self, y, x, v):
+        """Vrai si la valeur v (1 à N) n'est dans aucune unité de la case (Y,X)."""
+        return not self._occupees(self._case(y, x)) & (1 << (v - 1))
+
+    def candidats(self, y, x):
+        """Valeurs (1 à N) légales dans la case (Y,X), compte tenu de son contenu."""
+        c = self._case(y, x)
+        libres = ~self._occupees(c) & self.plein
+        v = int(self.etat.tableau[y, x])
+        if v:
+            libres |= 1 << (v - 1)  # Sa propre valeur peut y rester.
+        return [k + 1 for k in range(self.taille) if libres >> k & 1]
+
+    def _modifier(self, c, y, x, ancienne, nouvelle):
+        if ancienne:
+            self._retirer(c, ancienne)
+        if nouvelle:
+            self._ajouter(c, nouvelle)
+        self.etat.tableau[y, x] = nouvelle
+
+    def jouer(self, y, x, v):
+        """
+        Place la valeur v (0 pour effacer) dans la case (Y,X), sans tester sa
+        légalité (voir est_legal). Les coups annulés ne peuvent plus être
+        rétablis.
+        """
+        c = self._case(y, x)
+        ancienne = int(self.etat.tableau[y, x])
+        self._modifier(c, y, x, ancienne, v)
+        self.historique.append((c, ancienne, v))
+        self.retablis.clear()
+
+    def annuler(self):
+        """Annule le dernier coup; retourne sa case (Y,X), ou None."""
+        if not self.historique:
+            return None
+        c, ancienne, nouvelle = coup = self.historique.pop()
+        y, x = divmod(c, self.taille)
+        self._modifier(c, y, x, nouvelle, ancienne)
+        self.retablis.append(coup)
+        return y, x
+
+    def refaire(self):
+        """Rétablit le dernier coup annulé; retourne sa case (Y,X), ou None."""
+        if not self.retablis:
+            return None
+        c, ancienne, nouvelle = coup = self.retablis.pop()
+        y, x = divmod(c, self.taille)
+        self._modifier(c, y, x, ancienne, nouvelle)
+        self.historique.append(coup)
+        return y, x
+
+    def complet(self):
+        """Vrai si toutes les cases sont remplies (grille résolue si coherent)."""
+        return self.nb_remplies == self.taille * self.taille
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Moteurs intégrés: valeur de '-joueur' => module exposant
+# backtracking_search. Partagé par sudoku.py et rapide.py; ce module
+# n'importe rien, pour ne pas alourdir le démarrage de rapide.py.
+###
+
+SOLVEURS_INTEGRES = {
+    'dlx': 'dlx',  # Couverture exacte (Dancing Links)
+}
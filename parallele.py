@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Recherche parallèle d'une seule grille: les sous-problèmes produits par
+# le découpage de l'arbre (solution_sudoku.diviser) sont résolus par un
+# ensemble de processus.
+#
+# Les sous-problèmes sont plus nombreux que les processus et distribués un
+# à la fois depuis une file commune: un processus libre prend le suivant,
+# les branches longues ne bloquent donc pas les autres. Dès qu'un
+# sous-problème est résolu, les processus sont arrêtés.
+###
+
+import multiprocessing
+import time
+
+import sudoku
+from statistiques import Statistiques
+
+# Fichier solution et options de chaque processus (voir _initialiser).
+_solution = None
+_variables = None
+_options = None
+
+
+def _initialiser(fichier, variables, options):
+    global _solution, _variables, _options
+    _solution = sudoku.chargerSolution(fichier)
+    _variables = variables
+    _options = options
+
+
+def _resoudre(sous_probleme):
+    """Résout un sous-problème; retourne (assignations ou False, Statistiques, temps CPU)."""
+    assignations, domaines = sous_probleme
+    stats = Statistiques()
+    debut = time.process_time()
+    resultat = _solution.resoudre_sous_probleme(
+        _variables, assignations, domaines, stats=stats, **_options)
+    return resultat, stats, time.process_time() - debut
+
+
+def resoudre(fichier, variables, sous_problemes, options, nb_processus,
+             stats=None):
+    """
+    Résout les sous-problèmes avec 'nb_processus' processus.
+
+    fichier: fichier solution exposant resoudre_sous_probleme.
+    variables: csp.variables du problème d'origine.
+    sous_problemes: liste de tuples (assignations, domaines).
+    options: options de resoudre_sous_probleme (piste, variable, valeur, masques).
+    stats: objet Statistiques recevant les compteurs des sous-problèmes
+           terminés, le nombre de processus et leur temps CPU cumulé
+           (temps['processus']), ou None.
+
+    Retourne les assignations du premier sous-problème résolu, ou False.
+    """
+    if stats is not None:
+        stats.processus = nb_processus
+    if not sous_problemes:
+        return False
+
+    with multiprocessing.Pool(nb_processus, _initialiser,
+                              (fichier, variables, options)) as pool:
+        for resultat, s, duree in pool.imap_unordered(
+                _resoudre, sous_problemes, chunksize=1):
+            if stats is not None:
+                stats.fusionner(s)
+                stats.temps['processus'] = stats.temps.get('processus', 0.) + duree
+            if resultat is not False:
+                return resultat  # La sortie du bloc arrête les autres processus.
+    return False
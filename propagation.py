@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Propagation par règles composables, appliquées jusqu'à un point fixe.
+#
+# Règles (de la moins coûteuse à la plus coûteuse):
+#   singletons: la valeur d'une case réduite à un singleton est retirée de
+#               ses voisins (singletons nus; équivalent d'AC3 pour le
+#               sudoku). Toujours active.
+#   caches:     une valeur possible dans une seule case d'une unité y est
+#               fixée (singletons cachés).
+#   paires:     paires nues (2 cases, 2 valeurs) et cachées (2 valeurs
+#               confinées à 2 cases) dans une unité.
+#   triplets:   comme paires, avec 3 cases et 3 valeurs.
+#   pointage:   une valeur d'un bloc confinée à une ligne (ou colonne) est
+#               retirée du reste de cette ligne; une valeur d'une ligne
+#               confinée à un bloc est retirée du reste du bloc.
+#
+# Le travail est incrémental: chaque règle ne réexamine que les unités dont
+# une case a changé depuis son dernier passage. Après un changement, on
+# reprend à la règle la moins coûteuse. Les retraits sont empilés sur
+# csp.piste (format de solution_sudoku.reviser) quand elle est active.
+###
+
+from collections import deque
+from itertools import combinations
+
+import grille
+
+REGLES = ('singletons', 'caches', 'paires', 'triplets', 'pointage')
+
+
+class Contradiction(Exception):
+    """Un domaine est vide ou une valeur n'a plus de place dans une unité."""
+
+
+class Propagation:
+    """
+    Pipeline des règles choisies, pour les grilles d'un ordre donné.
+
+    regles: noms de règles (voir REGLES); 'singletons' est toujours ajoutée.
+    """
+
+    def __init__(self, regles, ordre=3):
+        inconnues = set(regles) - set(REGLES)
+        if inconnues:
+            raise ValueError("Règles inconnues: {0}".format(', '.join(sorted(inconnues))))
+        self.regles = tuple(r for r in REGLES if r in regles or r == 'singletons')
+        self.regles_unite = tuple(
+            (r, getattr(self, '_' + r)) for r in self.regles if r != 'singletons')
+
+        index = grille.index(ordre)
+        self.index = index
+        self.unites = tuple(tuple(index.cases[c] for c in u) for u in index.unites)
+        self.unites_de = dict((X, index.unites_case[c])
+                              for c, X in enumerate(index.cases))
+
+        # Intersections bloc/ligne et bloc/colonne de chaque unité:
+        # (intersection, reste du bloc, reste de la ligne).
+        N = index.taille
+        self.intersections = dict((u, []) for u in range(len(index.unites)))
+        for b in range(2 * N, 3 * N):
+            bloc = set(index.unites[b])
+            for l in range(2 * N):
+                inter = bloc & set(index.unites[l])
+                if inter:
+                    i = (tuple(index.cases[c] for c in sorted(inter)),
+                         tuple(index.cases[c] for c in sorted(bloc - inter)),
+                         tuple(index.cases[c] for c in index.unites[l]
+                               if c not in inter))
+                    self.intersections[b].append(i)
+                    self.intersections[l].append(i)
+
+        self.eliminations = None
+        self.csp = None
+
+    #####
+    # Point fixe
+    ###
+    def propager(self, csp, cases=None, stats=None):
+        """
+        Applique les règles jusqu'à un point fixe.
+
+        cases: cases modifiées depuis le dernier point fixe (None: toutes).
+        stats: objet Statistiques recevant les éliminations par règle, ou None.
+
+        Retourne vrai si aucune contradiction n'a été trouvée.
+        """
+        self.csp = csp
+        self.eliminations = dict((r, 0) for r in self.regles)
+        if cases is None:
+            cases = self.index.cases
+        self.file = deque(X for X in cases if len(csp.domaines[X]) == 1)
+        unites = set(u for X in cases for u in self.unites_de[X])
+        self.sales = dict((r, set(unites)) for r, _ in self.regles_unite)
+
+        ok = True
+        nb = 0
+        try:
+            while True:
+                if self.file:
+                    nb += 1
+                    self._singletons(self.file.popleft())
+                    continue
+                for r, regle in self.regles_unite:
+                    if self.sales[r]:
+                        unites, self.sales[r] = self.sales[r], set()
+                        for u in unites:
+                            nb += 1
+                            regle(u)
+                        break
+                else:
+                    break
+        except Contradiction:
+            ok = False
+
+        if stats is not None:
+            stats.propagation(nb)
+            for r, n in self.eliminations.items():
+                stats.eliminations[r] = stats.eliminations.get(r, 0) + n
+        self.csp = None
+        return ok
+
+    def _modifiee(self, X, domaine):
+        if not domaine:
+            raise Contradiction()
+        if len(domaine) == 1:
+            self.file.append(X)
+        for u in self.unites_de[X]:
+            for r, _ in self.regles_unite:
+                self.sales[r].add(u)
+
+    def _retirer(self, X, v, regle):
+        domaine = self.csp.domaines[X]
+        i = domaine.index(v)
+        domaine.remove(v)
+        if self.csp.piste is not None:
+            self.csp.piste.append((X, i, v))
+        self.eliminations[regle] += 1
+        self._modifiee(X, domaine)
+
+    def _restreindre(self, X, valeurs, regle):
+        """Réduit le domaine de X aux valeurs (ensemble) données."""
+        for v in [v for v in self.csp.domaines[X] if v not in valeurs]:
+            self._retirer(X, v, regle)
+
+    #####
+    # Règles
+    ###
+    def _singletons(self, X):
+        domaines = self.csp.domaines
+        if len(domaines[X]) != 1:
+            return
+        v = domaines[X][0]
+        for Y in self.csp.contraintes[X]:
+            if v in domaines[Y]:
+                self._retirer(Y, v, 'singletons')
+
+    def _caches(self, u):
+        domaines = self.csp.domaines
+        unite = self.unites[u]
+        for v in self.index.valeurs:
+            cases = [X for X in unite if v in domaines[X]]
+            if not cases:
+                raise Contradiction()
+            if len(cases) == 1 and len(domaines[cases[0]]) > 1:
+                self._restreindre(cases[0], (v,), 'caches')
+
+    def _placees(self, cases):
+        # Valeurs des singletons des cases, y compris ceux encore en file:
+        # leur retrait des voisins n'est pas encore fait.
+        domaines = self.csp.domaines
+        return set(domaines[X][0] for X in cases if len(domaines[X]) == 1)
+
+    def _sous_ensembles(self, u, k, regle):
+        domaines = self.csp.domaines
+        unite = self.unites[u]
+        libres = [X for X in unite if len(domaines[X]) > 1]
+        if len(libres) <= k:
+            return
+
+        # Sous-ensembles nus: k cases dont l'union des domaines a k valeurs.
+        candidates = [X for X in libres if len(domaines[X]) <= k]
+        for groupe in combinations(candidates, k):
+            valeurs = set()
+            for X in groupe:
+                valeurs.update(domaines[X])
+            if len(valeurs) == k:
+                for Y in libres:
+                    if Y not in groupe:
+                        for v in [v for v in domaines[Y] if v in valeurs]:
+                            self._retirer(Y, v, regle)
+
+        # Sous-ensembles cachés: k valeurs confinées aux mêmes k cases. Une
+        # valeur déjà placée dans l'unité n'est confinée nulle part.
+        placees = self._placees(unite)
+        places = {}
+        for X in libres:
+            if len(domaines[X]) == 1:
+                continue  # Devenue singleton par les sous-ensembles nus.
+            for v in domaines[X]:
+                if v not in placees:
+                    places.setdefault(v, set()).add(X)
+        # Une valeur confinée à une seule case peut compléter le groupe: les
+        # cases {1,3} et {2,4} d'une paire cachée {1,2} perdent 3 et 4.
+        valeurs = [v for v, cases in places.items() if len(cases) <= k]
+        for groupe in combinations(valeurs, k):
+            cases = set()
+            for v in groupe:
+                cases |= places[v]
+            if len(cases) == k:
+                for X in cases:
+                    if any(v not in groupe for v in domaines[X]):
+                        self._restreindre(X, groupe, regle)
+
+    def _paires(self, u):
+        self._sous_ensembles(u, 2, 'paires')
+
+    def _triplets(self, u):
+        self._sous_ensembles(u, 3, 'triplets')
+
+    def _pointage(self, u):
+        domaines = self.csp.domaines
+        for inter, reste_bloc, reste_ligne in self.intersections[u]:
+            presentes = set()
+            for X in inter:
+                if len(domaines[X]) > 1:
+                    presentes.update(domaines[X])
+            # Les valeurs placées dans le bloc ou la ligne sont laissées aux
+            # singletons.
+            presentes -= self._placees(inter + reste_bloc + reste_ligne)
+            for v in presentes:
+                dans_bloc = any(v in domaines[X] for X in reste_bloc)
+                dans_ligne = any(v in domaines[X] for X in reste_ligne)
+                if dans_bloc and not dans_ligne:
+                    for X in reste_bloc:
+                        if v in domaines[X]:
+                            self._retirer(X, v, 'pointage')
+                elif dans_ligne and not dans_bloc:
+                    for X in reste_ligne:
+                        if v in domaines[X]:
+                            self._retirer(X, v, 'pointage')
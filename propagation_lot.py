@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Propagation vectorisée sur N grilles à la fois.
+#
+# Les candidats de N grilles sont conservés dans un tenseur booléen
+# (N, 81, 9): candidats[n, c, k] est vrai si la valeur k+1 est possible
+# dans la case c de la grille n. Les singletons nus et cachés sont appliqués
+# à toutes les grilles en même temps à l'aide des tableaux d'indices
+# précalculés de grille.py. Les grilles non résolues après propagation sont
+# confiées à backtracking_search, avec leurs domaines déjà réduits.
+###
+
+import numpy as np
+
+from array import array
+
+import grille
+import validation
+from csp_masques import CSPMasques
+
+UNITES = np.array(grille.UNITES)            # (27, 9)
+VOISINS = np.array(grille.VOISINS)          # (81, 20)
+UNITES_CASE = np.array(grille.UNITES_CASE)  # (81, 3)
+# Rang de chaque case dans chacune de ses 3 unités.
+RANG_CASE = np.array([[grille.UNITES[u].index(c) for u in grille.UNITES_CASE[c]]
+                      for c in range(grille.NB_CASES)])  # (81, 3)
+
+BITS = 1 << np.arange(9)
+
+# Nombre de grilles propagées à la fois (borne la mémoire des tenseurs
+# intermédiaires, environ 15 ko par grille).
+TAILLE_BLOC = 4096
+
+
+def lignes2grilles(lignes):
+    """Grilles (N, 81) d'entiers 0-9 à partir de lignes de 81 caractères."""
+    octets = np.frombuffer(''.join(lignes).encode('ascii'), dtype=np.uint8)
+    grilles = octets.reshape(len(lignes), grille.NB_CASES) - ord('0')
+    grilles[grilles > 9] = 0  # '.', ' ' et autres caractères: case vide.
+    return grilles
+
+
+def grilles2lignes(grilles):
+    """Lignes de 81 caractères ('.' si vide) à partir de grilles (N, 81)."""
+    octets = np.where(grilles > 0, grilles + ord('0'), ord('.'))
+    return [ligne.tobytes().decode('ascii') for ligne in octets.astype(np.uint8)]
+
+
+def candidats(grilles):
+    """Tenseur (N, 81, 9) des candidats des grilles (N, 81)."""
+    cand = np.ones(grilles.shape + (9,), dtype=bool)
+    n, c = np.nonzero(grilles)
+    cand[n, c] = False
+    cand[n, c, grilles[n, c] - 1] = True
+    return cand
+
+
+def propager(cand):
+    """
+    Applique les singletons nus et cachés jusqu'au point fixe (en place).
+
+    Retourne deux masques (N,): les grilles encore cohérentes et les grilles
+    résolues.
+    """
+    actifs = np.arange(len(cand))
+    while actifs.size:
+        c = cand[actifs]
+
+        # Singletons nus: la valeur d'une case fixée est retirée des voisins.
+        fixes = c & (c.sum(2) == 1)[:, :, None]
+        c &= ~fixes[:, VOISINS, :].any(2)
+
+        # Singletons cachés: une valeur possible dans une seule case d'une
+        # unité est fixée dans cette case.
+        par_unite = c[:, UNITES, :]                              # (n, 27, 9, 9)
+        places = par_unite & (par_unite.sum(2) == 1)[:, :, None, :]
+        caches = places[:, UNITES_CASE, RANG_CASE, :].any(2)     # (n, 81, 9)
+        c = np.where(caches.any(2, keepdims=True), c & caches, c)
+
+        change = (c != cand[actifs]).any((1, 2))
+        cand[actifs] = c
+        actifs = actifs[change]
+
+    valides = cand.any(2).all(1) & cand[:, UNITES, :].any(2).all((1, 2))
+    resolues = valides & (cand.sum(2) == 1).all(1)
+    return valides, resolues
+
+
+def csp_depuis_candidats(cand):
+    """CSPMasques d'une grille (81, 9) de candidats, dans l'ordre de creerCSP."""
+    masques = (cand * BITS).sum(1)
+    variables = [grille.CASES[c] for c in range(grille.NB_CASES)
+                 if masques[c] & (masques[c] - 1)]
+    variables += [grille.CASES[c] for c in range(grille.NB_CASES)
+                  if not masques[c] & (masques[c] - 1)]
+    return CSPMasques(variables, array('H', masques.tolist()),
+                      grille.CONTRAINTES)
+
+
+def resoudre_grilles(grilles, recherche=None, options=None):
+    """
+    Résout les grilles (N, 81) en place; retourne le masque des grilles résolues.
+
+    recherche: fonction backtracking_search appliquée aux grilles que la
+               propagation ne suffit pas à résoudre (ignorées si None).
+    options: options supplémentaires de 'recherche'.
+    """
+    resolues = np.zeros(len(grilles), dtype=bool)
+    for debut in range(0, len(grilles), TAILLE_BLOC):
+        bloc = slice(debut, debut + TAILLE_BLOC)
+        cand = candidats(grilles[bloc])
+        valides, resolues[bloc] = propager(cand)
+        grilles[bloc][resolues[bloc]] = cand[resolues[bloc]].argmax(2) + 1
+
+        if recherche is None:
+            continue
+        for n in np.nonzero(valides & ~resolues[bloc])[0]:
+            assignations = recherche(csp_depuis_candidats(cand[n]),
+                                     **(options or {}))
+            if assignations:
+                for (y, x), v in assignations.items():
+                    grilles[debut + n, y * 9 + x] = int(v)
+                resolues[debut + n] = True
+
+    # Toute solution, trouvée par propagation ou par recherche, est vérifiée.
+    resolues &= validation.valider_lot(grilles)
+    return resolues
+
+
+def resoudre_lignes(lignes, recherche=None, options=None):
+    """Solutions en lignes de 81 caractères, '-' pour une grille non résolue."""
+    valides = [len(ligne) == grille.NB_CASES for ligne in lignes]
+    grilles = lignes2grilles([ligne for ligne, ok in zip(lignes, valides) if ok])
+    resolues = resoudre_grilles(grilles, recherche, options)
+    solutions = iter(solution if ok else '-' for solution, ok
+                     in zip(grilles2lignes(grilles), resolues))
+    return [next(solutions) if ok else '-' for ok in valides]
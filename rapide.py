@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Démarrage rapide: résout les grilles données en une ligne (arguments ou
+# entrée standard) et écrit leurs solutions, sans charger NumPy ni
+# sudoku.py. Pour les appels courts depuis des scripts, où le démarrage
+# domine le temps de résolution.
+#
+# Seuls grille.py, csp.py, moteurs.py et le moteur sont chargés (ni NumPy,
+# ni argparse, ni pdb). Voir bench_demarrage.py pour le coût du démarrage.
+#
+#   python rapide.py [-joueur MOTEUR] [-piste] [-variable mrv] [GRILLE ...]
+###
+
+import os
+import sys
+
+import grille
+from csp import CSP
+from moteurs import SOLVEURS_INTEGRES
+
+USAGE = """usage: rapide.py [-h] [-joueur MOTEUR] [-ordre INT] [-piste]
+                 [-variable ORDRE] [-valeur ORDRE] [-regles REGLES] [GRILLE ...]
+
+Résoudre des grilles données en une ligne (N² symboles, '.', '0' ou ' ' si
+vide; ou N² nombres séparés) et écrire une solution par ligne ('-' si aucune).
+Sans GRILLE, les grilles sont lues sur l'entrée standard.
+
+Options (voir sudoku.py -h): -joueur {0} ou un fichier .py
+(défaut: solution_sudoku.py), -ordre (défaut: 3), -piste, -variable,
+-valeur, -regles.
+""".format(', '.join(SOLVEURS_INTEGRES))
+
+
+def creer_csp(ligne, ordre=3):
+    """CSP d'une grille en une ligne (voir sudoku.SudokuUtil.convertir)."""
+    index = grille.index(ordre)
+    symboles = ligne.split()
+    if len(symboles) != index.nb_cases:
+        symboles = ligne.rstrip('\r\n')
+        if len(symboles) != index.nb_cases:
+            raise ValueError("Grille de {0} cases attendue: {1!r}".format(
+                index.nb_cases, ligne))
+        valeurs = [0 if s in ' .0' else grille.SYMBOLES.index(s.upper()) + 1
+                   for s in symboles]
+    else:
+        valeurs = [0 if s == '.' else int(s) for s in symboles]
+
+    variables, remplies, domaines = [], [], {}
+    for X, v in zip(index.cases, valeurs):
+        if not 0 <= v <= index.taille:
+            raise ValueError("Valeur hors de la grille: {0}".format(v))
+        if v:
+            remplies.append(X)
+            domaines[X] = [index.valeurs[v - 1]]
+        else:
+            variables.append(X)
+            domaines[X] = list(index.valeurs)
+    return CSP(variables + remplies, domaines, index.contraintes)
+
+
+def resoudre(ligne, moteur, ordre=3, options=None):
+    """Solution d'une grille en une ligne d'un symbole par case, ou '-'."""
+    try:
+        csp = creer_csp(ligne, ordre)
+    except ValueError:
+        return '-'
+    assignations = moteur.backtracking_search(csp, **(options or {}))
+    if not assignations:
+        return '-'
+    index = grille.index(ordre)
+    domaines = csp.domaines
+    return ''.join((assignations.get(X) or domaines[X][0]).decode()
+                   for X in index.cases)
+
+
+def charger(player):
+    """Module du moteur; seul un fichier hors du dépôt passe par sudoku.py."""
+    import importlib
+    if player in SOLVEURS_INTEGRES:
+        return importlib.import_module(SOLVEURS_INTEGRES[player])
+    chemin = os.path.abspath(player)
+    if os.path.dirname(chemin) == os.path.dirname(os.path.abspath(__file__)):
+        return importlib.import_module(os.path.splitext(os.path.basename(chemin))[0])
+    import sudoku
+    return sudoku.chargerSolution(player)
+
+
+def analyser(arguments):
+    """Retourne (joueur, ordre, options de recherche, grilles)."""
+    player, ordre, options, grilles = 'solution_sudoku.py', 3, {}, []
+    arguments = list(arguments)
+    while arguments:
+        a = arguments.pop(0)
+        if a in ('-h', '--help'):
+            print(USAGE)
+            sys.exit(0)
+        elif a == '-piste':
+            options['piste'] = True
+        elif a in ('-joueur', '-ordre', '-variable', '-valeur', '-regles'):
+            if not arguments:
+                sys.exit("{0}: valeur manquante\n{1}".format(a, USAGE))
+            valeur = arguments.pop(0)
+            if a == '-joueur':
+                player = valeur
+            elif a == '-ordre':
+                ordre = int(valeur)
+            elif a == '-regles':
+                import propagation
+                options['regles'] = list(propagation.REGLES) \
+                    if valeur == 'toutes' else valeur.split(',')
+            else:
+                options[a[1:]] = valeur
+        else:
+            grilles.append(a)
+    return player, ordre, options, grilles
+
+
+def main():
+    player, ordre, options, grilles = analyser(sys.argv[1:])
+    if player not in SOLVEURS_INTEGRES and not player.endswith('.py'):
+        sys.exit("Joueur doit être un moteur ({0}) ou un fichier .py".format(
+            ', '.join(SOLVEURS_INTEGRES)))
+    moteur = charger(player)
+    verifier = getattr(moteur, 'verifier_options', None)
+    if verifier is not None:
+        try:
+            verifier(options)
+        except ValueError as e:
+            sys.exit(str(e))
+
+    for ligne in grilles or sys.stdin:
+        sys.stdout.write(resoudre(ligne, moteur, ordre, options) + "\n")
+
+
+if __name__ == "__main__":
+    main()
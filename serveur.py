@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Service de résolution: un serveur asyncio de longue durée, sur un socket
+# Unix ou TCP local, reçoit des grilles (une par ligne) et renvoie leurs
+# solutions au fur et à mesure.
+#
+# Les requêtes reçues dans une courte fenêtre de temps sont regroupées en
+# lots, envoyés à un ensemble de processus qui gardent le moteur chargé
+# (sudoku_batch._initialiser): le démarrage (NumPy, chargement du fichier
+# solution) n'est payé qu'une fois par processus, pas à chaque appel.
+#
+# Protocole (lignes UTF-8):
+#   requête:  [ID<tab>]GRILLE               (format de sudoku_batch)
+#   réponse:  ID<tab>SOLUTION<tab>LATENCE   (SOLUTION '-' si aucune, '?' si le
+#                                            budget est épuisé; LATENCE en ms,
+#                                            de la réception à la réponse)
+#   'stats':  une ligne JSON des métriques (voir Metriques.en_dict).
+# Sans ID, les requêtes d'une connexion sont numérotées à partir de 0. Les
+# réponses suivent l'ordre de fin des lots, pas forcément celui des requêtes.
+###
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import sys
+import time
+
+from collections import deque
+
+import sudoku
+import sudoku_batch
+
+
+class Metriques:
+    """
+    Métriques du service.
+
+    latences: latences (ms) des dernières requêtes, pour p50 et p99.
+    file: requêtes reçues, pas encore envoyées à un processus.
+    """
+
+    def __init__(self, taille=10000):
+        self.latences = deque(maxlen=taille)
+        self.requetes = 0
+        self.lots = 0
+        self.grilles_lots = 0
+        self.file = 0
+        self.file_max = 0
+        self.lots_en_cours = 0
+
+    def recue(self):
+        self.file += 1
+        self.file_max = max(self.file_max, self.file)
+
+    def lot(self, taille):
+        self.file -= taille
+        self.lots += 1
+        self.grilles_lots += taille
+
+    def repondue(self, latence):
+        self.requetes += 1
+        self.latences.append(latence)
+
+    def centile(self, p):
+        if not self.latences:
+            return 0.
+        latences = sorted(self.latences)
+        return latences[min(len(latences) - 1, int(p * len(latences)))]
+
+    def en_dict(self):
+        return {
+            'requetes': self.requetes,
+            'lots': self.lots,
+            'taille_lot_moyenne': self.grilles_lots / self.lots if self.lots else 0.,
+            'latence_p50_ms': self.centile(0.50),
+            'latence_p99_ms': self.centile(0.99),
+            'latence_max_ms': max(self.latences, default=0.),
+            'file': self.file,
+            'file_max': self.file_max,
+            'lots_en_cours': self.lots_en_cours,
+        }
+
+    def __str__(self):
+        return "{requetes} requêtes, {lots} lots (moy. {taille_lot_moyenne:0.1f}), " \
+               "latence p50 {latence_p50_ms:0.2f} ms, p99 {latence_p99_ms:0.2f} ms, " \
+               "file {file} (max {file_max})".format(**self.en_dict())
+
+
+async def regrouper(file, executeur, metriques, nb_processus, taille_lot, fenetre):
+    """
+    Envoie les requêtes de 'file' aux processus, par lots.
+
+    Un lot est formé dès qu'un processus est libre: il part après 'fenetre'
+    secondes suivant sa première requête, ou dès qu'il a 'taille_lot' requêtes.
+    Quand tous les processus sont occupés, les requêtes s'accumulent dans la
+    file et le lot suivant part plein, sans attendre.
+    """
+    loop = asyncio.get_running_loop()
+    libres = asyncio.Semaphore(nb_processus)
+    while True:
+        await libres.acquire()
+        requetes = [await file.get()]
+        limite = loop.time() + fenetre
+        while len(requetes) < taille_lot:
+            if file.empty():
+                delai = limite - loop.time()
+                if delai <= 0:
+                    break
+                try:
+                    requetes.append(await asyncio.wait_for(file.get(), delai))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                requetes.append(file.get_nowait())
+        metriques.lot(len(requetes))
+        loop.create_task(_envoyer(requetes, executeur, metriques, libres))
+
+
+async def _envoyer(requetes, executeur, metriques, libres):
+    metriques.lots_en_cours += 1
+    try:
+        lot = [(k, ligne) for k, (ligne, _) in enumerate(requetes)]
+        resultats = await asyncio.get_running_loop().run_in_executor(
+            executeur, sudoku_batch.resoudre_lot, lot)
+    except Exception as e:
+        print("Erreur de résolution: {0!r}".format(e), file=sys.stderr)
+        resultats = [(k, '-') for k in range(len(requetes))]
+    finally:
+        metriques.lots_en_cours -= 1
+        libres.release()
+    for k, solution in resultats:
+        requetes[k][1].set_result(solution)
+
+
+def recevoir(ligne, file, metriques):
+    """
+    Met une grille en file dès sa lecture (une commande 'stats' lue ensuite
+    la compte); retourne le futur de sa solution.
+    """
+    futur = asyncio.get_running_loop().create_future()
+    metriques.recue()
+    file.put_nowait((ligne, futur))
+    return futur
+
+
+async def repondre(ident, futur, debut, ecrivain, metriques):
+    solution = await futur
+    latence = (time.perf_counter() - debut) * 1000.
+    metriques.repondue(latence)
+    ecrivain.write("{0}\t{1}\t{2:0.3f}\n".format(ident, solution, latence).encode())
+    try:
+        await ecrivain.drain()
+    except ConnectionError:
+        pass  # Client parti: les réponses restantes sont perdues.
+
+
+async def servir_connexion(lecteur, ecrivain, file, metriques):
+    """Lit les requêtes d'une connexion; la ferme une fois toutes répondues."""
+    taches = set()
+    numero = 0
+    try:
+        while True:
+            ligne = await lecteur.readline()
+            if not ligne:
+                break
+            # Octets non UTF-8: la ligne est répondue '-' comme toute grille
+            # invalide, sans couper la connexion.
+            ligne = ligne.decode('utf-8', errors='replace').rstrip('\r\n')
+            if ligne == 'stats':
+                ecrivain.write((json.dumps(metriques.en_dict()) + "\n").encode())
+                continue
+            if '\t' in ligne:
+                ident, ligne = ligne.split('\t', 1)
+            else:
+                ident = str(numero)
+            numero += 1
+            debut = time.perf_counter()
+            futur = recevoir(ligne, file, metriques)
+            tache = asyncio.ensure_future(
+                repondre(ident, futur, debut, ecrivain, metriques))
+            taches.add(tache)
+            tache.add_done_callback(taches.discard)
+        if taches:
+            await asyncio.gather(*taches)
+    except ConnectionError:
+        pass
+    finally:
+        ecrivain.close()
+
+
+async def rapporter(metriques, periode):
+    while True:
+        await asyncio.sleep(periode)
+        print(metriques, file=sys.stderr)
+
+
+async def servir(metriques, unix=None, hote='127.0.0.1', port=8765,
+                 player='solution_sudoku.py', representation='listes',
+                 options=None, nb_processus=None, taille_lot=16, fenetre=0.002,
+                 vectoriser=False, cache_taille=0, ordre=3, rapport=0,
+                 secours=None):
+    """
+    Sert les requêtes jusqu'à l'annulation (Ctrl-C).
+
+    unix: chemin du socket Unix; sinon le serveur écoute sur hote:port.
+    fenetre: attente maximale (sec.) d'un lot incomplet.
+    rapport: période (sec.) d'affichage des métriques sur stderr (0: jamais).
+    Les autres paramètres sont ceux de sudoku_batch.resoudre_flux.
+    """
+    nb_processus = nb_processus or multiprocessing.cpu_count()
+    loop = asyncio.get_running_loop()
+    file = asyncio.Queue()
+
+    with concurrent.futures.ProcessPoolExecutor(
+            nb_processus, initializer=sudoku_batch._initialiser,
+            initargs=(player, representation, options, vectoriser,
+                      cache_taille, ordre, secours)) as executeur:
+        # Démarre les processus (et charge le moteur) avant la première requête.
+        await asyncio.gather(*[loop.run_in_executor(
+            executeur, sudoku_batch.resoudre_lot, []) for _ in range(nb_processus)])
+
+        taches = [loop.create_task(regrouper(file, executeur, metriques,
+                                             nb_processus, taille_lot, fenetre))]
+        if rapport:
+            taches.append(loop.create_task(rapporter(metriques, rapport)))
+
+        def connexion(lecteur, ecrivain):
+            return servir_connexion(lecteur, ecrivain, file, metriques)
+
+        if unix:
+            serveur = await asyncio.start_unix_server(connexion, path=unix)
+            adresse = unix
+        else:
+            serveur = await asyncio.start_server(connexion, hote, port)
+            adresse = "{0}:{1}".format(hote, port)
+        print("En écoute sur {0} ({1} processus)".format(adresse, nb_processus),
+              file=sys.stderr)
+
+        try:
+            async with serveur:
+                await serveur.serve_forever()
+        finally:
+            for tache in taches:
+                tache.cancel()
+
+
+DESCRIPTION = "Servir la résolution de grilles sur un socket local " \
+              "(une grille par ligne, format de sudoku_batch)."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('-unix', dest='unix', metavar="CHEMIN", action='store',
+                   type=str, required=False,
+                   help="chemin du socket Unix (sinon: TCP sur -hote/-port).")
+
+    p.add_argument('-hote', dest='hote', metavar="HOTE", action='store',
+                   type=str, required=False, default='127.0.0.1',
+                   help="adresse TCP d'écoute.")
+
+    p.add_argument('-port', dest='port', metavar="INT", action='store',
+                   type=int, required=False, default=8765,
+                   help="port TCP d'écoute.")
+
+    p.add_argument('-joueur', dest="player", metavar="JOUEUR", action='store',
+                   type=str, required=False, default="solution_sudoku.py",
+                   help="moteur intégré ou fichier contenant votre solution.")
+
+    p.add_argument('-ordre', dest='ordre', metavar="INT", action='store',
+                   type=int, required=False, default=3, choices=[2, 3, 4, 5],
+                   help="ordre des grilles (taille des blocs): 3 pour 9x9, "
+                        "4 pour 16x16, 5 pour 25x25.")
+
+    sudoku.ajouterOptionsRecherche(p)
+    sudoku.ajouterOptionsBudget(p)
+
+    p.add_argument('-secours', dest='secours', metavar="JOUEUR",
+                   action='store', type=str, required=False,
+                   help="moteur reprenant sans budget les grilles qui "
+                        "épuisent le budget (sinon la réponse est '?').")
+
+    p.add_argument('-processus', dest='nb_processus', metavar="INT",
+                   action='store', type=int, required=False,
+                   help="nombre de processus (défaut: nombre de coeurs).")
+
+    p.add_argument('-lot', dest='taille_lot', metavar="INT", action='store',
+                   type=int, required=False, default=16,
+                   help="nombre maximal de grilles par lot.")
+
+    p.add_argument('-fenetre', dest='fenetre', metavar="MS", action='store',
+                   type=float, required=False, default=2.,
+                   help="attente maximale (ms) d'un lot incomplet.")
+
+    p.add_argument('-vectoriser', dest='vectoriser', action='store_true',
+                   required=False,
+                   help="propager chaque lot avec NumPy avant la recherche.")
+
+    p.add_argument('-cache_taille', dest='cache_taille', metavar="INT",
+                   action='store', type=int, required=False, default=0,
+                   help="taille du cache de solutions de chaque processus.")
+
+    p.add_argument('-rapport', dest='rapport', metavar="SEC", action='store',
+                   type=float, required=False, default=0,
+                   help="période d'affichage des métriques (0: à l'arrêt seulement).")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    if not args.player.endswith('.py') \
+            and args.player not in sudoku.SOLVEURS_INTEGRES:
+        parser.error('Joueur doit être un moteur intégré ({0}) ou un fichier '
+                     '.py (ex. solution_sudoku.py)'.format(
+                         ', '.join(sudoku.SOLVEURS_INTEGRES)))
+
+    if args.ordre != 3 and (args.vectoriser or args.representation == 'masques'):
+        parser.error("-vectoriser et -domaines masques sont limités aux "
+                     "grilles 9x9 (-ordre 3).")
+
+    options = sudoku.optionsRecherche(args)
+    budget = sudoku.budgetRecherche(args)
+    if budget is not None:
+        if args.vectoriser:
+            parser.error("-temps_max et -noeuds_max ne s'appliquent pas "
+                         "avec -vectoriser.")
+        options['budget'] = budget
+    if args.secours is not None and not args.secours.endswith('.py') \
+            and args.secours not in sudoku.SOLVEURS_INTEGRES:
+        parser.error("-secours doit être un moteur intégré ou un fichier .py.")
+    try:
+        sudoku.verifierOptions(args.player, options)
+    except ValueError as e:
+        parser.error(str(e))
+
+    metriques = Metriques()
+    try:
+        asyncio.run(servir(
+            metriques, args.unix, args.hote, args.port, args.player,
+            args.representation, options, args.nb_processus, args.taille_lot,
+            args.fenetre / 1000., args.vectoriser, args.cache_taille,
+            args.ordre, args.rapport, args.secours))
+    except KeyboardInterrupt:
+        pass
+    print(metriques, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,11 +4,26 @@
 # Nader Baydoun (20156885)
 ###
 
-from pdb import set_trace as dbg  # Utiliser dbg() pour faire un break dans votre code.
+import sys
+import time
+
+from collections import deque
+
+import ac3
+import grille
+from csp import CSP
+from csp_masques import case
+from backjumping import EtatCBJ, MagasinNogoods
+from budget import BudgetEpuise, RESOLUE, IMPOSSIBLE, EPUISE
+from heuristiques import EtatHeuristique
+from propagation import Propagation
+
+
+# Utiliser dbg() pour faire un break dans votre code (pdb n'est chargé qu'à l'appel).
+def dbg():
+    import pdb
+    pdb.Pdb().set_trace(sys._getframe(1))
 
-import numpy as np
-import random
-import sudoku
 
 #####
 # reviser: Fonction utilisée par AC3 afin de réduire le domaine de Xi en fonction des contraintes de Xj.
@@ -25,9 +40,17 @@ import sudoku
 ###
 def reviser(Xi, Xj, csp):
     change = False
-    for x in csp.domaines:
-        if csp.contraintes[x] is not None:  # Might need to change it to a negation
-            csp.domaines.remove(x)
+    domaine = csp.domaines[Xi]
+    if len(csp.domaines[Xj]) != 1:
+        return change, csp  # Xi != Xj: chaque x a un support dans Xj.
+    # Parcours à rebours: un retrait ne décale pas les indices restant à visiter.
+    for i in range(len(domaine) - 1, -1, -1):
+        x = domaine[i]
+        # x est retirée si aucune valeur de Xj n'est compatible avec elle.
+        if not any(x != y for y in csp.domaines[Xj]):
+            domaine.remove(x)
+            if csp.piste is not None:
+                csp.piste.append((Xi, i, x))
             change = True
     return change, csp
 
@@ -39,20 +62,65 @@ def reviser(Xi, Xj, csp):
 #      de satisfaction de contraintes pour une grille de Sudoku.
 #      Pour plus d'information, voir doc de la fonction 'backtracking_search'.
 #
+# stats: Objet statistiques.Statistiques recevant le nombre d'arcs révisés, ou None.
+#
+# x: Case (tuple (Y,X)) dont le domaine vient d'être réduit, ou None. Avec les masques,
+#    si le csp était arc-consistent avant cette réduction (csp.propagee), seuls les
+#    arcs des voisins de x vers x sont mis en file au départ.
+#
 # retour: Un tuple contenant le csp optimisé et un booléen indiquant si aucune contrainte n'est violée.
 ###
-def AC3(csp):
-    file_arcs = csp.arcs()
+def AC3(csp, stats=None, x=None):
+    # Domaines en masques de bits: moteur ac3.propager sur les arcs entiers.
+    if getattr(csp, 'masques', None) is not None \
+            and csp.contraintes is grille.CONTRAINTES:
+        piste = csp.piste
+        arcs = None
+        if x is not None and _propagee(csp):
+            arcs = ac3.arcs_vers([case(x)])
+        # Entrée de piste (celle de x) d'où part la propagation complète.
+        debut = (len(piste) - 1, piste[-1]) if piste else True
+        ok, nb = ac3.propager(csp.masques, arcs=arcs, piste=piste)
+        if ok and arcs is None:
+            csp.propagee = debut
+        if stats is not None:
+            stats.propagation(nb)
+        return csp, ok
+
+    file_arcs = deque(csp.arcs())
+    en_file = set(file_arcs)  # Un arc n'est jamais en file deux fois.
+    nb = 0
+    ok = True
     while (file_arcs):
-        (xi, xj) = file_arcs.pop(0)
+        (xi, xj) = arc = file_arcs.popleft()
+        en_file.remove(arc)
+        nb += 1
         change, csp = reviser(xi,xj,csp)
         if change:
-            if not csp.domaines:
-                return None, False
-            for xk in file_arcs: # it should be xk in voisins
-                if xk != xj:
-                    file_arcs.append(xk,xj)
-    return csp, True
+            if not csp.domaines[xi]:
+                ok = False
+                break
+            for xk in csp.contraintes[xi]:
+                if xk != xj and (xk, xi) not in en_file:
+                    en_file.add((xk, xi))
+                    file_arcs.append((xk, xi))
+    if stats is not None:
+        stats.propagation(nb)
+    return csp, ok
+
+
+#####
+# _propagee: Vrai si les domaines du csp (masques) étaient arc-consistants avant la
+#            dernière réduction: la propagation complète qui les a rendus tels n'a pas
+#            été annulée depuis (son entrée de piste est toujours en place).
+###
+def _propagee(csp):
+    etat = csp.propagee
+    if etat is None or etat is True:
+        return etat is True
+    i, entree = etat
+    piste = csp.piste
+    return piste is not None and i < len(piste) and piste[i] is entree
 
 
 #####
@@ -60,7 +128,7 @@ def AC3(csp):
 #
 # X: Tuple contenant la position en y et en x de la case concernée par l'affectation.
 #
-# v: String représentant la valeur (entre [1-9]) concernée par l'affectation.
+# v: String représentant la valeur ([1-9], puis [A-Z] au-delà de 9x9) concernée par l'affectation.
 #
 # assignations: dict mappant les cases (tuple (Y,X)) vides à une valeur.
 #
@@ -71,11 +139,44 @@ def AC3(csp):
 # retour: Un booléean indiquant si l'affectation de la valeur v à la case X est légale.
 ###
 def est_compatible(X, v, assignations, csp):
-    choice = random.randrange(0,1)
-    if choice is 0:
-        return False
-    else:
-        return True
+    for Xk in csp.contraintes[X]:
+        if assignations.get(Xk) == v:
+            return False
+    return True
+
+
+#####
+# choisir_variable : Sélectionne la prochaine case à assigner.
+#
+# assignations: dict mappant les cases (tuple (Y,X)) vides à une valeur.
+#
+# csp: Objet de la classe CSP.
+#
+# h: EtatHeuristique (MRV avec départage par degré) ou None pour l'ordre de csp.variables.
+#
+# retour: La case (tuple (Y,X)) choisie.
+###
+def choisir_variable(assignations, csp, h):
+    if h is not None and h.mrv:
+        return h.choisir_variable(assignations)
+    return next(X for X in csp.variables if X not in assignations)
+
+
+#####
+# ordonner_valeurs : Ordonne les valeurs du domaine de x à essayer.
+#
+# x: Case (tuple (Y,X)) choisie.
+#
+# csp: Objet de la classe CSP.
+#
+# h: EtatHeuristique (LCV) ou None pour l'ordre du domaine.
+#
+# retour: Une liste des valeurs du domaine de x.
+###
+def ordonner_valeurs(x, csp, h):
+    if h is not None and h.lcv:
+        return h.ordonner_valeurs(x, csp.domaines[x])
+    return list(csp.domaines[x])
 
 
 #####
@@ -88,25 +189,326 @@ def est_compatible(X, v, assignations, csp):
 #      de satisfaction de contraintes pour une grille de Sudoku.
 #      Pour plus d'information, voir doc de la fonction 'backtracking_search'.
 #
+# h: EtatHeuristique mis à jour à chaque coup, ou None (ordre fixe).
+#
+# stats: Objet statistiques.Statistiques, ou None.
+#
+# regles: Objet propagation.Propagation utilisé par l'inférence, ou None pour AC3.
+#
 # retour: Le dictionnaire des assignations (case => valeur)
 ###
-def backtrack(assignations, csp):
-    if not csp.variables:
+def backtrack(assignations, csp, h=None, stats=None, regles=None):
+    if len(assignations) == len(csp.variables):
         return assignations
-    x = csp.variables
-    for v in x:
+    x = choisir_variable(assignations, csp, h)
+    for v in ordonner_valeurs(x, csp, h):
         if est_compatible(x,v,assignations,csp):
             assignations[x] = v
+            if stats is not None:
+                stats.noeud()
             cspCopy = csp.copy()
-            cspCopy = v
-            cspCopy, ok = inference(x, csp)
+            cspCopy.domaines[x] = [v]
+            if h is not None:
+                # Piste temporaire: seulement pour connaître les cases modifiées.
+                cspCopy.piste = []
+                h.assigner(x)
+                marque_h = h.marque()
+            cspCopy, ok = inference(x, cspCopy, stats, regles)
+            if h is not None:
+                if ok:
+                    h.observer(cspCopy, [x] + [e[0] for e in cspCopy.piste])
+                cspCopy.piste = None
+            if ok:
+                result = backtrack(assignations, cspCopy, h, stats, regles)
+                if result is not False:
+                    return result
+            if h is not None:
+                h.annuler(marque_h)
+                h.liberer(x)
+            if stats is not None:
+                stats.backtracks += 1
+            assignations.pop(x)
+    return False
+
+#####
+# annuler : Restaure les domaines modifiés depuis une marque de la piste.
+#
+# csp: Objet de la classe CSP dont la piste est active.
+#
+# marque: Longueur de la piste à laquelle revenir.
+###
+def annuler(csp, marque):
+    piste = csp.piste
+    while len(piste) > marque:
+        X, i, v = piste.pop()
+        if i is None:
+            csp.domaines[X] = v  # Domaine complet remplacé par une affectation.
+        else:
+            csp.domaines[X].insert(i, v)
+
+
+#####
+# backtrack_piste : Comme 'backtrack', mais sans copier le CSP. Les retraits de valeurs
+#                   sont empilés sur 'csp.piste' et annulés quand une branche échoue.
+#
+# assignations: dict mappant les cases (tuple (Y,X)) vides à une valeur.
+#
+# csp: Objet de la classe CSP dont la piste est active (csp.piste est une liste).
+#
+# h: EtatHeuristique mis à jour à chaque coup, ou None (ordre fixe).
+#
+# stats: Objet statistiques.Statistiques, ou None.
+#
+# regles: Objet propagation.Propagation utilisé par l'inférence, ou None pour AC3.
+#
+# retour: Le dictionnaire des assignations (case => valeur)
+###
+def backtrack_piste(assignations, csp, h=None, stats=None, regles=None):
+    if len(assignations) == len(csp.variables):
+        return assignations
+    x = choisir_variable(assignations, csp, h)
+    for v in ordonner_valeurs(x, csp, h):
+        if est_compatible(x,v,assignations,csp):
+            assignations[x] = v
+            if stats is not None:
+                stats.noeud()
+            marque = len(csp.piste)
+            csp.piste.append((x, None, list(csp.domaines[x])))
+            csp.domaines[x] = [v]
+            if h is not None:
+                h.assigner(x)
+                marque_h = h.marque()
+            csp, ok = inference(x, csp, stats, regles)
             if ok:
-                result = backtrack(assignations, cspCopy)
+                if h is not None:
+                    h.observer(csp, [e[0] for e in csp.piste[marque:]])
+                result = backtrack_piste(assignations, csp, h, stats, regles)
                 if result is not False:
                     return result
+            if h is not None:
+                h.annuler(marque_h)
+                h.liberer(x)
+            if stats is not None:
+                stats.backtracks += 1
+            annuler(csp, marque)
             assignations.pop(x)
     return False
 
+
+#####
+# backtrack_cbj : Comme 'backtrack_piste', avec retour arrière dirigé par les conflits
+#                 (voir backjumping.py). Quand le sous-arbre d'une valeur échoue sans
+#                 dépendre de la case choisie, les autres valeurs ne sont pas essayées:
+#                 l'échec remonte jusqu'au plus profond niveau qui l'a causé.
+#
+# assignations: dict mappant les cases (tuple (Y,X)) vides à une valeur.
+#
+# csp: Objet de la classe CSP dont la piste est active, propagé à la racine.
+#
+# h: EtatHeuristique mis à jour à chaque coup, ou None (ordre fixe).
+#
+# stats: Objet statistiques.Statistiques, ou None.
+#
+# cbj: Objet backjumping.EtatCBJ (explications, niveaux et nogoods).
+#
+# solution: Fonction appelée avec chaque solution trouvée (énumération); si elle retourne
+#           faux, la recherche continue comme si la branche avait échoué à cause de
+#           tous les niveaux (retour arrière chronologique). None: première solution.
+#
+# retour: Un tuple (assignations ou False, ensemble de conflits en masque de niveaux).
+###
+def backtrack_cbj(assignations, csp, h=None, stats=None, cbj=None, solution=None):
+    if len(assignations) == len(csp.variables):
+        if solution is None or solution(assignations):
+            return assignations, 0
+        return False, (2 << len(cbj.decisions)) - 2
+    x = choisir_variable(assignations, csp, h)
+    # Une case réduite à une valeur n'est pas une décision: son explication
+    # est celle de son domaine.
+    force = len(csp.domaines[x]) == 1
+    conflits = 0
+    for v in ordonner_valeurs(x, csp, h):
+        if not est_compatible(x,v,assignations,csp):
+            continue
+        if not force and cbj.nogoods is not None:
+            autres = cbj.nogoods.viole(x, v, assignations)
+            if autres is not None:
+                if stats is not None:
+                    stats.nogoods += 1
+                for Y, _ in autres:
+                    conflits |= cbj.explication(Y, csp)
+                continue
+        assignations[x] = v
+        if stats is not None:
+            stats.noeud()
+        marque = len(csp.piste)
+        csp.piste.append((x, None, list(csp.domaines[x])))
+        csp.domaines[x] = [v]
+        bit = 0 if force else cbj.decider(x)
+        if h is not None:
+            h.assigner(x)
+            marque_h = h.marque()
+        if stats is not None:
+            debut = time.perf_counter()
+        echec = cbj.propager(csp, [x])
+        if stats is not None:
+            stats.propagation(len(csp.piste) - marque)
+            stats.ajouter_temps('propagation', debut)
+        if echec is None:
+            if h is not None:
+                h.observer(csp, [e[0] for e in csp.piste[marque:]])
+            result, echec = backtrack_cbj(assignations, csp, h, stats, cbj,
+                                          solution)
+            if result is not False:
+                return result, 0
+        if h is not None:
+            h.annuler(marque_h)
+            h.liberer(x)
+        if stats is not None:
+            stats.backtracks += 1
+        annuler(csp, marque)
+        if not force:
+            cbj.abandonner(x)
+        assignations.pop(x)
+        if not echec & bit and not force:
+            # L'échec ne dépend pas de x: saut vers un niveau plus haut.
+            if stats is not None:
+                stats.sauts += 1
+            return False, echec
+        conflits |= echec & ~bit
+    if not force:
+        # Valeurs de x retirées avant son choix.
+        domaine = csp.domaines[x]
+        for v in cbj.valeurs:
+            if v not in domaine:
+                conflits |= cbj.raison.get((x, v), 0)
+        if cbj.nogoods is not None:
+            cbj.nogoods.ajouter(cbj.affectations(conflits, assignations))
+    return False, conflits
+
+
+#####
+# solutions_piste : Comme 'backtrack_piste', mais génère toutes les solutions au lieu de
+#                   s'arrêter à la première. Les branches sœurs repartent des domaines
+#                   propagés de leur parent (annulation de la piste), sans recréer le CSP.
+#
+# assignations, csp, h, stats, regles: Voir 'backtrack_piste'.
+#
+# retour: Un générateur de dictionnaires d'assignations (copies).
+###
+def solutions_piste(assignations, csp, h=None, stats=None, regles=None):
+    if len(assignations) == len(csp.variables):
+        yield dict(assignations)
+        return
+    x = choisir_variable(assignations, csp, h)
+    for v in ordonner_valeurs(x, csp, h):
+        if est_compatible(x,v,assignations,csp):
+            assignations[x] = v
+            if stats is not None:
+                stats.noeud()
+            marque = len(csp.piste)
+            csp.piste.append((x, None, list(csp.domaines[x])))
+            csp.domaines[x] = [v]
+            if h is not None:
+                h.assigner(x)
+                marque_h = h.marque()
+            csp, ok = inference(x, csp, stats, regles)
+            if ok:
+                if h is not None:
+                    h.observer(csp, [e[0] for e in csp.piste[marque:]])
+                yield from solutions_piste(assignations, csp, h, stats, regles)
+            if h is not None:
+                h.annuler(marque_h)
+                h.liberer(x)
+            if stats is not None:
+                stats.backtracks += 1
+            annuler(csp, marque)
+            assignations.pop(x)
+
+
+#####
+# compter_solutions : Compte les solutions de la grille, jusqu'à une limite.
+#
+# csp: Objet de la classe CSP (voir 'backtracking_search').
+#
+# limite: Nombre de solutions après lequel la recherche s'arrête (2 pour vérifier
+#         qu'une grille a une solution unique), None pour toutes les compter.
+#
+# garder: Nombre de solutions retournées (les premières trouvées).
+#
+# variable, valeur, stats, regles, cbj, nogoods: Voir 'backtracking_search'.
+#
+# budget: Objet budget.Budget, ou None. S'il est épuisé, le comptage s'arrête et retourne
+#         les solutions trouvées jusque-là (budget.statut vaut EPUISE).
+#
+# piste: Sans effet: le comptage se fait toujours avec la piste.
+#
+# processus: Doit valoir 1 (pas de comptage parallèle).
+#
+# retour: Un tuple (nombre de solutions, liste des 'garder' premières solutions).
+###
+def compter_solutions(csp, limite=None, garder=1, variable='ordre',
+                      valeur='ordre', stats=None, regles=None, cbj=False,
+                      nogoods=1000, budget=None, piste=True, processus=1):
+    if processus > 1:
+        raise ValueError("Le comptage des solutions n'est pas parallèle "
+                         "(processus=1).")
+    if cbj and regles:
+        raise ValueError("Le mode cbj a sa propre propagation: il est "
+                         "incompatible avec 'regles'.")
+    if budget is not None:
+        stats = budget.demarrer(stats, {})
+    if stats is not None:
+        debut = time.perf_counter()
+    solutions = []
+    nb = 0
+
+    def trouvee(assignations):
+        nonlocal nb
+        nb += 1
+        if len(solutions) < garder:
+            solutions.append(dict(assignations))
+        return nb == limite
+
+    try:
+        _enumerer(csp, trouvee, variable, valeur, stats, regles,
+                  creer_cbj(csp, cbj, nogoods))
+    except BudgetEpuise:
+        budget.terminer(stats, EPUISE)
+    except BaseException:
+        if budget is not None:
+            budget.terminer(stats, None)
+        raise
+    else:
+        if budget is not None:
+            budget.terminer(stats, RESOLUE if nb else IMPOSSIBLE,
+                            solutions[0] if solutions else None)
+    finally:
+        csp.piste = None
+    if stats is not None:
+        stats.ajouter_temps('recherche', debut)
+    return nb, solutions
+
+
+def _enumerer(csp, trouvee, variable, valeur, stats, regles, cbj):
+    # Appelle trouvee(assignations) pour chaque solution, jusqu'à ce qu'elle retourne vrai.
+    propagation = creer_propagation(csp, regles)
+    if propagation is not None and not propagation.propager(csp, None, stats):
+        return
+    csp.piste = []
+    if cbj is not None and cbj.propager(csp, csp.variables) is not None:
+        return
+    h = None
+    if variable != 'ordre' or valeur != 'ordre':
+        h = EtatHeuristique(csp, variable, valeur)
+    if cbj is not None:
+        backtrack_cbj({}, csp, h, stats, cbj, trouvee)
+        return
+    for solution in solutions_piste({}, csp, h, stats, propagation):
+        if trouvee(solution):
+            return
+
+
 #####
 # backtracking_search : Fonction coquille pour la fonction 'backtrack'.
 #
@@ -114,17 +516,302 @@ def backtrack(assignations, csp):
 #      de satisfaction de contraintes pour une grille de Sudoku. Les variables membres sont
 #      'variables'   : list de cases (tuple (Y,X)) vides
 #      'domaines'    : dict mappant une case à une liste des valeurs possibles
+#                      (ou csp_masques.DomainesMasques, vue équivalente sur des masques de bits)
 #      'contraintes' : dict mappant une case à une liste de cases dont leur valeur doivent être différentes
 #
+# piste: Si vrai, les retraits de valeurs sont annulés au retour arrière (backtrack_piste)
+#        au lieu de copier le CSP à chaque coup.
+#
+# variable: Ordre des cases: 'ordre' (celui de csp.variables) ou 'mrv' (plus petit
+#           domaine, puis plus grand degré).
+#
+# valeur: Ordre des valeurs: 'ordre' (celui du domaine) ou 'lcv' (la moins contraignante).
+#
+# stats: Objet statistiques.Statistiques recevant les compteurs de la recherche, ou None.
+#
+# processus: Nombre de processus; au-delà de 1, les premiers niveaux de l'arbre sont
+#            développés en sous-problèmes (diviser) résolus en parallèle (parallele.py).
+#            La solution retournée est celle du premier sous-problème résolu.
+#
+# regles: Noms des règles de propagation (voir propagation.REGLES) utilisées par
+#         l'inférence à chaque coup, ou None pour AC3.
+#
+# cbj: Si vrai, retour arrière dirigé par les conflits (backtrack_cbj), avec la piste
+#      et la propagation des singletons; incompatible avec 'regles'.
+#
+# nogoods: Capacité du magasin de nogoods appris en mode cbj (0: aucun).
+#
+# budget: Objet budget.Budget (durée et noeuds maximaux), ou None. La recherche s'arrête
+#         quand il est épuisé et retourne False; le budget reçoit le statut, l'affectation
+#         partielle la plus profonde et ses domaines propagés. Limité à un processus.
+#
 # retour: Le dictionnaire des assignations (case => valeur)
 ###
-def backtracking_search(csp):
-    final_result = backtrack({}, csp)
+def backtracking_search(csp, piste=False, variable='ordre', valeur='ordre',
+                        stats=None, processus=1, regles=None, cbj=False,
+                        nogoods=1000, budget=None):
+    if cbj and regles:
+        raise ValueError("Le mode cbj a sa propre propagation: il est "
+                         "incompatible avec 'regles'.")
+    if budget is not None and processus > 1:
+        raise ValueError("Le budget est limité à la recherche séquentielle "
+                         "(processus=1).")
+    if budget is not None:
+        assignations = {}
+        stats = budget.demarrer(stats, assignations)
+    if stats is not None:
+        debut = time.perf_counter()
+    propagation = creer_propagation(csp, regles)
+    if processus > 1:
+        import parallele
+        sous_problemes = diviser(csp, 4 * processus, variable == 'mrv', stats,
+                                 propagation)
+        final_result = parallele.resoudre(
+            __file__, csp.variables, sous_problemes,
+            dict(piste=piste, variable=variable, valeur=valeur, regles=regles,
+                 cbj=cbj, nogoods=nogoods,
+                 masques=getattr(csp, 'masques', None) is not None),
+            processus, stats)
+    elif budget is not None:
+        final_result = rechercher_budget(assignations, csp, budget, piste,
+                                         variable, valeur, stats, propagation,
+                                         creer_cbj(csp, cbj, nogoods))
+    else:
+        final_result = rechercher({}, csp, piste, variable, valeur, stats,
+                                  propagation, creer_cbj(csp, cbj, nogoods))
+    if stats is not None:
+        stats.ajouter_temps('recherche', debut)
     return final_result
 
-def inference(x,csp):
-    for xk in csp.arcs():
-        change,csp = reviser(xk, x, csp)
-        if change and not csp.domaines:
-            return None, False
-        return csp, True
\ No newline at end of file
+
+#####
+# rechercher : Complète des assignations partielles avec backtrack ou backtrack_piste.
+#
+# assignations: dict des cases déjà assignées (vide pour une recherche complète).
+#
+# csp: Objet de la classe CSP dont les domaines sont propagés pour ces assignations.
+#
+# piste, variable, valeur, stats: Voir 'backtracking_search'.
+#
+# propagation: Objet propagation.Propagation (appliqué d'abord à toute la grille), ou
+#              None pour AC3.
+#
+# cbj: Objet backjumping.EtatCBJ pour backtrack_cbj (singletons propagés d'abord à
+#      toute la grille), ou None.
+#
+# retour: Le dictionnaire des assignations (case => valeur), False si aucune solution.
+###
+def rechercher(assignations, csp, piste=False, variable='ordre', valeur='ordre',
+               stats=None, propagation=None, cbj=None):
+    if propagation is not None and not propagation.propager(csp, None, stats):
+        return False
+    if cbj is not None:
+        csp.piste = []
+        if cbj.propager(csp, csp.variables) is not None:
+            csp.piste = None
+            return False
+    h = None
+    if variable != 'ordre' or valeur != 'ordre':
+        h = EtatHeuristique(csp, variable, valeur)
+        for X in assignations:
+            h.assigner(X)
+    if cbj is not None:
+        final_result, _ = backtrack_cbj(assignations, csp, h, stats, cbj)
+        csp.piste = None
+    elif piste:
+        csp.piste = []
+        final_result = backtrack_piste(assignations, csp, h, stats, propagation)
+        csp.piste = None
+    else:
+        final_result = backtrack(assignations, csp, h, stats, propagation)
+    return final_result
+
+
+#####
+# rechercher_budget : Comme 'rechercher', interrompue quand le budget est épuisé.
+#
+# assignations: dict vide, suivi par le budget (budget.demarrer).
+#
+# budget: Objet budget.Budget démarré, qui reçoit le résultat de la recherche.
+#
+# csp, piste, variable, valeur, stats, propagation, cbj: Voir 'rechercher'.
+#
+# retour: Le dictionnaire des assignations (case => valeur), False si aucune solution ou
+#         si le budget est épuisé.
+###
+def rechercher_budget(assignations, csp, budget, piste=False, variable='ordre',
+                      valeur='ordre', stats=None, propagation=None, cbj=None):
+    racine = _domaines(csp)
+    try:
+        final_result = rechercher(assignations, csp, piste, variable, valeur,
+                                  stats, propagation, cbj)
+    except BudgetEpuise:
+        csp.piste = None
+        partielle, domaines = propager_partielle(
+            CSP(csp.variables, racine, csp.contraintes), budget.partielle,
+            propagation)
+        budget.terminer(stats, EPUISE, partielle, domaines)
+        return False
+    except BaseException:
+        budget.terminer(stats, None)
+        raise
+    budget.terminer(stats, RESOLUE if final_result else IMPOSSIBLE,
+                    dict(final_result) if final_result else None)
+    return final_result
+
+
+#####
+# propager_partielle : Domaines propagés à partir d'une affectation partielle.
+#
+# csp: Objet de la classe CSP (domaines en listes) des domaines de départ, modifié.
+#
+# partielle: dict des affectations (case => valeur), dans l'ordre où elles ont été faites.
+#
+# regles: Objet propagation.Propagation, ou None pour AC3.
+#
+# retour: Un tuple (affectations, domaines) où les dernières affectations sont retirées
+#         tant que la propagation échoue (la dernière n'a pas encore été propagée par
+#         la recherche); domaines vaut None si même la grille de départ échoue.
+###
+def propager_partielle(csp, partielle, regles=None):
+    racine = csp.domaines
+    affectations = list(partielle.items())
+    while True:
+        essai = CSP(csp.variables, dict((X, list(d)) for X, d in racine.items()),
+                    csp.contraintes)
+        for X, v in affectations:
+            essai.domaines[X] = [v]
+        essai, ok = inference(None, essai, None, regles)
+        if ok:
+            return dict(affectations), essai.domaines
+        if not affectations:
+            return {}, None
+        affectations.pop()
+
+
+#####
+# creer_propagation : Pipeline de propagation pour les grilles de l'ordre du CSP.
+#
+# regles: Noms des règles (voir propagation.REGLES), ou None.
+#
+# retour: Un objet propagation.Propagation, ou None si aucune règle n'est demandée.
+###
+def creer_propagation(csp, regles):
+    if not regles:
+        return None
+    return Propagation(regles, grille.ordre_de(len(csp.variables)))
+
+
+#####
+# creer_cbj : État du retour arrière dirigé par les conflits.
+#
+# cbj, nogoods: Voir 'backtracking_search'.
+#
+# retour: Un objet backjumping.EtatCBJ, ou None si le mode cbj n'est pas demandé.
+###
+def creer_cbj(csp, cbj, nogoods=1000):
+    if not cbj:
+        return None
+    return EtatCBJ(csp, MagasinNogoods(nogoods) if nogoods else None)
+
+
+#####
+# diviser : Développe les premiers niveaux de l'arbre de recherche en sous-problèmes
+#           indépendants, niveau par niveau, jusqu'à en avoir au moins 'nb_cible'.
+#
+# csp: Objet de la classe CSP (non modifié).
+#
+# nb_cible: Nombre de sous-problèmes visé.
+#
+# mrv: Si vrai, la case développée est celle de plus petit domaine; sinon la première
+#      case non assignée de csp.variables.
+#
+# stats: Objet statistiques.Statistiques, ou None.
+#
+# regles: Objet propagation.Propagation, ou None pour AC3.
+#
+# retour: Une liste de tuples (assignations, domaines propagés), dans l'ordre où la
+#         recherche séquentielle les visiterait; vide si la grille n'a pas de solution.
+###
+def diviser(csp, nb_cible, mrv=False, stats=None, regles=None):
+    csp, ok = inference(None, csp.copy(), stats, regles)
+    if not ok:
+        return []
+    frontiere = [({}, csp)]
+    while len(frontiere) < nb_cible:
+        suivante = []
+        for assignations, csp in frontiere:
+            if len(assignations) == len(csp.variables):
+                return [(assignations, _domaines(csp))]  # Solution trouvée.
+            libres = [X for X in csp.variables if X not in assignations]
+            x = min(libres, key=lambda X: len(csp.domaines[X])) if mrv else libres[0]
+            for v in list(csp.domaines[x]):
+                if est_compatible(x, v, assignations, csp):
+                    if stats is not None:
+                        stats.noeud()
+                    cspCopy = csp.copy()
+                    cspCopy.domaines[x] = [v]
+                    cspCopy, ok = inference(x, cspCopy, stats, regles)
+                    if ok:
+                        branche = dict(assignations)
+                        branche[x] = v
+                        suivante.append((branche, cspCopy))
+        if not suivante:
+            return []
+        frontiere = suivante
+    return [(assignations, _domaines(csp)) for assignations, csp in frontiere]
+
+
+def _domaines(csp):
+    # Domaines en listes: transmissibles à un autre processus quelle que soit leur représentation.
+    return dict((X, list(csp.domaines[X])) for X in csp.variables)
+
+
+#####
+# resoudre_sous_probleme : Résout un sous-problème produit par 'diviser' (dans un processus
+#                          de parallele.py).
+#
+# variables: csp.variables du problème d'origine.
+#
+# assignations, domaines: Le sous-problème.
+#
+# masques: Si vrai, les domaines sont repris en masques de bits (csp_masques).
+#
+# piste, variable, valeur, stats, regles, cbj, nogoods: Voir 'backtracking_search'.
+#
+# retour: Le dictionnaire des assignations (case => valeur), False si aucune solution.
+###
+def resoudre_sous_probleme(variables, assignations, domaines, masques=False,
+                           piste=False, variable='ordre', valeur='ordre',
+                           stats=None, regles=None, cbj=False, nogoods=1000):
+    csp = CSP(variables, domaines,
+              grille.index_pour(len(variables)).contraintes)
+    if masques:
+        from csp_masques import CSPMasques
+        csp = CSPMasques.depuis_csp(csp)
+    return rechercher(assignations, csp, piste, variable, valeur, stats,
+                      creer_propagation(csp, regles), creer_cbj(csp, cbj, nogoods))
+
+#####
+# inference : Propage l'affectation de la case x aux autres domaines.
+#
+# x: Variable (tuple (Y,X)) venant d'être affectée (None: toute la grille).
+#
+# csp: Objet de la classe CSP dont le domaine de x a été réduit à la valeur affectée.
+#
+# stats: Objet statistiques.Statistiques, ou None.
+#
+# regles: Objet propagation.Propagation, propagé à partir de x seulement; None pour AC3.
+#
+# retour: Un tuple contenant le csp réduit et un booléen indiquant si aucune contrainte n'est violée.
+###
+def inference(x,csp,stats=None,regles=None):
+    if stats is not None:
+        debut = time.perf_counter()
+    if regles is not None:
+        resultat = csp, regles.propager(csp, None if x is None else [x], stats)
+    else:
+        resultat = AC3(csp, stats, x)
+    if stats is not None:
+        stats.ajouter_temps('propagation', debut)
+    return resultat
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Compteurs d'une recherche, passés à backtracking_search (option 'stats').
+#
+# Seuls des entiers et des durées sont conservés: aucun état de recherche
+# n'est retenu. Sans objet Statistiques (stats=None), la recherche ne fait
+# aucun travail de comptage.
+###
+
+import json
+import time
+
+
+class Statistiques:
+    """
+    Compteurs de la recherche.
+
+    noeuds: affectations essayées (coups).
+    backtracks: affectations annulées après l'échec de leur branche.
+    propagations: appels à AC3 (ou au pipeline de propagation).
+    arcs_revises: arcs révisés par AC3 (ou cases et unités examinées).
+    succes_cache: grilles dont la solution a été tirée d'un cache.
+    processus: processus de la recherche parallèle (1: recherche séquentielle).
+    eliminations: valeurs retirées des domaines par chaque règle de
+                  propagation (voir propagation.py).
+    sauts: retours arrière dirigés par les conflits (mode cbj) qui ont
+           abandonné les valeurs restantes d'une case.
+    nogoods: valeurs écartées par un nogood appris (mode cbj).
+    temps: durée cumulée (sec.) de chaque phase; en parallèle, 'processus'
+           est le temps CPU cumulé des processus et 'recherche' le temps écoulé.
+
+    rappel: fonction appelée avec l'objet toutes les 'periode' noeuds
+            (échantillonnage), ou None.
+    """
+
+    def __init__(self, rappel=None, periode=1000):
+        self.noeuds = 0
+        self.backtracks = 0
+        self.propagations = 0
+        self.arcs_revises = 0
+        self.succes_cache = 0
+        self.processus = 1
+        self.eliminations = {}
+        self.sauts = 0
+        self.nogoods = 0
+        self.temps = {}
+        self.rappel = rappel
+        self.periode = periode
+
+    def noeud(self):
+        self.noeuds += 1
+        if self.rappel is not None and self.noeuds % self.periode == 0:
+            self.rappel(self)
+
+    def propagation(self, nb_arcs_revises):
+        self.propagations += 1
+        self.arcs_revises += nb_arcs_revises
+
+    def ajouter_temps(self, phase, debut):
+        """Ajoute à 'phase' le temps écoulé depuis 'debut' (time.perf_counter)."""
+        self.temps[phase] = self.temps.get(phase, 0.) + time.perf_counter() - debut
+
+    def fusionner(self, autre):
+        """Ajoute les compteurs d'un autre objet Statistiques."""
+        self.noeuds += autre.noeuds
+        self.backtracks += autre.backtracks
+        self.propagations += autre.propagations
+        self.arcs_revises += autre.arcs_revises
+        self.succes_cache += autre.succes_cache
+        self.processus = max(self.processus, autre.processus)
+        self.sauts += autre.sauts
+        self.nogoods += autre.nogoods
+        for regle, nb in autre.eliminations.items():
+            self.eliminations[regle] = self.eliminations.get(regle, 0) + nb
+        for phase, duree in autre.temps.items():
+            self.temps[phase] = self.temps.get(phase, 0.) + duree
+
+    def utilisation(self):
+        """
+        Temps CPU cumulé des processus sur temps écoulé de la recherche
+        parallèle (coeurs occupés en moyenne). Ce n'est pas une accélération,
+        mesurée par bench_parallele.py (temps séquentiel / temps parallèle).
+        """
+        ecoule = self.temps.get('recherche', 0.)
+        return self.temps.get('processus', 0.) / ecoule if ecoule else 0.
+
+    def en_dict(self):
+        return {
+            'noeuds': self.noeuds,
+            'backtracks': self.backtracks,
+            'propagations': self.propagations,
+            'arcs_revises': self.arcs_revises,
+            'succes_cache': self.succes_cache,
+            'processus': self.processus,
+            'eliminations': dict(self.eliminations),
+            'sauts': self.sauts,
+            'nogoods': self.nogoods,
+            'temps': dict(self.temps),
+        }
+
+    def en_json(self, **kwargs):
+        return json.dumps(self.en_dict(), **kwargs)
+
+    def __repr__(self):
+        return "Statistiques({0})".format(self.en_dict())
@@ -1,58 +1,102 @@
 # -*- coding: utf-8 -*-
 
-import argparse
-import copy
 import re
 import os
+import sys
 import time
 import numpy as np
 
-from importlib.machinery import SourceFileLoader
+import grille
+import validation
+from csp import CSP  # noqa F401 (sudoku.CSP)
+from propagation import REGLES
+from canonique import CacheSolutions
+from legalite import IndexLegalite
+from moteurs import SOLVEURS_INTEGRES
+from statistiques import Statistiques
 
 # Enable command line history
 
 
-regex_action = r'^\(([0-8]),([0-8])\)\s*=\s*([0-9])$'
+# Coordonnées (Y,X) et valeur: un chiffre, ou un symbole A-Z au-delà de 9x9.
+# Une coordonnée est un nombre ou son étiquette affichée (A = 10, B = 11, ...).
+regex_action = r'^\(([0-9A-Za-z]+),([0-9A-Za-z]+)\)\s*=\s*([0-9A-Za-z])$'
+
+# Demande des valeurs possibles d'une case: '?(Y,X)'.
+regex_indice = r'^\?\s*\(([0-9A-Za-z]+),([0-9A-Za-z]+)\)$'
+
+# Étiquettes des lignes et des colonnes affichées (voir SudokuUtil.dessiner).
+NUMEROS = '0123456789' + grille.SYMBOLES[9:]
+
+
+def coordonnee(texte):
+    """Numéro de ligne ou de colonne à partir d'un nombre ou d'une étiquette."""
+    return int(texte) if texte.isdigit() else NUMEROS.index(texte.upper())
 
 
 def est_coup_legal(X, v, etat):
+    v = valeur_entier(v)
+    n = etat.ordre
     estLegal = True
     estLegal &= v not in etat.tableau[X[0], :]  # Contraintes de ligne
     estLegal &= v not in etat.tableau[:, X[1]]  # Contraintes de colonnes
-    blocY, blocX = (X[0]//3)*3, (X[1]//3)*3
+    blocY, blocX = (X[0]//n)*n, (X[1]//n)*n
     # Contraintes de blocs
-    estLegal &= v not in etat.tableau[blocY:blocY+3, blocX:blocX+3]
+    estLegal &= v not in etat.tableau[blocY:blocY+n, blocX:blocX+n]
     return estLegal
 
 
 def joueur_humain(etat_depart, fct_but, fct_transitions, fct_heuristique):
-    etat = etat_depart
+    etat = etat_depart.copy()
+    # Légalité des coups, fin de partie et indices en O(1) (legalite.py).
+    index = IndexLegalite(etat)
     yield etat
-    while not fct_but(etat):
+    while not (index.complet() and index.coherent):
         action = input(
             "Entrer une coordonnée et une valeur. (ex. '(Y,X) = V'). " +
-            "Pour effacer mettez V à 0.\n")
+            "Pour effacer mettez V à 0.\n" +
+            "('?(Y,X)' pour les valeurs possibles, 'annuler' ou 'refaire' " +
+            "pour le dernier coup.)\n")
         while True:
             try:
+                action = action.strip()
+                if action in ('annuler', 'refaire'):
+                    case = index.annuler() if action == 'annuler' \
+                        else index.refaire()
+                    if case is None:
+                        print("Aucun coup à {0}.".format(action))
+                        raise NameError('Aucun coup!')
+                    break
+
+                indice = re.match(regex_indice, action)
+                if indice is not None:
+                    y, x = [coordonnee(c) for c in indice.groups()]
+                    print("Valeurs possibles en ({0},{1}): {2}".format(
+                        y, x, ' '.join(CARACTERES[v]
+                                       for v in index.candidats(y, x)) or '-'))
+                    action = input("Entrer une coordonnée et une valeur.\n")
+                    continue
+
                 y, x, v = re.match(regex_action, action).groups()
-                y, x = int(y), int(x)
+                y, x, v = coordonnee(y), coordonnee(x), valeur_entier(v)
 
-                if v == '0':
-                    v = ' '
-                    break
+                taille = etat.tableau.shape[0]
+                if y >= taille or x >= taille or v > taille:
+                    raise ValueError('Hors de la grille!')
 
-                if not est_coup_legal((y, x), v, etat):
+                if v and not index.est_legal(y, x, v):
                     print(
-                        "Coup non légal! [ ({0},{1}) = {2} ]".format(y, x, v))
+                        "Coup non légal! [ ({0},{1}) = {2} ]".format(
+                            y, x, CARACTERES[v]))
                     raise NameError('Coup non légal!')
 
+                index.jouer(y, x, v)  # V = 0: case vide
                 break
             except:
                 action = input(
                     "L\'action n\'est pas valide. Réessayer à nouveau, puis" +
                     " appuyer sur Enter\n")
 
-        etat = etat.placer((y, x), v)
         yield etat
 
 
@@ -83,14 +127,20 @@ class Jeu:
     def jouer_partie(self, joueur):
         etat = self.etat_initial
 
-        for etat in joueur(etat, self.but, self.transitions, self.heuristique):
-            self.afficher(etat)
+        etats = joueur(etat, self.but, self.transitions, self.heuristique)
+        if self.verbose:
+            for etat in etats:
+                self.afficher(etat)
+        else:
+            etat = etat_final(etats, etat)  # Seul l'état final est vérifié.
 
         if self.but(etat):
             print('Vous avez gagné!')
         else:
             print('Vous avez perdu!')
 
+        return etat
+
     def afficher(self, msg):
         if self.verbose:
             print(msg)
@@ -100,64 +150,70 @@ class Jeu:
 # Etat, but, et Constraint Satisfaction Problem (CSP) #
 #  pour le sudoku.
 ###
-# Permet de conserver l'ordre des résolutions de contraintes pour
-# l'évaluation du devoir (ne pas utiliser!).
-g_evaluation = []
+# Valeurs des cases en octets, telles qu'utilisées dans les domaines du CSP.
+# (Grille 9x9; grille.index(ordre).valeurs pour les autres ordres.)
+VALEURS = grille.index(3).valeurs
 
+# Caractère affiché pour chaque valeur de case (0 = vide, 10 = 'A', ...).
+CARACTERES = ' ' + grille.SYMBOLES
 
-class CSP:
-    def __init__(self, variables, domaines, contraintes):
-        self.variables = variables
-        self.domaines = domaines
-        self.contraintes = contraintes
 
-    def arcs(self):
-        return [(Xi, Xj) for Xi in self.contraintes
-                for Xj in self.contraintes[Xi]]
+def valeur_entier(valeur):
+    """
+    Valeur d'une case (0 = vide) à partir d'un entier, d'un str ou d'octets.
 
-    def copy(self):
-        g_evaluation.append(self.domaines)
-        return CSP(
-            self.variables, copy.deepcopy(self.domaines), self.contraintes)
-
-    def __eq__(self, autre):
-        return all([v1 == v2
-                    for v1, v2
-                    in zip(self.variables, autre.variables)]) \
-            and all([v1 == v2
-                     for v in self.variables
-                     for v1, v2 in zip(self.domaines[v], autre.domaines[v])]) \
-            and all([c1 == c2
-                     for v in self.variables
-                     for c1, c2 in zip(
-                         self.contraintes[v], autre.contraintes[v])])
-
-    def __ne__(self, autre):
-        return not self == autre
+    Un texte est un nombre ('12') ou un symbole ('C' = 12); sinon la case est vide.
+    """
+    if isinstance(valeur, bytes):
+        valeur = valeur.decode('ascii')
+    if isinstance(valeur, str):
+        if valeur.isdigit():
+            return int(valeur)
+        return max(CARACTERES.find(valeur.upper()), 0) if len(valeur) == 1 else 0
+    return int(valeur)
 
 
 class SudokuEtat:
-    def __init__(self, tableau=None):
+    """
+    Grille de sudoku d'ordre n: tableau uint8 (n², n²), 0 pour une case vide.
+
+    L'ordre est la taille des blocs (3 pour la grille 9x9, 4 pour 16x16); il
+    est déduit du tableau s'il est fourni.
+    """
+
+    def __init__(self, tableau=None, ordre=3):
         self.tableau = tableau
         if self.tableau is None:
-            self.tableau = np.zeros([9, 9], dtype='S1')
-            self.tableau[:] = ' '
+            self.tableau = np.zeros([ordre * ordre] * 2, dtype=np.uint8)
+        elif self.tableau.dtype != np.uint8:
+            self.tableau = validation.entiers(self.tableau).astype(np.uint8)
+        self.ordre = grille.ordre_de(self.tableau.size)
+        if self.ordre is None:
+            raise ValueError("Grille de taille invalide: {0}".format(
+                self.tableau.shape))
 
     def find(self, case):
         """Trouve les coordonnées de la pièce désirée."""
-        return np.array(np.where(self.tableau == case))
+        return np.array(np.where(self.tableau == valeur_entier(case)))
 
     def findNot(self, case):
         """Trouve les coordonnées des cases sauf celle de la pièce désirée."""
-        return np.array(np.where(self.tableau != case))
+        return np.array(np.where(self.tableau != valeur_entier(case)))
+
+    def placer(self, coordonnee, valeur, persistant=False):
+        """
+        Place une valeur dans la grille à la position donnée.
 
-    def placer(self, coordonnee, valeur):
-        """Place une valeur dans la grille à la position donnée."""
-        etat = SudokuEtat()
-        etat.tableau = np.copy(self.tableau)
-        etat.tableau[coordonnee] = valeur
+        La grille est modifiée en place et retournée, sauf si 'persistant' est
+        vrai: une copie modifiée est alors retournée et self reste inchangé.
+        """
+        etat = self.copy() if persistant else self
+        etat.tableau[coordonnee] = valeur_entier(valeur)
         return etat
 
+    def copy(self):
+        return SudokuEtat(self.tableau.copy())
+
     def __eq__(self, other):
         return (self.tableau == other.tableau).all()
 
@@ -165,9 +221,11 @@ class SudokuEtat:
         return not self == other
 
     def __hash__(self):
-        return hash("".join(self.tableau.flat))
+        return hash(self.tableau.tobytes())
 
     def __str__(self):
+        if self.ordre != 3:
+            return SudokuUtil.dessiner(self.tableau, self.ordre)
         t = """
   012 345 678
 
@@ -183,8 +241,7 @@ class SudokuEtat:
 7 {63}{64}{65}|{66}{67}{68}|{69}{70}{71}
 8 {72}{73}{74}|{75}{76}{77}|{78}{79}{80}
 """
-        return \
-            t.format(*self.tableau.flat).replace('b\'', '').replace('\'', '')
+        return t.format(*SudokuUtil.tableau2texte(self.tableau))
 
 
 class SudokuUtil:
@@ -249,112 +306,185 @@ class SudokuUtil:
         return SudokuEtat(SudokuUtil.convertir(str(txt)))
 
     @staticmethod
-    def convertir(txt):
-        return np.array(list(txt), dtype="S1").reshape(9, 9)
+    def generer(seed, numero=0, niveau=None, ordre=3):
+        """
+        Grille à solution unique tirée au hasard (voir generateur.py), au
+        niveau de difficulté visé; la même pour une même graine et un même numéro.
+        """
+        import generateur
+        valeurs, _, _, _ = generateur.generer(seed, numero, niveau, ordre)
+        taille = ordre * ordre
+        return SudokuEtat(np.array(valeurs, dtype=np.uint8).reshape(taille, taille))
 
     @staticmethod
-    def assignations2etat(assignations):
-        etat = SudokuEtat()
+    def convertir(txt, ordre=3):
+        """
+        Tableau uint8 (N, N) à partir du texte d'une grille d'ordre donné.
+
+        Le texte a un symbole par case ('1'-'9', puis 'A'-'Z'; tout autre
+        caractère est une case vide), ou N² nombres séparés par des espaces,
+        des virgules ou des points-virgules (0 ou '.' pour une case vide).
+        """
+        taille = ordre * ordre
+        if len(txt) == taille * taille:
+            valeurs = validation.entiers(
+                np.frombuffer(txt.encode('ascii'), dtype='S1'))
+        else:
+            valeurs = np.array([valeur_entier(v)
+                                for v in re.split(r'[\s,;]+', txt.strip())])
+            if valeurs.size != taille * taille:
+                raise ValueError("Une grille {0}x{0} doit avoir {1} cases: "
+                                 "'{2}'".format(taille, taille * taille, txt))
+        valeurs[valeurs > taille] = 0  # Symbole hors de la grille: case vide.
+        return valeurs.astype(np.uint8).reshape(taille, taille)
+
+    @staticmethod
+    def tableau2texte(tableau):
+        """Texte d'un symbole par case (' ' si vide) d'un tableau uint8 (N, N)."""
+        return "".join([CARACTERES[v] for v in tableau.flat])
+
+    @staticmethod
+    def dessiner(tableau, ordre):
+        """Affichage d'une grille de n'importe quel ordre, blocs séparés."""
+        taille = ordre * ordre
+        texte = SudokuUtil.tableau2texte(tableau)
+
+        def bandes(symboles):
+            return '|'.join(symboles[i:i + ordre] for i in range(0, taille, ordre))
+
+        # Lignes et colonnes numérotées 0-9, puis A-Z (une position par case).
+        numeros = NUMEROS[:taille]
+        lignes = ['', '  ' + bandes(numeros), '']
+        for y in range(taille):
+            if y and y % ordre == 0:
+                lignes.append('  ' + '+'.join(['-' * ordre] * ordre))
+            lignes.append(numeros[y] + ' ' +
+                          bandes(texte[y * taille:(y + 1) * taille]))
+        return '\n'.join(lignes) + '\n'
+
+    @staticmethod
+    def ligne2etat(ligne, ordre=3):
+        """
+        Grille en une ligne: N² caractères ('.', '0' ou ' ' si vide) ou
+        N² nombres séparés (voir convertir).
+        """
+        return SudokuEtat(SudokuUtil.convertir(ligne, ordre))
+
+    @staticmethod
+    def etat2ligne(etat):
+        """Grille en une ligne d'un symbole par case ('.' si vide)."""
+        return SudokuUtil.tableau2texte(etat.tableau).replace(' ', '.')
+
+    @staticmethod
+    def assignations2etat(assignations, ordre=3):
+        etat = SudokuEtat(ordre=ordre)
         for pos, v in assignations.items():
-            etat = etat.placer(pos, v)
+            etat.placer(pos, v)
 
         return etat
 
 
 def tousUniques(sequence):
     sequence = sequence.flatten()
-    for i, valeur in enumerate(sequence):
-        if valeur in sequence[i+1:]:
-            return False
-
-    return True
+    return len(set(sequence.tolist())) == sequence.size
 
 
 def sudoku_but(etat):
-    if etat.find(' ').shape[1] != 0:
-        return False
-
-    estTermine = True
-    for i in range(9):
-        estTermine &= tousUniques(etat.tableau[i, :])
-        estTermine &= tousUniques(etat.tableau[:, i])
-        subY, subX = i // 9, (i % 3) * 3
-        estTermine &= tousUniques(etat.tableau[subY:subY+3, subX:subX+3])
-
-    return estTermine
+    return validation.valider(etat.tableau)
 
 
 def sudoku_solution(etat, noPartie):
     if noPartie is None:
         # dbg()
-        return "".join(map(str, etat.tableau.flatten())).replace("b'", '').replace("'", "") == "382514697514976823796238514451392786837461259629785341148657932975123468263849175" # noqa E501
+        return SudokuUtil.tableau2texte(etat.tableau) == "382514697514976823796238514451392786837461259629785341148657932975123468263849175" # noqa E501
 
     if noPartie == 1:
-        return "".join(map(str, etat.tableau.flatten())).replace("b'", '').replace("'", "") == "297435168143867925586129374865392741712548693934671582329754816451986237678213459" # noqa E501
+        return SudokuUtil.tableau2texte(etat.tableau) == "297435168143867925586129374865392741712548693934671582329754816451986237678213459" # noqa E501
 
     if noPartie == 2:
-        return "".join(map(str, etat.tableau.flatten())).replace("b'", '').replace("'", "") == "145327698839654127672918543496185372218473956753296481367542819984761235521839764" # noqa E501
+        return SudokuUtil.tableau2texte(etat.tableau) == "145327698839654127672918543496185372218473956753296481367542819984761235521839764" # noqa E501
 
     if noPartie == 3:
-        return "".join(map(str, etat.tableau.flatten())).replace("b'", '').replace("'", "") == "859612437723854169164379528986147352375268914241593786432981675617425893598736241" # noqa E501
+        return SudokuUtil.tableau2texte(etat.tableau) == "859612437723854169164379528986147352375268914241593786432981675617425893598736241" # noqa E501
 
-    return "".join(map(str, etat.tableau.flatten())).replace("b'", '').replace("'", "") == "391286475472359681865174392657823914238941567914765238783492156126537849549618723" # noqa E501
+    return SudokuUtil.tableau2texte(etat.tableau) == "391286475472359681865174392657823914238941567914765238783492156126537849549618723" # noqa E501
 
 
 def creerCSP(etat):
     # Les variables représentent les cases vides
-    variables = list(zip(*etat.find(b' ')))
+    variables = list(zip(*etat.find(0)))
 
-    # Le domaine des cases libres est toutes les possibilités [1-9]
+    # Le domaine des cases libres est toutes les possibilités: [1-9] pour
+    # une grille 9x9, [1-9A-G] pour une grille 16x16, ...
+    index = grille.index(etat.ordre)
     domaines = {}
     for V in variables:
-        domaines[V] = [bytes(str(i), 'utf-8') for i in range(1, 10)]
+        domaines[V] = list(index.valeurs)
 
     # Pour les cases déjà remplies, le domaine est seulement la valeur
     # de la case
-    for V in zip(*etat.findNot(b' ')):
-        domaines[V] = [etat.tableau[V], ]
+    for V in zip(*etat.findNot(0)):
+        domaines[V] = [index.valeurs[etat.tableau[V] - 1], ]
         variables.append(V)
 
-    # Les contraintes sont ajoutées pour toutes les variables associées.
-    contraintes = {}
-    for V in variables:
-        y, x = V
-        contraintes[V] = []
-        contraintes[V] += [(y, i) for i in range(9)]  # Contraintes de ligne
-        contraintes[V] += [(i, x) for i in range(9)]  # Contraintes de colonne
-
-        blocY, blocX = (y//3)*3, (x//3)*3
-        contraintes[V] += [(blocY+i//3, blocX+i % 3)
-                           for i in range(9)]  # Contraintes de bloc
+    # Les contraintes (ligne, colonne et bloc) ne dépendent pas de la partie:
+    # l'index précalculé de grille.py est partagé par tous les CSP de même ordre.
+    return CSP(variables, domaines, index.contraintes)
 
-        # Les contraintes doivent être uniques
-        contraintes[V] = set(contraintes[V])
-        contraintes[V].remove(V)  # Aucune contrainte avec soi-même
 
-    return CSP(variables, domaines, contraintes)
+def creerCSPMasques(etat):
+    """Comme creerCSP, mais avec les domaines stockés en masques de bits (9x9)."""
+    from csp_masques import CSPMasques
+    if etat.ordre != 3:
+        raise ValueError("Les domaines en masques de bits sont limités aux "
+                         "grilles 9x9.")
+    return CSPMasques.depuis_csp(creerCSP(etat))
 
 
-def evaluation(no_partie, solution_file):
+def evaluation(no_partie, solution_file, heuristique=None, stats=None,
+               solutionTrouve=None, budget=None):
     etat_depart = SudokuUtil.generate(no_partie)
 
-    nbCasesVides = len(etat_depart.find(b' ')[0])
-    nbCoups = len(g_evaluation)
+    nbCasesVides = len(etat_depart.find(0)[0])
+    nbCoups = stats.noeuds if stats is not None else 0
     nbBacktracks = nbCoups - nbCasesVides
+    interrompue = budget is not None and budget.epuise
+    if interrompue:
+        # Recherche arrêtée avant la fin: backtracks comptés par la recherche.
+        nbBacktracks = stats.backtracks
 
     print("\n#########\n# Infos #\n#########")
     print("Nb. cases vides au départ: {0}".format(nbCasesVides))
+    if heuristique:
+        print("Heuristique: {0}".format(heuristique))
     print("Nb. coups: {0}".format(nbCoups))
 
     if nbCoups == 0:
-        print("* Attention, l'objet CSP doit être passé à AC3 par copie! " +
-              " -> csp.copy() <-")
+        if stats is not None and stats.succes_cache:
+            print("* Solution tirée du cache: aucun coup joué.")
+            return
+        print("* Attention, chaque coup doit être comptabilisé par " +
+              "backtracking_search! -> stats.noeud() <-")
         return
 
     print("Nb. backtracks: {0}".format(nbBacktracks))
-
-    assignations = dict([(k, v[0]) for k, v in g_evaluation[-1].items()])
-    solutionTrouve = SudokuUtil.assignations2etat(assignations)
+    print("Nb. propagations: {0} ({1} arcs révisés)".format(
+        stats.propagations, stats.arcs_revises))
+    if stats.sauts or stats.nogoods:
+        print("Sauts (backjumping): {0}, valeurs écartées par nogoods: {1}".format(
+            stats.sauts, stats.nogoods))
+    if stats.eliminations:
+        print("Éliminations: {0}".format(", ".join(
+            "{0}={1}".format(r, n) for r, n in stats.eliminations.items())))
+    if stats.processus > 1:
+        print("Processus: {0} sur {1} coeurs (utilisation CPU {2:0.2f} coeur, "
+              "occupation {3:0.0%})".format(
+                  stats.processus, os.cpu_count(), stats.utilisation(),
+                  stats.utilisation() / min(stats.processus, os.cpu_count())))
+
+    if interrompue:
+        print("* Recherche interrompue par le budget: aucune validation.")
+        return
 
     if not sudoku_but(solutionTrouve):
         print("* La solution trouvée n'est pas valide!")
@@ -401,15 +531,144 @@ def evaluation(no_partie, solution_file):
 #####
 # Execution en tant que script
 ###
-def player_factory(player):
+def optionsJoueur(player, options):
+    """
+    Options transmises à un joueur qui n'est pas celui choisi pour la partie
+    (secours, comparaison): les options de recherche CSP sont retirées pour
+    un moteur qui ne les prend pas en charge (OPTIONS_CSP, voir dlx.py).
+    """
+    if player not in SOLVEURS_INTEGRES:
+        return options
+    ignorees = getattr(chargerSolution(player), 'OPTIONS_CSP', {})
+    return dict((k, v) for k, v in options.items() if k not in ignorees)
+
+
+def verifierOptions(player, options):
+    """
+    Lève ValueError si le moteur intégré 'player' ne prend pas en charge les
+    options de recherche (voir dlx.verifier_options).
+    """
+    if player not in SOLVEURS_INTEGRES:
+        return
+    verifier = getattr(chargerSolution(player), 'verifier_options', None)
+    if verifier is not None:
+        verifier(dict((k, v) for k, v in options.items()
+                      if k not in ('stats', 'budget')))
+
+
+def chargerSolution(player):
+    """
+    Charge le module d'un fichier solution exposant backtracking_search.
+
+    Les moteurs intégrés et les fichiers d'un dossier de sys.path passent par
+    l'import normal; les autres fichiers sont chargés une fois par processus
+    (sys.modules). Le bytecode compilé (__pycache__) est réutilisé d'une
+    exécution à l'autre.
+    """
+    import importlib
+    if player in SOLVEURS_INTEGRES:
+        return importlib.import_module(SOLVEURS_INTEGRES[player])
+
+    player = os.path.abspath(player)
+    dossier, fichier = os.path.split(player)
+    nom = os.path.splitext(fichier)[0]
+    if nom.isidentifier() and any(os.path.abspath(p or os.curdir) == dossier
+                                  for p in sys.path):
+        module = importlib.import_module(nom)
+        if os.path.abspath(getattr(module, '__file__', None) or '') == player:
+            return module
+
+    name = player.replace('/', '.').replace('.', '_')
+    if name not in sys.modules:
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(name, player)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+    return sys.modules[name]
+
+
+class Rejeu:
+    """
+    États d'une partie rejouée à partir des assignations d'un joueur agent.
+
+    L'itération donne l'état de départ, puis une seule copie de celui-ci,
+    modifiée en place par chaque affectation: c'est le même objet à chaque
+    étape (une vue, pas un nouvel état), et 'coup' est la dernière
+    affectation appliquée ((Y,X), valeur). 'final' applique en une passe
+    les affectations restantes, sans produire les états intermédiaires.
+    """
+
+    def __init__(self, etat_depart, assignations):
+        self.depart = etat_depart
+        self.etat = None
+        self.coup = None
+        self._coups = iter((assignations or {}).items())
+        self._etats = self._rejouer()
+        # Valeurs des domaines (b'1', ...) => entier, sans passer par valeur_entier.
+        self._rang = grille.index(etat_depart.ordre).rang_valeur
+
+    def _entier(self, v):
+        k = self._rang.get(v)
+        return valeur_entier(v) if k is None else k + 1
+
+    def _copie(self):
+        if self.etat is None:
+            self.etat = self.depart.copy()
+        return self.etat
+
+    def _rejouer(self):
+        yield self.depart
+        tableau = self._copie().tableau
+        for pos, v in self._coups:
+            tableau[pos] = self._entier(v)
+            self.coup = (pos, v)
+            yield self.etat
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._etats)
+
+    def final(self):
+        """État après toutes les affectations; l'itération s'arrête ensuite."""
+        etat = self._copie()
+        tableau, rang = etat.tableau, self._rang
+        pos = None
+        for pos, v in self._coups:
+            k = rang.get(v)
+            tableau[pos] = valeur_entier(v) if k is None else k + 1
+        if pos is not None:
+            self.coup = (pos, v)
+        self._etats = iter(())
+        return etat
+
+
+def etat_final(etats, etat=None):
+    """
+    Dernier état d'un joueur ('etat' s'il n'en donne aucun); les états
+    intermédiaires d'un Rejeu ne sont pas produits.
+    """
+    if isinstance(etats, Rejeu):
+        return etats.final()
+    for etat in etats:
+        pass
+    return etat
+
+
+def player_factory(player, representation='listes', options=None, cache=None):
     if player == 'humain':
         return joueur_humain
 
-    if player.endswith('.py'):
-        player = os.path.abspath(player)
-        name = player.replace('/', '.').replace('.', '_')
+    if player.endswith('.py') or player in SOLVEURS_INTEGRES:
+        solution = chargerSolution(player)
 
-        solution = SourceFileLoader(name, player).load_module(name)
+        fct_csp = creerCSPMasques if representation == 'masques' else creerCSP
 
         # Coquille simulant un joueur à partir des assignations retournées
         # par backtracking_search
@@ -417,34 +676,157 @@ def player_factory(player):
             etat_depart, fct_estEtatFinal,
             fct_transitions, fct_heuristique
         ):
-            assignations = solution.backtracking_search(creerCSP(etat_depart))
-
-            # Générateur d'états à partir des assignations
-            def iterEtats():
-                etat = etat_depart
-                yield etat
-                for pos, v in assignations.items():
-                    etat = etat.placer(pos, v)
-                    yield etat
-
-            return iterEtats()
+            options_ = options or {}
+            stats = options_.get('stats')
+
+            # Grille équivalente déjà résolue (voir canonique.CacheSolutions,
+            # limité aux grilles 9x9)
+            if cache is not None and etat_depart.ordre == 3:
+                tableau, cle, transformation = cache.chercher(etat_depart.tableau)
+                if tableau is not None:
+                    if stats is not None:
+                        stats.succes_cache += 1
+                    return iter([etat_depart, SudokuEtat(tableau)])
+
+            if stats is not None:
+                debut = time.perf_counter()
+            csp = fct_csp(etat_depart)
+            if stats is not None:
+                stats.ajouter_temps('creation', debut)
+            assignations = solution.backtracking_search(csp, **options_)
+
+            if cache is not None and etat_depart.ordre == 3 and assignations:
+                cache.ajouter(cle, transformation,
+                              Rejeu(etat_depart, assignations).final().tableau)
+
+            # États rejoués à partir des assignations (False s'il n'y a
+            # aucune solution).
+            return Rejeu(etat_depart, assignations)
 
         return joueurAgent
 
     return None
 
 
+def compter_solutions(player, etat, representation='listes', options=None,
+                      limite=2):
+    """
+    Nombre de solutions (jusqu'à 'limite', None pour toutes) d'une grille et
+    la première trouvée (SudokuEtat, ou None), avec le compter_solutions du
+    fichier solution.
+    """
+    solution = chargerSolution(player)
+    fct_csp = creerCSPMasques if representation == 'masques' else creerCSP
+    nb, solutions = solution.compter_solutions(
+        fct_csp(etat), limite=limite, garder=1, **(options or {}))
+    if not solutions:
+        return nb, None
+    final = etat.copy()
+    for pos, v in solutions[0].items():
+        final.placer(pos, v)
+    return nb, final
+
+
 DESCRIPTION = "Lancer une partie de sudoku."
 
 
+def ajouterOptionsRecherche(p):
+    """Ajoute les options du joueur agent (CSP et backtracking_search)."""
+    p.add_argument('-domaines', dest='representation', metavar="TYPE",
+                   action='store', type=str, required=False, default='listes',
+                   choices=['listes', 'masques'],
+                   help="représentation des domaines du CSP: listes de "
+                        "valeurs ou masques de bits.")
+
+    p.add_argument('-piste', dest='piste', action='store_true', required=False,
+                   help="annuler les retraits de valeurs au lieu de copier "
+                        "le CSP à chaque coup.")
+
+    p.add_argument('-variable', dest='variable', metavar="ORDRE",
+                   action='store', type=str, required=False, default='ordre',
+                   choices=['ordre', 'mrv'],
+                   help="choix de la case: ordre de csp.variables ou mrv "
+                        "(plus petit domaine, puis plus grand degré).")
+
+    p.add_argument('-valeur', dest='valeur', metavar="ORDRE",
+                   action='store', type=str, required=False, default='ordre',
+                   choices=['ordre', 'lcv'],
+                   help="ordre des valeurs: ordre du domaine ou lcv "
+                        "(valeur la moins contraignante).")
+
+    p.add_argument('-regles', dest='regles', metavar="REGLES",
+                   action='store', type=str, required=False,
+                   help="règles de propagation à chaque coup, séparées par "
+                        "des virgules, au lieu d'AC3: {0}, ou 'toutes'.".format(
+                            ', '.join(REGLES)))
+
+    p.add_argument('-cbj', dest='cbj', action='store_true', required=False,
+                   help="retour arrière dirigé par les conflits (backjumping) "
+                        "avec apprentissage de nogoods; implique la piste.")
+
+    p.add_argument('-nogoods', dest='nogoods', metavar="INT", action='store',
+                   type=int, required=False, default=1000,
+                   help="capacité du magasin de nogoods du mode -cbj "
+                        "(0: aucun apprentissage).")
+
+
+def optionsRecherche(args):
+    """Options de backtracking_search à partir des arguments analysés."""
+    options = {}
+    if args.piste:
+        options['piste'] = True
+    if args.variable != 'ordre':
+        options['variable'] = args.variable
+    if args.valeur != 'ordre':
+        options['valeur'] = args.valeur
+    if args.regles:
+        regles = REGLES if args.regles == 'toutes' else args.regles.split(',')
+        inconnues = set(regles) - set(REGLES)
+        if inconnues:
+            import argparse
+            raise argparse.ArgumentTypeError(
+                "Règles inconnues: {0}".format(', '.join(sorted(inconnues))))
+        options['regles'] = list(regles)
+    if args.cbj:
+        if args.regles:
+            import argparse
+            raise argparse.ArgumentTypeError("-cbj et -regles sont incompatibles.")
+        options['cbj'] = True
+        options['nogoods'] = args.nogoods
+    return options
+
+
+def ajouterOptionsBudget(p):
+    """Ajoute les options du budget de recherche (voir budget.py)."""
+    p.add_argument('-temps_max', dest='temps_max', metavar="SEC",
+                   action='store', type=float, required=False,
+                   help="durée maximale de la recherche d'une grille; au-delà, "
+                        "la grille est abandonnée.")
+
+    p.add_argument('-noeuds_max', dest='noeuds_max', metavar="INT",
+                   action='store', type=int, required=False,
+                   help="nombre maximal de coups de la recherche d'une grille.")
+
+
+def budgetRecherche(args):
+    """Budget de backtracking_search (budget.Budget), ou None sans limite."""
+    if args.temps_max is None and args.noeuds_max is None:
+        return None
+    from budget import Budget
+    return Budget(args.temps_max, args.noeuds_max)
+
+
 def buildArgsParser():
+    import argparse
     p = argparse.ArgumentParser(description=DESCRIPTION,
                                 formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
     # Paramètres globaux
     p.add_argument('-joueur', dest="player", metavar="JOUEUR", action='store',
                    type=str, required=False, default="solution_sudoku.py",
-                   help="'humain' ou le fichier contenant votre solution.")
+                   help="'humain', un moteur intégré ({0}) ou le fichier "
+                        "contenant votre solution.".format(
+                            ', '.join(SOLVEURS_INTEGRES)))
 
     p.add_argument('-no_partie', dest="no_partie", metavar="INT",
                    action='store', type=int, required=False,
@@ -454,6 +836,33 @@ def buildArgsParser():
                    action='store', type=str, required=False, default='sudoku_validation.pkl',
                    help="fichier permettant de valider votre joueur pour un jeu donné.")
 
+    ajouterOptionsRecherche(p)
+    ajouterOptionsBudget(p)
+
+    p.add_argument('-processus', dest='nb_processus', metavar="INT",
+                   action='store', type=int, required=False, default=1,
+                   help="nombre de processus de la recherche: au-delà de 1, "
+                        "les premiers niveaux de l'arbre sont répartis entre "
+                        "les processus.")
+
+    p.add_argument('-compter', dest='limite', metavar="LIMITE",
+                   action='store', type=int, required=False,
+                   help="compter les solutions de la grille au lieu de jouer, "
+                        "jusqu'à LIMITE (2: vérifier l'unicité; 0: toutes).")
+
+    p.add_argument('-cache', dest='cache_file', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="cache persistant des solutions, indexé par forme "
+                        "canonique des grilles.")
+
+    p.add_argument('-cache_taille', dest='cache_taille', metavar="INT",
+                   action='store', type=int, required=False, default=10000,
+                   help="nombre maximal de solutions dans le cache.")
+
+    p.add_argument('-stats', dest='stats_file', metavar="FICHIER",
+                   action='store', type=str, required=False,
+                   help="fichier JSON où écrire les statistiques de la recherche.")
+
     p.add_argument('-v', dest='verbose', action='store_true', required=False,
                    help='activer le mode verbose')
 
@@ -470,12 +879,35 @@ def main():
     no_partie = args.no_partie
     validation_file = args.validation_file
     verbose = args.verbose
+    representation = args.representation
+
+    # Options transmises à backtracking_search
+    options = optionsRecherche(args)
+    if args.nb_processus > 1:
+        options['processus'] = args.nb_processus
+    stats = None
+    if player != 'humain':
+        stats = options['stats'] = Statistiques()
+    budget = budgetRecherche(args)
+    if budget is not None:
+        if player == 'humain' or args.nb_processus > 1:
+            parser.error("-temps_max et -noeuds_max demandent un joueur agent "
+                         "et un seul processus.")
+        options['budget'] = budget
+    heuristique = "variable={0}, valeur={1}".format(args.variable, args.valeur)
 
     if player == "humain":
         verbose = True  # Afficher les grilles si c'est un joueur humain.
 
-    if player not in ['aleatoire', 'humain'] and not player.endswith('.py'):
-        parser.error('Joueur doit être [humain, solution_sudoku.py]')
+    if player not in ['aleatoire', 'humain'] and not player.endswith('.py') \
+            and player not in SOLVEURS_INTEGRES:
+        parser.error('Joueur doit être [humain, {0}, solution_sudoku.py]'.format(
+            ', '.join(SOLVEURS_INTEGRES)))
+
+    try:
+        verifierOptions(player, options)
+    except ValueError as e:
+        parser.error(str(e))
 
     if no_partie is None and not os.path.isfile(validation_file):
         parser.error("Fichier introuvable: '{0}'".format(validation_file))
@@ -483,14 +915,61 @@ def main():
     # Obtenir l'état de départ à partir du numéro de partie
     etat_depart = SudokuUtil.generate(no_partie)
 
+    if args.limite is not None:
+        if player == 'humain':
+            parser.error("-compter demande un joueur agent.")
+        if args.nb_processus > 1:
+            parser.error("-compter n'utilise qu'un seul processus.")
+        start_time = time.time()
+        nb, premiere = compter_solutions(player, etat_depart, representation,
+                                         options, args.limite or None)
+        print("Temps écoulé: %0.2f sec." % (time.time()-start_time))
+        if budget is not None and budget.epuise:
+            print("Nb. solutions: au moins {0} (budget épuisé)".format(nb))
+        else:
+            print("Nb. solutions: {0}{1}".format(
+                nb, " (limite atteinte)" if nb == args.limite else ""))
+        if nb == 1 and args.limite != 1 and not (budget and budget.epuise):
+            print("La grille a une solution unique.")
+        if verbose and premiere is not None:
+            print(premiere)
+        if args.stats_file:
+            with open(args.stats_file, 'w') as f:
+                f.write(stats.en_json(indent=2))
+        return
+
     # Jouer une partie de sudoku
     sudoku = Jeu(etat_depart, sudoku_but, None, None, verbose=verbose)
 
+    cache = None
+    if args.cache_file and player != 'humain':
+        cache = CacheSolutions(args.cache_taille, args.cache_file)
+
     start_time = time.time()
-    sudoku.jouer_partie(player_factory(player))
+    etat_obtenu = sudoku.jouer_partie(
+        player_factory(player, representation, options, cache))
     print("Temps écoulé: %0.2f sec." % (time.time()-start_time))
 
-    evaluation(no_partie, validation_file)
+    if budget is not None and budget.epuise:
+        print("Budget épuisé: {0} cases affectées sur {1} au plus profond "
+              "({2} candidats restants).".format(
+                  sum(1 for X in budget.partielle if not etat_depart.tableau[X]),
+                  len(etat_depart.find(0)[0]),
+                  sum(len(d) for d in budget.domaines.values())
+                  if budget.domaines is not None else 0))
+
+    if cache is not None:
+        cache.sauvegarder()
+        print("Cache: {0} solutions, taux de succès {1:0.0%}.".format(
+            len(cache), cache.taux_succes()))
+
+    evaluation(no_partie, validation_file,
+               heuristique if player != 'humain' else None, stats, etat_obtenu,
+               budget)
+
+    if stats is not None and args.stats_file:
+        with open(args.stats_file, 'w') as f:
+            f.write(stats.en_json(indent=2))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Résolution en lot: les grilles (une ligne par grille: 81 caractères en 9x9,
+# N² symboles ou nombres séparés pour une grille N x N) sont lues en flux
+# depuis un fichier ou l'entrée standard, réparties sur un ensemble de
+# processus, et les solutions sont écrites au fur et à mesure.
+#
+# Au plus 'fenetre' lots de grilles sont en cours à la fois: la mémoire
+# utilisée ne dépend pas de la taille de l'entrée.
+#
+# Avec un budget (-temps_max, -noeuds_max), une grille qui l'épuise n'occupe
+# pas un processus indéfiniment: elle est reprise par le moteur de secours
+# (-secours), ou sa solution est écrite '?'.
+###
+
+import argparse
+import functools
+import multiprocessing
+import queue
+import sys
+import time
+
+from collections import deque
+
+import sudoku
+
+# Joueur agent de chaque processus (voir _initialiser).
+_joueur = None
+
+# Résolution vectorisée (propagation_lot) de chaque processus, ou None.
+_vectorise = None
+
+# Ordre des grilles lues (3 pour 9x9, 4 pour 16x16, ...).
+_ordre = 3
+
+# Budget de chaque recherche (budget.Budget) et joueur de secours des
+# grilles qui l'épuisent, ou None.
+_budget = None
+_secours = None
+
+# Solution écrite pour une grille dont la recherche a épuisé le budget.
+EPUISEE = '?'
+
+
+def _initialiser(player, representation, options, vectoriser=False,
+                 cache_taille=0, ordre=3, secours=None):
+    global _joueur, _vectorise, _ordre, _budget, _secours
+    _ordre = ordre
+    _budget = (options or {}).get('budget')
+    if secours is not None:
+        _secours = sudoku.player_factory(
+            secours, representation,
+            sudoku.optionsJoueur(secours, dict(
+                (k, v) for k, v in (options or {}).items() if k != 'budget')))
+    if vectoriser:
+        import propagation_lot
+        solution = sudoku.chargerSolution(player)
+        _vectorise = functools.partial(
+            propagation_lot.resoudre_lignes,
+            recherche=solution.backtracking_search, options=options)
+    else:
+        cache = None
+        if cache_taille:
+            from canonique import CacheSolutions
+            cache = CacheSolutions(cache_taille)
+        _joueur = sudoku.player_factory(player, representation, options, cache)
+
+
+def resoudre(ligne):
+    """Résout une grille; retourne sa solution en une ligne, '-' ou EPUISEE."""
+    try:
+        depart = sudoku.SudokuUtil.ligne2etat(ligne, _ordre)
+    except ValueError:
+        return '-'
+
+    if _budget is not None:
+        _budget.reinitialiser()  # Une solution du cache n'a pas de recherche.
+    etat = sudoku.etat_final(_joueur(depart, sudoku.sudoku_but, None, None),
+                             depart)
+
+    if _budget is not None and _budget.epuise:
+        if _secours is None:
+            return EPUISEE
+        etat = sudoku.etat_final(
+            _secours(depart, sudoku.sudoku_but, None, None), depart)
+
+    if not sudoku.sudoku_but(etat):
+        return '-'
+    return sudoku.SudokuUtil.etat2ligne(etat)
+
+
+def resoudre_lot(lot):
+    if _vectorise is not None:
+        return list(zip([i for i, _ in lot], _vectorise([l for _, l in lot])))
+    return [(i, resoudre(ligne)) for i, ligne in lot]
+
+
+def lots(lignes, taille):
+    """Regroupe les lignes numérotées en lots de 'taille' grilles."""
+    lot = []
+    for i, ligne in enumerate(lignes):
+        lot.append((i, ligne.rstrip('\r\n')))
+        if len(lot) == taille:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def resoudre_flux(lignes, sortie, player='solution_sudoku.py',
+                  representation='listes', options=None, nb_processus=None,
+                  taille_lot=64, fenetre=None, indexer=False,
+                  vectoriser=False, cache_taille=0, ordre=3, secours=None):
+    """
+    Résout toutes les grilles de 'lignes' et écrit les solutions dans 'sortie'.
+
+    Sans 'indexer', les solutions sont écrites dans l'ordre de l'entrée; sinon
+    chacune est écrite dès qu'elle est prête, précédée de son numéro de ligne.
+
+    Avec 'vectoriser', chaque lot est d'abord propagé d'un bloc avec NumPy
+    (propagation_lot); seules les grilles restantes passent par la recherche,
+    sur des domaines en masques de bits.
+
+    Avec 'cache_taille', chaque processus garde un cache LRU des solutions
+    (canonique.CacheSolutions): une grille équivalente à une grille déjà
+    résolue par ce processus n'est pas recherchée à nouveau.
+
+    'ordre' est l'ordre des grilles (4 pour 16x16, ...); la vectorisation et
+    les masques de bits sont limités aux grilles 9x9.
+
+    Avec un budget dans 'options' (budget.Budget), chaque recherche est
+    limitée; une grille qui l'épuise est reprise par le joueur 'secours'
+    (sans budget), ou sa solution est écrite EPUISEE ('?').
+
+    Retourne le nombre de grilles traitées.
+    """
+    nb_processus = nb_processus or multiprocessing.cpu_count()
+    fenetre = fenetre or 2 * nb_processus
+    nb_grilles = 0
+
+    def ecrire(resultats):
+        for i, solution in resultats:
+            if indexer:
+                sortie.write("{0}\t{1}\n".format(i, solution))
+            else:
+                sortie.write(solution + "\n")
+        return len(resultats)
+
+    with multiprocessing.Pool(nb_processus, _initialiser,
+                              (player, representation, options,
+                               vectoriser, cache_taille, ordre,
+                               secours)) as pool:
+        if indexer:
+            # Lots écrits dans l'ordre où ils se terminent.
+            termines = queue.Queue()
+            nb_en_cours = 0
+            for lot in lots(lignes, taille_lot):
+                pool.apply_async(resoudre_lot, (lot,),
+                                 callback=termines.put,
+                                 error_callback=termines.put)
+                nb_en_cours += 1
+                while nb_en_cours >= fenetre:
+                    nb_grilles += ecrire(_resultat(termines.get()))
+                    nb_en_cours -= 1
+            while nb_en_cours:
+                nb_grilles += ecrire(_resultat(termines.get()))
+                nb_en_cours -= 1
+        else:
+            # Lots écrits dans l'ordre de l'entrée.
+            en_cours = deque()
+            for lot in lots(lignes, taille_lot):
+                en_cours.append(pool.apply_async(resoudre_lot, (lot,)))
+                while len(en_cours) >= fenetre:
+                    nb_grilles += ecrire(en_cours.popleft().get())
+            while en_cours:
+                nb_grilles += ecrire(en_cours.popleft().get())
+
+    return nb_grilles
+
+
+def _resultat(resultat):
+    if isinstance(resultat, BaseException):
+        raise resultat
+    return resultat
+
+
+DESCRIPTION = "Résoudre en lot des grilles de sudoku (une ligne de 81 " \
+              "caractères par grille, '.', '0' ou ' ' pour une case vide; " \
+              "N² symboles 1-9A-Z ou nombres séparés pour une grille N x N)."
+
+
+def buildArgsParser():
+    p = argparse.ArgumentParser(description=DESCRIPTION,
+                                formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    p.add_argument('entree', metavar="FICHIER", nargs='?', default='-',
+                   help="fichier de grilles ('-' pour l'entrée standard).")
+
+    p.add_argument('-sortie', dest='sortie', metavar="FICHIER",
+                   action='store', type=str, required=False, default='-',
+                   help="fichier des solutions ('-' pour la sortie standard).")
+
+    p.add_argument('-joueur', dest="player", metavar="JOUEUR", action='store',
+                   type=str, required=False, default="solution_sudoku.py",
+                   help="moteur intégré ou fichier contenant votre solution.")
+
+    p.add_argument('-ordre', dest='ordre', metavar="INT", action='store',
+                   type=int, required=False, default=3, choices=[2, 3, 4, 5],
+                   help="ordre des grilles (taille des blocs): 3 pour 9x9, "
+                        "4 pour 16x16, 5 pour 25x25.")
+
+    sudoku.ajouterOptionsRecherche(p)
+    sudoku.ajouterOptionsBudget(p)
+
+    p.add_argument('-secours', dest='secours', metavar="JOUEUR",
+                   action='store', type=str, required=False,
+                   help="moteur reprenant sans budget les grilles qui "
+                        "épuisent le budget (sinon leur solution est '?').")
+
+    p.add_argument('-processus', dest='nb_processus', metavar="INT",
+                   action='store', type=int, required=False,
+                   help="nombre de processus (défaut: nombre de coeurs).")
+
+    p.add_argument('-lot', dest='taille_lot', metavar="INT", action='store',
+                   type=int, required=False, default=64,
+                   help="nombre de grilles envoyées à la fois à un processus.")
+
+    p.add_argument('-fenetre', dest='fenetre', metavar="INT", action='store',
+                   type=int, required=False,
+                   help="nombre maximal de lots en cours "
+                        "(défaut: 2 x nombre de processus).")
+
+    p.add_argument('-vectoriser', dest='vectoriser', action='store_true',
+                   required=False,
+                   help="propager chaque lot avec NumPy (singletons nus et "
+                        "cachés) avant la recherche.")
+
+    p.add_argument('-cache_taille', dest='cache_taille', metavar="INT",
+                   action='store', type=int, required=False, default=0,
+                   help="taille du cache de solutions de chaque processus "
+                        "(0: aucun cache; ignoré avec -vectoriser).")
+
+    p.add_argument('-index', dest='indexer', action='store_true',
+                   required=False,
+                   help="écrire les solutions dès qu'elles sont prêtes, "
+                        "précédées de leur numéro de ligne.")
+
+    return p
+
+
+def main():
+    parser = buildArgsParser()
+    args = parser.parse_args()
+
+    if not args.player.endswith('.py') \
+            and args.player not in sudoku.SOLVEURS_INTEGRES:
+        parser.error('Joueur doit être un moteur intégré ({0}) ou un fichier '
+                     '.py (ex. solution_sudoku.py)'.format(
+                         ', '.join(sudoku.SOLVEURS_INTEGRES)))
+
+    if args.ordre != 3 and (args.vectoriser or args.representation == 'masques'):
+        parser.error("-vectoriser et -domaines masques sont limités aux "
+                     "grilles 9x9 (-ordre 3).")
+
+    options = sudoku.optionsRecherche(args)
+    budget = sudoku.budgetRecherche(args)
+    if budget is not None:
+        if args.vectoriser:
+            parser.error("-temps_max et -noeuds_max ne s'appliquent pas "
+                         "avec -vectoriser.")
+        options['budget'] = budget
+    if args.secours is not None and not args.secours.endswith('.py') \
+            and args.secours not in sudoku.SOLVEURS_INTEGRES:
+        parser.error("-secours doit être un moteur intégré ou un fichier .py.")
+    try:
+        sudoku.verifierOptions(args.player, options)
+    except ValueError as e:
+        parser.error(str(e))
+
+    entree = sys.stdin if args.entree == '-' else open(args.entree)
+    sortie = sys.stdout if args.sortie == '-' else open(args.sortie, 'w')
+
+    start_time = time.time()
+    nb_grilles = resoudre_flux(
+        entree, sortie, args.player, args.representation, options,
+        args.nb_processus, args.taille_lot, args.fenetre, args.indexer,
+        args.vectoriser, args.cache_taille, args.ordre, args.secours)
+    duree = time.time() - start_time
+
+    sortie.flush()
+    print("{0} grilles en {1:0.2f} sec. ({2:0.1f} grilles/sec.)".format(
+        nb_grilles, duree, nb_grilles / duree if duree else 0.),
+        file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
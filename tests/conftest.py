@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Tests des moteurs et des modules du dépôt (python -m pytest -q tests).
+#
+# Les modules sont à la racine du dépôt: elle est ajoutée à sys.path.
+###
+
+import os
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RACINE not in sys.path:
+    sys.path.insert(0, RACINE)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import solution_sudoku
+import sudoku
+from statistiques import Statistiques
+
+# Grille facile et grille à 1332 solutions.
+FACILE = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+MULTIPLE = \
+    '.9...63..1.7.......3..2....82..9..4....35..7......4..8....3...1...6..5.7.....54..'
+
+
+@pytest.mark.parametrize('options', [{}, {'piste': True},
+                                     {'variable': 'mrv', 'valeur': 'lcv'}])
+def test_masques_comme_listes(options):
+    # AC3 ne part que des arcs de la dernière case réduite sur les masques:
+    # même recherche que sur les listes, avec moins d'arcs révisés.
+    resultats = []
+    for creer in (sudoku.creerCSP, sudoku.creerCSPMasques):
+        stats = Statistiques()
+        etat = sudoku.SudokuUtil.ligne2etat(FACILE)
+        assignations = solution_sudoku.backtracking_search(
+            creer(etat), stats=stats, **options)
+        resultats.append((assignations, stats.noeuds, stats.backtracks,
+                          stats.arcs_revises))
+    (listes, *compte_listes), (masques, *compte_masques) = resultats
+    assert masques == listes
+    assert compte_masques[:2] == compte_listes[:2]
+    assert compte_masques[2] < compte_listes[2]
+
+
+@pytest.mark.parametrize('piste', [False, True])
+def test_masques_compte_apres_annulation(piste):
+    # Les branches sœurs de la racine repartent de domaines non propagés.
+    etat = sudoku.SudokuUtil.ligne2etat(MULTIPLE)
+    nb, _ = solution_sudoku.compter_solutions(sudoku.creerCSPMasques(etat),
+                                              piste=piste)
+    assert nb == 1332
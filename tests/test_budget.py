@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import dlx
+import solution_sudoku
+import sudoku
+import sudoku_batch
+from budget import Budget, RESOLUE
+
+# Grille à 17 indices (grilles/17_indices.txt) et sa solution.
+DIFFICILE = '000000010400000000020000000000050407008000300001090000300400200050100000000806000'
+SOLUTION = '693784512487512936125963874932651487568247391741398625319475268856129743274836159'
+# La solution, à 4 cases près.
+FACILE = SOLUTION[:5] + '....' + SOLUTION[9:]
+
+MOTEURS = [(solution_sudoku, {'piste': True}), (solution_sudoku, {'cbj': True}),
+           (dlx, {})]
+
+
+@pytest.mark.parametrize('moteur, options', MOTEURS)
+def test_budget_epuise(moteur, options):
+    budget = Budget(noeuds=20)
+    csp = sudoku.creerCSP(sudoku.SudokuUtil.ligne2etat(DIFFICILE))
+    assert moteur.backtracking_search(csp, budget=budget, **options) is False
+    assert budget.epuise
+    assert budget.stats.noeuds < 20 + budget.periode
+    # Affectation partielle cohérente: aucune valeur en double entre voisins.
+    for X, v in budget.partielle.items():
+        assert all(budget.partielle.get(Y) != v for Y in csp.contraintes[X])
+        assert budget.domaines[X] == [v]
+
+
+@pytest.mark.parametrize('moteur, options', MOTEURS)
+def test_budget_suffisant(moteur, options):
+    budget = Budget(noeuds=10 ** 6)
+    csp = sudoku.creerCSP(sudoku.SudokuUtil.ligne2etat(FACILE))
+    assert moteur.backtracking_search(csp, budget=budget, **options)
+    assert budget.statut == RESOLUE
+
+
+def test_lot_cache_et_budget():
+    # Une grille tirée du cache ne garde pas le statut de la grille précédente.
+    budget = Budget(noeuds=200)
+    sudoku_batch._initialiser('solution_sudoku.py', 'listes',
+                              {'budget': budget}, cache_taille=10)
+    try:
+        resultats = [sudoku_batch.resoudre(l) for l in (FACILE, DIFFICILE, FACILE)]
+    finally:
+        sudoku_batch._initialiser('solution_sudoku.py', 'listes', {})
+    assert resultats == [SOLUTION, sudoku_batch.EPUISEE, SOLUTION]
+    assert not budget.epuise
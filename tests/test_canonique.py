@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+import canonique
+import sudoku
+from canonique import CacheSolutions
+
+# Grille à 17 indices (grilles/17_indices.txt) et sa solution.
+GRILLE = '000000010400000000020000000000050407008000300001090000300400200050100000000806000'
+SOLUTION = '693784512487512936125963874932651487568247391741398625319475268856129743274836159'
+
+
+def tableau(ligne):
+    return sudoku.SudokuUtil.ligne2etat(ligne).tableau.astype(np.uint8)
+
+
+def equivalente(t):
+    """Grille équivalente: transposée, bandes permutées, chiffres renommés."""
+    etiquettes = np.array([0, 9, 8, 7, 6, 5, 4, 3, 2, 1], dtype=np.uint8)
+    t = t.T[[2, 1, 0, 3, 4, 5, 8, 6, 7]][:, [0, 2, 1, 5, 4, 3, 6, 7, 8]]
+    return etiquettes[t]
+
+
+def test_forme_canonique_invariante():
+    t = tableau(GRILLE)
+    forme, transformation = canonique.canonique(t)
+    autre, _ = canonique.canonique(equivalente(t))
+    assert (forme == autre).all()
+    assert (canonique.appliquer(t, transformation) == forme).all()
+    assert (canonique.inverser(forme, transformation) == t).all()
+
+
+def test_cache_grille_equivalente_et_exacte():
+    t, solution = tableau(GRILLE), tableau(SOLUTION)
+    cache = CacheSolutions(capacite=10)
+    trouvee, cle, transformation = cache.chercher(t)
+    assert trouvee is None
+    cache.ajouter(cle, transformation, solution)
+
+    # Grille identique: trouvée par ses octets, sans forme canonique.
+    trouvee, cle, transformation = cache.chercher(t)
+    assert (trouvee == solution).all() and cle is None
+
+    # Grille équivalente: solution ramenée par la transformation inverse,
+    # puis trouvée par ses octets.
+    autre = equivalente(t)
+    for _ in range(2):
+        trouvee, _, _ = cache.chercher(autre)
+        assert (trouvee == equivalente(solution)).all()
+    assert cache.succes == 3 and cache.echecs == 1
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import dlx
+import solution_sudoku
+import sudoku
+from budget import Budget
+from generateur import GrilleMasques
+
+# Grille à 1332 solutions (voir test_propagation.py).
+GRILLE = '.9...63..1.7.......3..2....82..9..4....35..7......4..8....3...1...6..5.7.....54..'
+
+
+def etat():
+    return sudoku.SudokuUtil.ligne2etat(GRILLE)
+
+
+@pytest.mark.parametrize('options', [{'cbj': True}, {'cbj': True, 'nogoods': 0},
+                                     {'cbj': True, 'variable': 'mrv'}])
+def test_comptage_cbj(options):
+    nb, solutions = solution_sudoku.compter_solutions(
+        sudoku.creerCSP(etat()), garder=3, **options)
+    assert nb == dlx.compter_solutions(sudoku.creerCSP(etat()))[0] == 1332
+    assert len(set(tuple(sorted(s.items())) for s in solutions)) == 3
+
+
+@pytest.mark.parametrize('moteur, options', [(solution_sudoku, {'cbj': True}),
+                                             (dlx, {})])
+def test_comptage_budget(moteur, options):
+    budget = Budget(noeuds=100)
+    nb, _ = moteur.compter_solutions(sudoku.creerCSP(etat()), budget=budget,
+                                     **options)
+    assert budget.epuise
+    assert nb < 1332
+
+
+def test_comptage_options_refusees():
+    with pytest.raises(ValueError):
+        solution_sudoku.compter_solutions(sudoku.creerCSP(etat()), processus=2)
+    with pytest.raises(TypeError):
+        solution_sudoku.compter_solutions(sudoku.creerCSP(etat()), inconnue=1)
+
+
+@pytest.mark.parametrize('options', [{'processus': 4}, {'cbj': True},
+                                     {'piste': True}, {'variable': 'mrv'},
+                                     {'regles': ['singletons']}])
+def test_dlx_options_refusees(options):
+    with pytest.raises(ValueError):
+        dlx.backtracking_search(sudoku.creerCSP(etat()), **options)
+    with pytest.raises(ValueError):
+        dlx.compter_solutions(sudoku.creerCSP(etat()), **options)
+
+
+def test_dlx_options_par_defaut():
+    options = dict(dlx.OPTIONS_CSP, regles=[])
+    assert dlx.backtracking_search(sudoku.creerCSP(etat()), **options)
+    assert sudoku.optionsJoueur('dlx', {'piste': True, 'stats': None}) == \
+        {'stats': None}
+
+
+@pytest.mark.parametrize('propager', [False, True])
+def test_comptage_generateur(propager):
+    valeurs = [0 if c == '.' else int(c) for c in GRILLE]
+    g = GrilleMasques(valeurs)
+    assert g.compter(limite=10 ** 4, propager=propager) == 1332
+    assert g.valeurs == valeurs
+    # Valeur de la première solution interdite dans la première case vide.
+    c = valeurs.index(0)
+    interdits = {c: 1 << (g.solution[c] - 1)}
+    assert g.compter(limite=10 ** 4, interdits=interdits,
+                     propager=propager) == 577
+    assert g.compter(limite=2, interdits=interdits, propager=propager) == 2
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import pickle
+
+import numpy as np
+import pytest
+
+import corpus
+import sudoku
+from corpus import Corpus, EcrivainCorpus
+
+GRILLE = '000000010400000000020000000000050407008000300001090000300400200050100000000806000'
+SOLUTION = '693784512487512936125963874932651487568247391741398625319475268856129743274836159'
+PETITE = '1.3....2.3..2..4'  # 4x4 (ordre 2): 16 cases, sans demi-octet de bourrage.
+
+
+def tableau(ligne, ordre=3):
+    return sudoku.SudokuUtil.convertir(ligne, ordre)
+
+
+@pytest.mark.parametrize('ordre, ligne', [(3, GRILLE), (3, SOLUTION), (2, PETITE)])
+def test_compresser_aller_retour(ordre, ligne):
+    t = tableau(ligne, ordre)
+    paquets = corpus.compresser([t])
+    assert paquets.shape == (1, corpus.octets_grille(ordre))
+    assert (corpus.decompresser(paquets, ordre)[0] == t).all()
+
+
+def test_importer_lignes_aller_retour(tmp_path):
+    chemin = str(tmp_path / 'grilles.sdkc')
+    texte = ['# commentaire', GRILLE + ',' + SOLUTION, '',
+             SOLUTION + '\t' + SOLUTION]
+    # Lots de 1 grille: plusieurs écritures dans le même fichier.
+    assert corpus.importer(texte, chemin, solutions=True, lot=1) == 2
+
+    with Corpus(chemin) as c:
+        assert len(c) == 2
+        assert (c.grille(0) == tableau(GRILLE)).all()
+        assert (c.solution(0) == tableau(SOLUTION)).all()
+        assert (c.solutions()[1] == tableau(SOLUTION)).all()
+        lues = list(corpus.lignes(c.grilles()))
+    assert lues == [GRILLE.replace('0', '.'), SOLUTION]
+
+
+def test_metadonnees_et_pickle(tmp_path):
+    chemin = str(tmp_path / 'meta.sdkc')
+    with EcrivainCorpus(chemin, metadonnees=True) as ecrivain:
+        ecrivain.ajouter(tableau(GRILLE), metadonnees={'indices': 17})
+        ecrivain.ajouter(tableau(SOLUTION))
+
+    with Corpus(chemin) as c:
+        assert c.metadonnees(0) == {'indices': 17}
+        assert c.metadonnees(1) is None
+        assert c.solution(0) is None
+        # Un corpus passé à un processus est rouvert par son chemin.
+        copie = pickle.loads(pickle.dumps(c))
+        try:
+            assert (np.concatenate([g for _, g in copie.tranches(1)])
+                    == c.grilles()).all()
+        finally:
+            copie.fermer()
+
+
+def test_corpus_invalide(tmp_path):
+    chemin = tmp_path / 'texte.sdkc'
+    chemin.write_bytes(b'x' * 100)
+    with pytest.raises(ValueError):
+        Corpus(str(chemin))
+    with pytest.raises(ValueError):
+        EcrivainCorpus(str(tmp_path / 'grand.sdkc'), ordre=4)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+import sudoku
+from heuristiques import COMPACTAGE, EtatHeuristique
+
+GRILLE = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+
+
+def test_tas_borne_et_choix_mrv():
+    csp = sudoku.creerCSP(sudoku.SudokuUtil.ligne2etat(GRILLE))
+    h = EtatHeuristique(csp)
+    rng = random.Random(0)
+    libres = [X for X in csp.variables if len(csp.domaines[X]) > 1]
+    assignations = dict((X, csp.domaines[X][0]) for X in csp.variables
+                        if X not in libres)
+    # Assignations et retours arrière répétés: chacun empile des entrées.
+    for _ in range(2000):
+        X = rng.choice(libres)
+        if X in assignations:
+            del assignations[X]
+            h.liberer(X)
+        else:
+            assignations[X] = csp.domaines[X][0]
+            h.assigner(X)
+        choisie = h.choisir_variable(assignations)
+        non_assignees = [X for X in csp.variables if X not in assignations]
+        assert choisie == min(non_assignees, key=h._cle)
+        assert len(h.tas) <= (COMPACTAGE + 1) * len(csp.variables)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+import sudoku
+from legalite import IndexLegalite
+
+GRILLE = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+SOLUTION = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+
+
+def index(ligne=GRILLE):
+    return IndexLegalite(sudoku.SudokuUtil.ligne2etat(ligne))
+
+
+def test_legalite_comme_unites():
+    idx = index()
+    assert idx.coherent and not idx.complet()
+    assert not idx.est_legal(0, 0, 3)  # 3 déjà dans la ligne.
+    assert not idx.est_legal(0, 0, 9)  # 9 déjà dans la colonne.
+    assert idx.est_legal(0, 0, 4)
+    assert idx.candidats(0, 0) == [4, 5]
+    assert idx.candidats(0, 2) == [3, 4, 7]  # Case remplie: 3 peut y rester.
+
+
+def test_jouer_annuler_refaire():
+    idx = index()
+    idx.jouer(0, 0, 4)
+    assert idx.etat.tableau[0, 0] == 4 and not idx.est_legal(0, 1, 4)
+    idx.jouer(0, 0, 5)  # Remplace 4: de nouveau légal dans la ligne.
+    assert idx.est_legal(0, 1, 4) and not idx.est_legal(0, 1, 5)
+
+    assert idx.annuler() == (0, 0) and idx.etat.tableau[0, 0] == 4
+    assert idx.annuler() == (0, 0) and idx.etat.tableau[0, 0] == 0
+    assert idx.annuler() is None
+    assert idx.refaire() == (0, 0) and idx.etat.tableau[0, 0] == 4
+    idx.jouer(0, 1, 8)  # Un nouveau coup efface les coups à rétablir.
+    assert idx.refaire() is None
+    assert idx.est_legal(0, 0, 5) and not idx.est_legal(0, 0, 8)
+
+
+def test_grille_complete():
+    idx = index()
+    for c, v in enumerate(SOLUTION):
+        y, x = divmod(c, 9)
+        if not idx.etat.tableau[y, x]:
+            assert idx.est_legal(y, x, int(v))
+            idx.jouer(y, x, int(v))
+    assert idx.complet() and sudoku.sudoku_but(idx.etat)
+
+
+def test_grille_incoherente():
+    idx = index('33' + GRILLE[2:])
+    assert not idx.coherent
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Chaque moteur et chaque jeu d'options doit trouver autant de solutions que
+# dlx (couverture exacte, indépendant de la recherche par CSP).
+###
+
+import pytest
+
+import dlx
+import solution_sudoku
+import sudoku
+from propagation import REGLES
+
+# Grille à 1332 solutions (voir test_propagation.py) complétée de quelques
+# cases d'une de ses solutions (41, puis 9 solutions), une grille à solution
+# unique, et une grille sans solution sans qu'aucune unité ne contienne de
+# valeur en double.
+GRILLES = [
+    '.9..763..157..3..9.3..2....82..9..4....35..7......4..8....3...1...6..5.7.....54..',
+    '.9..763..157..3..9.3.92....82..9..4....35..7......4..8....3...1...6..5.7.....54..',
+    '003020600900305001001806400008102900700000008006708200002609500800203009005010300',
+    '49..763..157..3..9.3.92....82..9..4....35..7......4..8....3...1...6..5.7.....54..',
+]
+
+CREER = {'listes': sudoku.creerCSP, 'masques': sudoku.creerCSPMasques}
+
+OPTIONS = [
+    {'piste': False},
+    {'piste': True},
+    {'variable': 'mrv'},
+    {'valeur': 'lcv'},
+    {'variable': 'mrv', 'valeur': 'lcv'},
+    {'regles': ['singletons']},
+    {'regles': list(REGLES), 'variable': 'mrv'},
+    {'cbj': True},
+    {'cbj': True, 'variable': 'mrv', 'nogoods': 0},
+]
+
+
+def reference(ligne, ordre=3):
+    etat = sudoku.SudokuUtil.ligne2etat(ligne, ordre)
+    return dlx.compter_solutions(sudoku.creerCSP(etat), garder=10 ** 4)
+
+
+def valide(ligne, assignations, ordre=3):
+    final = sudoku.SudokuUtil.ligne2etat(ligne, ordre)
+    for pos, v in assignations.items():
+        final.placer(pos, v)
+    return sudoku.sudoku_but(final)
+
+
+@pytest.mark.parametrize('ligne', GRILLES)
+@pytest.mark.parametrize('representation', sorted(CREER))
+@pytest.mark.parametrize('options', OPTIONS)
+def test_comptage_comme_dlx(ligne, representation, options):
+    nb_dlx, solutions_dlx = reference(ligne)
+    etat = sudoku.SudokuUtil.ligne2etat(ligne)
+    nb, solutions = solution_sudoku.compter_solutions(
+        CREER[representation](etat), garder=nb_dlx, **options)
+    assert nb == nb_dlx
+    cle = lambda s: sorted(s.items())
+    assert sorted(map(cle, solutions)) == sorted(map(cle, solutions_dlx))
+
+
+@pytest.mark.parametrize('ligne', GRILLES)
+@pytest.mark.parametrize('options', OPTIONS + [{'processus': 2}])
+def test_recherche_comme_dlx(ligne, options):
+    nb_dlx, _ = reference(ligne)
+    etat = sudoku.SudokuUtil.ligne2etat(ligne)
+    assignations = solution_sudoku.backtracking_search(sudoku.creerCSP(etat),
+                                                       **options)
+    if nb_dlx:
+        assert assignations and valide(ligne, assignations)
+    else:
+        assert not assignations
+    resolue = dlx.backtracking_search(sudoku.creerCSP(etat))
+    assert bool(resolue) == bool(nb_dlx)
+
+
+@pytest.mark.parametrize('options', [{}, {'piste': True}, {'variable': 'mrv'},
+                                     {'cbj': True}])
+@pytest.mark.parametrize('ligne', ['1...............', '12...........4..'])
+def test_ordre_2_comme_dlx(ligne, options):
+    nb_dlx, _ = reference(ligne, 2)
+    etat = sudoku.SudokuUtil.ligne2etat(ligne, 2)
+    nb, _ = solution_sudoku.compter_solutions(sudoku.creerCSP(etat), **options)
+    assert nb == nb_dlx
+    assignations = solution_sudoku.backtracking_search(sudoku.creerCSP(etat),
+                                                       **options)
+    assert bool(assignations) == bool(nb_dlx)
+    if assignations:
+        assert valide(ligne, assignations, 2)
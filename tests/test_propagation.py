@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import dlx
+import solution_sudoku
+import sudoku
+from propagation import REGLES, Propagation
+
+# Grille à 1332 solutions: une valeur placée mais pas encore propagée était
+# prise pour une paire cachée dans sa ligne (aucune solution trouvée).
+GRILLE_PAIRE_CACHEE = \
+    '.9...63..1.7.......3..2....82..9..4....35..7......4..8....3...1...6..5.7.....54..'
+
+
+@pytest.mark.parametrize('regles', [['caches', 'paires'], list(REGLES),
+                                    ['pointage'], ['triplets']])
+@pytest.mark.parametrize('creer', [sudoku.creerCSP, sudoku.creerCSPMasques])
+def test_valeurs_placees_non_confinees(regles, creer):
+    etat = sudoku.SudokuUtil.ligne2etat(GRILLE_PAIRE_CACHEE)
+    assignations = solution_sudoku.backtracking_search(
+        creer(etat), piste=True, regles=regles)
+    assert assignations
+    final = etat.copy()
+    for pos, v in assignations.items():
+        final.placer(pos, v)
+    assert sudoku.sudoku_but(final)
+
+    nb, _ = solution_sudoku.compter_solutions(creer(etat), limite=20,
+                                              regles=regles)
+    assert nb == 20
+
+
+def test_nombre_de_solutions():
+    etat = sudoku.SudokuUtil.ligne2etat(GRILLE_PAIRE_CACHEE)
+    assert dlx.compter_solutions(sudoku.creerCSP(etat))[0] == 1332
+
+
+
+@pytest.mark.parametrize('regle, k', [('paires', 2), ('triplets', 3)])
+def test_sous_ensemble_cache_petits_domaines(regle, k):
+    # Paire cachée {1,2} confinée aux cases de domaines {1,3} et {2,4}:
+    # aucune n'a plus de 2 valeurs, mais 3 et 4 doivent être retirés. Pour
+    # les triplets, 5 est de plus confiné à une case de domaine {5,6}.
+    csp = sudoku.creerCSP(sudoku.SudokuUtil.ligne2etat('.' * 81))
+    ligne = [(0, x) for x in range(9)]
+    groupe = [b'1', b'2', b'5'][:k]
+    for X in ligne[k:]:
+        csp.domaines[X] = [v for v in csp.domaines[X] if v not in groupe]
+    csp.domaines[ligne[0]] = [b'1', b'3']
+    csp.domaines[ligne[1]] = [b'2', b'4']
+    if k == 3:
+        csp.domaines[ligne[2]] = [b'5', b'6']
+
+    assert Propagation([regle]).propager(csp)
+    assert [csp.domaines[X] for X in ligne[:k]] == [[v] for v in groupe]
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import dlx
+import sudoku
+from sudoku import Rejeu, etat_final
+
+GRILLE = '003020600900305001001806400008102900700000008006708200002609500800203009005010300'
+SOLUTION = '483921657967345821251876493548132976729564138136798245372689514814253769695417382'
+
+
+def depart():
+    return sudoku.SudokuUtil.ligne2etat(GRILLE)
+
+
+def assignations(etat):
+    return dlx.backtracking_search(sudoku.creerCSP(etat))
+
+
+def test_rejeu_etats_en_place():
+    etat = depart()
+    affectations = assignations(etat)
+    rejeu = Rejeu(etat, affectations)
+    etats = iter(rejeu)
+    assert next(etats) is etat
+    courant = next(etats)
+    assert courant is not etat and rejeu.coup == next(iter(affectations.items()))
+    # Chaque étape modifie le même objet; le départ reste intact.
+    assert all(e is courant for e in etats)
+    assert sudoku.SudokuUtil.etat2ligne(courant) == SOLUTION
+    assert sudoku.SudokuUtil.etat2ligne(etat) == GRILLE.replace('0', '.')
+
+
+def test_final_sans_etats_intermediaires():
+    etat = depart()
+    rejeu = Rejeu(etat, assignations(etat))
+    next(rejeu)
+    next(rejeu)  # Une affectation déjà rejouée.
+    final = etat_final(rejeu)
+    assert sudoku.SudokuUtil.etat2ligne(final) == SOLUTION
+    assert list(rejeu) == []
+
+
+def test_etat_final_sans_solution():
+    etat = depart()
+    assert etat_final(Rejeu(etat, False)) == etat
+    assert etat_final(iter([]), etat) is etat
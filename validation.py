@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+#####
+# Validation vectorisée des grilles de sudoku.
+#
+# Les grilles sont converties en entiers (0 = case vide). Chaque unité (ligne,
+# colonne ou bloc) est réduite en un masque de bits (OU des 1 << valeur):
+# une unité complète et sans doublon donne exactement les bits 1 à N.
+# La forme en lot valide un tableau (G, N, N) en un seul appel.
+#
+# L'ordre de la grille (3 pour 9x9, 4 pour 16x16, ...) est déduit de la
+# forme du tableau.
+###
+
+import functools
+
+import numpy as np
+
+import grille
+
+# Valeur (1 à 35) de chaque octet-symbole ('1'-'9', 'A'-'Z'), 0 sinon.
+_SYMBOLES = np.zeros(256, dtype=np.int16)
+for _k, _s in enumerate(grille.SYMBOLES):
+    _SYMBOLES[ord(_s)] = _SYMBOLES[ord(_s.lower())] = _k + 1
+
+
+@functools.lru_cache(maxsize=None)
+def _index(ordre):
+    """Unités (3N, N) et masque complet d'une grille d'ordre donné."""
+    index = grille.index(ordre)
+    return np.array(index.unites), (1 << (index.taille + 1)) - 2
+
+
+def entiers(tableau):
+    """Grille(s) d'entiers (0 = vide) à partir d'un tableau numérique ou d'octets 'S1'."""
+    tableau = np.asarray(tableau)
+    if tableau.dtype.kind == 'S':
+        return _SYMBOLES[tableau.view(np.uint8)]
+    valeurs = tableau.astype(np.int16)
+    valeurs[valeurs < 0] = 0
+    return valeurs
+
+
+def _unites(grilles):
+    """Valeurs (G, 3N, N) des unités de grilles (G, N, N) ou (G, N²), et N."""
+    grilles = entiers(grilles)
+    nb_cases = grilles[0].size if len(grilles) else grille.NB_CASES
+    ordre = grille.ordre_de(nb_cases)
+    if ordre is None:
+        raise ValueError("Pas une grille de sudoku: {0} cases".format(nb_cases))
+    unites, _ = _index(ordre)
+    unites = grilles.reshape(len(grilles), nb_cases)[:, unites]
+    taille = ordre * ordre
+    # Une valeur hors bornes compte comme un symbole invalide (taille + 1).
+    return np.minimum(unites, taille + 1), ordre
+
+
+def valider_lot(grilles):
+    """Masque (G,) des grilles complètes et valides parmi (G, N, N)."""
+    unites, ordre = _unites(grilles)
+    masques = np.bitwise_or.reduce(1 << unites.astype(np.int64), axis=2)
+    return (masques == _index(ordre)[1]).all(1)
+
+
+def sans_conflit_lot(grilles):
+    """Masque (G,) des grilles, complètes ou non, sans valeur répétée dans une unité."""
+    unites, ordre = _unites(grilles)
+    g, nb_unites, taille = unites.shape
+    # Comptes (G, 3N, N+2) de chaque valeur par unité (la colonne 0: cases
+    # vides, la dernière: valeurs hors bornes).
+    largeur = taille + 2
+    decalage = np.arange(g * nb_unites)[:, None] * largeur
+    comptes = np.bincount((unites.reshape(-1, taille) + decalage).ravel(),
+                          minlength=g * nb_unites * largeur)
+    comptes = comptes.reshape(g, nb_unites, largeur)
+    return (comptes[:, :, 1:-1] <= 1).all((1, 2)) & \
+        (comptes[:, :, -1] == 0).all(1)
+
+
+def valider(tableau):
+    """Vrai si la grille (N, N) est complète et valide."""
+    return bool(valider_lot(entiers(tableau)[None])[0])
+
+
+def sans_conflit(tableau):
+    """Vrai si la grille (N, N) n'a aucune valeur répétée dans une unité."""
+    return bool(sans_conflit_lot(entiers(tableau)[None])[0])